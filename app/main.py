@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
@@ -5,10 +6,22 @@ from pathlib import Path
 from dotenv import load_dotenv
 
 # Import routers
-from app.routers import health, tts, stt, llm, agent
+from app.routers import health, tts, stt, llm, agent, metrics, profiles
+
+# Import middleware
+from app.middleware import MetricsMiddleware, ProfilingMiddleware, RequestIDMiddleware, TracingMiddleware
+
+# Import services
+from app.services.registry import ServiceRegistry
+from app.services.resp_client import close_resp_pools
+from app.services.upload_janitor import get_upload_janitor
+from app.services.provider_probes import get_provider_prober
+from app.services.worker_health import get_worker_health
 
 # Import utilities
 from app.utils.logging import setup_logging
+from app.utils.metrics import get_metrics_registry
+from app.utils.tracing import get_tracer
 
 # Load environment variables
 load_dotenv()
@@ -16,13 +29,61 @@ load_dotenv()
 # Setup logging
 setup_logging()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared services and warm clients on startup and release resources on shutdown"""
+    # One set of services and provider connections per worker, injected into the routers
+    services = ServiceRegistry.create()
+    app.state.services = services
+    # Build Gemini model handles before the first request needs them
+    services.llm.clients.warm()
+    # Clean up and measure uploads/ in the background
+    janitor = get_upload_janitor()
+    janitor.start()
+    # Publish this worker's metrics for /metrics on any worker
+    metrics_registry = get_metrics_registry()
+    session_collector = metrics.session_store_collector(app)
+    metrics_registry.add_collector(session_collector)
+    metrics_registry.start()
+    # Probe providers in the background for /api/health/detailed
+    prober = get_provider_prober()
+    prober.use_clients(services.tts.client, services.stt.transcriber, services.assemblyai_client)
+    prober.start()
+    # Ready for traffic; also starts the event loop lag monitor
+    worker_health = get_worker_health()
+    worker_health.start()
+    yield
+    await worker_health.stop()
+    await prober.stop()
+    await metrics_registry.stop()
+    metrics_registry.remove_collector(session_collector)
+    await janitor.stop()
+    # Flush buffered session writes and close provider connections
+    await services.close()
+    await close_resp_pools()
+    # Export spans still queued
+    get_tracer().shutdown()
+
 # Create FastAPI instance
 app = FastAPI(
     title="Voice Agents - Refactored",
     description="Refactored Voice Agents Backend with TTS, STT, LLM Integration, and Voice-to-Voice AI Pipeline",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
+# Opt-in sampling profiler for individual requests
+app.add_middleware(ProfilingMiddleware)
+
+# Request counts and latency per route
+app.add_middleware(MetricsMiddleware)
+
+# Root span per request; returns X-Trace-ID
+app.add_middleware(TracingMiddleware)
+
+# Assign or propagate X-Request-ID for log correlation
+app.add_middleware(RequestIDMiddleware)
+
 # Create uploads directory if it doesn't exist
 UPLOADS_DIR = Path("uploads")
 UPLOADS_DIR.mkdir(exist_ok=True)
@@ -36,6 +97,8 @@ app.include_router(tts.router)
 app.include_router(stt.router)
 app.include_router(llm.router)
 app.include_router(agent.router)
+app.include_router(metrics.router)
+app.include_router(profiles.router)
 
 @app.get("/")
 async def read_root():
@@ -54,7 +117,8 @@ async def api_info():
             "tts": "/api/tts",
             "stt": "/api/stt", 
             "llm": "/api/llm",
-            "agent": "/api/agent"
+            "agent": "/api/agent",
+            "metrics": "/metrics"
         }
     }
 
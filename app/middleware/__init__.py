@@ -0,0 +1,5 @@
+# Middleware package
+from .request_id import RequestIDMiddleware
+from .metrics import MetricsMiddleware
+from .profiling import ProfilingMiddleware
+from .tracing import TracingMiddleware
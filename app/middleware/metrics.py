@@ -0,0 +1,44 @@
+import time
+from app.utils.metrics import HTTP_REQUESTS, HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT
+
+UNMATCHED_ROUTE = "unmatched"
+
+def route_label(scope) -> str:
+    """Label requests by route template so path parameters do not create new series"""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    if "endpoint" in scope:
+        # Mounted apps such as /static set their mount path as root_path
+        return scope.get("root_path") or "/"
+    return UNMATCHED_ROUTE
+
+class MetricsMiddleware:
+    """Count requests and observe latency per method, route and status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # The router records the matched route in the shared scope
+            labels = (scope["method"], route_label(scope), str(status_code))
+            HTTP_REQUESTS.inc(*labels)
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start_time, *labels)
@@ -0,0 +1,63 @@
+import asyncio
+import random
+import time
+from app.utils.log_context import get_request_id
+from app.utils.profiler import get_request_profiler
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+class ProfilingMiddleware:
+    """Profile opted-in requests with a sampling profiler.
+
+    Requests that are not profiled pass straight through. A profiled
+    response carries ``X-Profile-ID``, which names the profile under
+    ``/api/profiles``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.profiler = get_request_profiler()
+
+    def _wanted(self, scope) -> bool:
+        if not scope["path"].startswith(self.profiler.path_prefixes):
+            return False
+        if self.profiler.header_enabled:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return value.strip().lower() in (b"1", b"true", b"yes")
+        return self.profiler.sample_rate > 0 and random.random() < self.profiler.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.enabled or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = self.profiler.start(asyncio.current_task())
+        if sampler is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = self.profiler.new_profile_id(get_request_id())
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER, profile_id.encode("ascii")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            await self.profiler.finish(sampler, profile_id, {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "started_at": time.time() - (time.perf_counter() - start_time),
+                "duration_ms": round((time.perf_counter() - start_time) * 1000, 3)
+            })
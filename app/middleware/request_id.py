@@ -0,0 +1,69 @@
+import time
+import uuid
+from app.utils.log_context import request_id_var, session_id_var, stage_var
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+REQUEST_ID_HEADER = b"x-request-id"
+MAX_REQUEST_ID_LENGTH = 128
+
+def _valid_request_id(value: bytes) -> bool:
+    return 0 < len(value) <= MAX_REQUEST_ID_LENGTH and all(0x21 <= byte <= 0x7e for byte in value)
+
+class RequestIDMiddleware:
+    """Assign or propagate X-Request-ID and log one structured access record per request.
+
+    Implemented as plain ASGI middleware so streaming responses pass
+    through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER and _valid_request_id(value):
+                request_id = value.decode("ascii")
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+
+        tokens = (
+            request_id_var.set(request_id),
+            session_id_var.set(None),
+            stage_var.set(None)
+        )
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER, request_id.encode("ascii")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            duration_ms = (time.perf_counter() - start_time) * 1000
+            logger.info(
+                "%s %s %s",
+                scope["method"], scope["path"], status_code,
+                extra={
+                    "duration_ms": round(duration_ms, 3),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code
+                }
+            )
+            for var, token in zip((request_id_var, session_id_var, stage_var), tokens):
+                var.reset(token)
@@ -0,0 +1,59 @@
+import os
+from app.middleware.metrics import route_label
+from app.utils.log_context import get_request_id
+from app.utils.tracing import STATUS_ERROR, get_tracer
+
+TRACEPARENT_HEADER = b"traceparent"
+TRACE_ID_HEADER = b"x-trace-id"
+
+class TracingMiddleware:
+    """Open a root span per request and return its trace id in ``X-Trace-ID``.
+
+    A W3C ``traceparent`` header continues the caller's trace. Paths
+    under TRACE_EXCLUDE_PREFIXES (metrics scrapes, static files) are not
+    traced.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.tracer = get_tracer()
+        self.exclude_prefixes = tuple(
+            prefix.strip() for prefix in os.getenv("TRACE_EXCLUDE_PREFIXES", "/metrics,/static").split(",") if prefix.strip()
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == TRACEPARENT_HEADER:
+                traceparent = value.decode("latin-1")
+                break
+
+        with self.tracer.start_span(
+            f"{scope['method']} {scope['path']}",
+            kind="server",
+            traceparent=traceparent,
+            **{"http.method": scope["method"], "http.target": scope["path"], "request_id": get_request_id()}
+        ) as span:
+            trace_id = span.trace_id.encode("ascii")
+
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = STATUS_ERROR
+                    headers = list(message.get("headers", []))
+                    headers.append((TRACE_ID_HEADER, trace_id))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                # Name the span by route template once routing has run
+                route = route_label(scope)
+                span.name = f"{scope['method']} {route}"
+                span.set_attribute("http.route", route)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 
 # TTS Models
@@ -43,19 +43,25 @@ class EchoBotResponse(BaseModel):
 # LLM Models
 class LLMRequest(BaseModel):
     text: str
-    model: Optional[str] = "gemini-2.0-flash-exp"
+    model: Optional[str] = None  # None lets the model router choose
+    session_id: Optional[str] = None
+    prefix: Optional[str] = None  # Name of a registered prompt prefix
 
 class LLMResponse(BaseModel):
     success: bool
     message: str
     response_text: Optional[str] = None
     model_used: Optional[str] = None
+    tokens_used: Optional[int] = None
+    cached: Optional[bool] = None
 
 class LLMQueryRequest(BaseModel):
     text: str
-    model: Optional[str] = "gemini-1.5-flash"
+    model: Optional[str] = None  # None lets the model router choose
     max_tokens: Optional[int] = 1000
     temperature: Optional[float] = 0.7
+    session_id: Optional[str] = None
+    prefix: Optional[str] = None  # Name of a registered prompt prefix
 
 class LLMQueryResponse(BaseModel):
     success: bool
@@ -64,6 +70,36 @@ class LLMQueryResponse(BaseModel):
     response: Optional[str] = None
     model_used: Optional[str] = None
     tokens_used: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    tokens_estimated: Optional[bool] = None
+    cached: Optional[bool] = None
+
+class PromptPrefixRequest(BaseModel):
+    name: str
+    text: str
+
+class LLMBatchRequest(BaseModel):
+    items: List[LLMQueryRequest]
+    concurrency: int = Field(4, ge=1)  # Capped at LLM_BATCH_MAX_CONCURRENCY
+    stream: Optional[bool] = False  # Stream NDJSON results as they complete
+
+class LLMBatchItemResult(BaseModel):
+    index: int
+    result: LLMQueryResponse
+    duration: float
+    deduplicated: bool = False
+
+class LLMBatchResponse(BaseModel):
+    success: bool
+    message: str
+    results: List[LLMBatchItemResult]
+    total_items: int
+    unique_items: int
+    succeeded: int
+    failed: int
+    total_time: float
+    throughput: float  # Items per second
 
 # Audio LLM Query Models
 class AudioLLMQueryResponse(BaseModel):
@@ -1,2 +1,2 @@
 # Routers package
-from . import health, tts, stt, llm, agent
+from . import health, tts, stt, llm, agent, metrics, profiles
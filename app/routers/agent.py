@@ -1,73 +1,81 @@
 import time
-import uuid
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
+from fastapi.responses import StreamingResponse
 from app.models.schemas import (
-    ChatResponse, ChatSession, ChatMessage, 
-    AudioLLMQueryResponse, EchoBotResponse
+    ChatResponse, ChatMessage, 
+    AudioLLMQueryResponse, EchoBotResponse,
+    LLMRequest, LLMQueryRequest, TTSRequest
 )
 from app.services.tts_service import TTSService
 from app.services.stt_service import STTService
 from app.services.llm_service import LLMService
-from app.utils.file_utils import FileUtils
+from app.services.session_store import SessionQuery, SessionStore
+from app.services.session_transfer import SessionImportError, SessionImporter, export_sessions
+from app.routers.dependencies import get_chat_session_store, get_llm_service, get_stt_service, get_tts_service
 from app.utils.logging import get_logger
+from app.utils.log_context import bind_session, log_stage
+from app.utils.metrics import PIPELINES_IN_FLIGHT
+from app.utils.tracing import start_span
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/api/agent", tags=["agent"])
 
-# Initialize services
-tts_service = TTSService()
-stt_service = STTService()
-llm_service = LLMService()
-file_utils = FileUtils()
+def track_pipeline(pipeline: str):
+    """Dependency that counts the pipeline as in flight until the response is sent"""
+    async def dependency():
+        with PIPELINES_IN_FLIGHT.track_inprogress(pipeline):
+            yield
+    return dependency
 
-# In-memory chat history storage (in production, use a proper database)
-chat_sessions: dict[str, ChatSession] = {}
-
-@router.post("/chat", response_model=ChatResponse)
+@router.post("/chat", response_model=ChatResponse, dependencies=[Depends(track_pipeline("chat"))])
 async def chat_with_agent(
     audio_file: UploadFile = File(...),
-    session_id: str = None
+    session_id: str = None,
+    tts_service: TTSService = Depends(get_tts_service),
+    stt_service: STTService = Depends(get_stt_service),
+    llm_service: LLMService = Depends(get_llm_service),
+    session_store: SessionStore = Depends(get_chat_session_store)
 ):
     """Chat with the voice agent using audio input"""
     start_time = time.time()
     
     try:
-        # Create or get chat session
-        if not session_id or session_id not in chat_sessions:
-            session_id = str(uuid.uuid4())
-            chat_sessions[session_id] = ChatSession(
-                session_id=session_id,
-                messages=[],
-                created_at=time.time(),
-                updated_at=time.time()
-            )
-        
-        session = chat_sessions[session_id]
+        # Create or reuse chat session
+        if not session_id or not await session_store.exists(session_id):
+            session = await session_store.create()
+            session_id = session.session_id
+        bind_session(session_id)
         
         # Validate audio file
         if not audio_file.content_type or not audio_file.content_type.startswith('audio/'):
             raise HTTPException(status_code=400, detail="File must be an audio file")
         
         # Step 1: Transcribe audio
-        logger.info(f"Transcribing audio for session {session_id}")
-        file_content = await audio_file.read()
-        transcription = await stt_service.transcribe_uploaded_file(file_content, audio_file.filename)
+        logger.info("Transcribing audio for session %s", session_id)
+        with log_stage("stt"):
+            with start_span("agent.upload_read") as span:
+                file_content = await audio_file.read()
+                span.set_attribute("bytes", len(file_content))
+            transcription = await stt_service.transcribe_uploaded_file(file_content, audio_file.filename)
         
         if not transcription.success:
             raise HTTPException(status_code=500, detail=f"Transcription failed: {transcription.message}")
         
         # Step 2: Generate LLM response
-        logger.info(f"Generating LLM response for: {transcription.transcript}")
-        llm_request = LLMRequest(text=transcription.transcript)
-        llm_response = await llm_service.generate_response(llm_request)
+        logger.info("Generating LLM response for: %s", transcription.transcript)
+        llm_request = LLMRequest(text=transcription.transcript, session_id=session_id)
+        with log_stage("llm"):
+            llm_response = await llm_service.generate_response(llm_request, route="agent.chat")
         
         if not llm_response.success:
             raise HTTPException(status_code=500, detail=f"LLM generation failed: {llm_response.message}")
         
         # Step 3: Convert response to speech
-        logger.info(f"Converting LLM response to speech")
+        logger.info("Converting LLM response to speech")
         tts_request = TTSRequest(text=llm_response.response_text)
-        tts_response = await tts_service.text_to_speech(tts_request)
+        with log_stage("tts"):
+            tts_response = await tts_service.text_to_speech(tts_request)
         
         if not tts_response.success:
             raise HTTPException(status_code=500, detail=f"TTS failed: {tts_response.message}")
@@ -84,8 +92,14 @@ async def chat_with_agent(
             timestamp=time.time()
         )
         
-        session.messages.extend([user_message, assistant_message])
-        session.updated_at = time.time()
+        with start_span("session.append", session_id=session_id):
+            try:
+                message_count = await session_store.append_messages(session_id, [user_message, assistant_message])
+            except KeyError:
+                # Evicted or expired while STT, LLM and TTS ran: keep this turn under the same id
+                logger.warning("Session %s expired during the pipeline, recreating it", session_id)
+                await session_store.create(session_id)
+                message_count = await session_store.append_messages(session_id, [user_message, assistant_message])
         
         processing_time = time.time() - start_time
         
@@ -100,20 +114,24 @@ async def chat_with_agent(
             model_used=llm_response.model_used,
             voice_used=tts_response.audio_id,
             processing_time=processing_time,
-            message_count=len(session.messages)
+            message_count=message_count
         )
         
-        logger.info(f"Chat completed successfully for session {session_id}")
+        logger.info("Chat completed successfully for session %s", session_id)
         return response
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Chat endpoint error: {str(e)}")
+        logger.error("Chat endpoint error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/echo", response_model=EchoBotResponse)
-async def echo_bot(audio_file: UploadFile = File(...)):
+@router.post("/echo", response_model=EchoBotResponse, dependencies=[Depends(track_pipeline("echo"))])
+async def echo_bot(
+    audio_file: UploadFile = File(...),
+    tts_service: TTSService = Depends(get_tts_service),
+    stt_service: STTService = Depends(get_stt_service)
+):
     """Simple echo bot that repeats what you say"""
     try:
         # Validate audio file
@@ -121,15 +139,19 @@ async def echo_bot(audio_file: UploadFile = File(...)):
             raise HTTPException(status_code=400, detail="File must be an audio file")
         
         # Transcribe audio
-        file_content = await audio_file.read()
-        transcription = await stt_service.transcribe_uploaded_file(file_content, audio_file.filename)
+        with log_stage("stt"):
+            with start_span("agent.upload_read") as span:
+                file_content = await audio_file.read()
+                span.set_attribute("bytes", len(file_content))
+            transcription = await stt_service.transcribe_uploaded_file(file_content, audio_file.filename)
         
         if not transcription.success:
             raise HTTPException(status_code=500, detail=f"Transcription failed: {transcription.message}")
         
         # Convert back to speech
         tts_request = TTSRequest(text=transcription.transcript)
-        tts_response = await tts_service.text_to_speech(tts_request)
+        with log_stage("tts"):
+            tts_response = await tts_service.text_to_speech(tts_request)
         
         if not tts_response.success:
             raise HTTPException(status_code=500, detail=f"TTS failed: {tts_response.message}")
@@ -149,13 +171,16 @@ async def echo_bot(audio_file: UploadFile = File(...)):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Echo bot error: {str(e)}")
+        logger.error("Echo bot error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/audio-query", response_model=AudioLLMQueryResponse)
+@router.post("/audio-query", response_model=AudioLLMQueryResponse, dependencies=[Depends(track_pipeline("audio_query"))])
 async def audio_llm_query(
     audio_file: UploadFile = File(...),
-    model: str = "gemini-1.5-flash"
+    model: Optional[str] = None,
+    tts_service: TTSService = Depends(get_tts_service),
+    stt_service: STTService = Depends(get_stt_service),
+    llm_service: LLMService = Depends(get_llm_service)
 ):
     """Process audio query through LLM and return audio response"""
     start_time = time.time()
@@ -166,22 +191,27 @@ async def audio_llm_query(
             raise HTTPException(status_code=400, detail="File must be an audio file")
         
         # Transcribe audio
-        file_content = await audio_file.read()
-        transcription = await stt_service.transcribe_uploaded_file(file_content, audio_file.filename)
+        with log_stage("stt"):
+            with start_span("agent.upload_read") as span:
+                file_content = await audio_file.read()
+                span.set_attribute("bytes", len(file_content))
+            transcription = await stt_service.transcribe_uploaded_file(file_content, audio_file.filename)
         
         if not transcription.success:
             raise HTTPException(status_code=500, detail=f"Transcription failed: {transcription.message}")
         
         # Query LLM
         llm_request = LLMQueryRequest(text=transcription.transcript, model=model)
-        llm_response = await llm_service.query_llm(llm_request)
+        with log_stage("llm"):
+            llm_response = await llm_service.query_llm(llm_request, route="agent.audio_query")
         
         if not llm_response.success:
             raise HTTPException(status_code=500, detail=f"LLM query failed: {llm_response.message}")
         
         # Convert response to speech
         tts_request = TTSRequest(text=llm_response.response)
-        tts_response = await tts_service.text_to_speech(tts_request)
+        with log_stage("tts"):
+            tts_response = await tts_service.text_to_speech(tts_request)
         
         if not tts_response.success:
             raise HTTPException(status_code=500, detail=f"TTS failed: {tts_response.message}")
@@ -205,48 +235,124 @@ async def audio_llm_query(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Audio LLM query error: {str(e)}")
+        logger.error("Audio LLM query error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/sessions/count")
+async def count_chat_sessions(session_store: SessionStore = Depends(get_chat_session_store)):
+    """Get the number of chat sessions without listing them"""
+    return {
+        "success": True,
+        "total_sessions": await session_store.count()
+    }
+
+@router.get("/sessions/stats")
+async def get_session_store_stats(session_store: SessionStore = Depends(get_chat_session_store)):
+    """Get session store size and memory usage"""
+    return {
+        "success": True,
+        "stats": session_store.stats()
+    }
+
+@router.get("/sessions/export")
+async def export_chat_sessions(
+    sort_by: str = "created_at",
+    order: str = "asc",
+    min_messages: Optional[int] = None,
+    max_messages: Optional[int] = None,
+    min_age_seconds: Optional[float] = None,
+    max_age_seconds: Optional[float] = None,
+    session_store: SessionStore = Depends(get_chat_session_store)
+):
+    """Stream all (or filtered) chat sessions as NDJSON, one session per line"""
+    try:
+        query = SessionQuery(
+            sort_by=sort_by,
+            descending=order.lower() != "asc",
+            limit=100,
+            min_messages=min_messages,
+            max_messages=max_messages,
+            min_age=min_age_seconds,
+            max_age=max_age_seconds
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(
+        export_sessions(session_store, query),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=sessions.ndjson"}
+    )
+
+@router.post("/sessions/import")
+async def import_chat_sessions(request: Request, skip_lines: int = Query(0, ge=0), session_store: SessionStore = Depends(get_chat_session_store)):
+    """Import sessions from an NDJSON body, skipping the first skip_lines lines to resume"""
+    try:
+        result = await SessionImporter(session_store).run(request.stream(), skip_lines=skip_lines)
+    except SessionImportError as e:
+        # Tell the client where to resume with skip_lines
+        raise HTTPException(status_code=500, detail=e.result)
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result)
+    return result
+
 @router.get("/sessions/{session_id}")
-async def get_chat_session(session_id: str):
-    """Get chat session details"""
-    if session_id not in chat_sessions:
+async def get_chat_session(session_id: str, last_n: Optional[int] = Query(None, ge=1), session_store: SessionStore = Depends(get_chat_session_store)):
+    """Get chat session details, optionally only the newest last_n messages"""
+    session = await session_store.get(session_id, last_n=last_n)
+    if session is None:
         raise HTTPException(status_code=404, detail="Chat session not found")
     
-    session = chat_sessions[session_id]
     return {
         "success": True,
         "session": session,
-        "message_count": len(session.messages)
+        "message_count": await session_store.message_count(session_id)
     }
 
 @router.get("/sessions")
-async def list_chat_sessions():
-    """List all chat sessions"""
-    sessions = []
-    for session_id, session in chat_sessions.items():
-        sessions.append({
-            "session_id": session_id,
-            "message_count": len(session.messages),
-            "created_at": session.created_at,
-            "updated_at": session.updated_at
-        })
+async def list_chat_sessions(
+    sort_by: str = "updated_at",
+    order: str = "desc",
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    min_messages: Optional[int] = None,
+    max_messages: Optional[int] = None,
+    min_age_seconds: Optional[float] = None,
+    max_age_seconds: Optional[float] = None,
+    session_store: SessionStore = Depends(get_chat_session_store)
+):
+    """List chat sessions one page at a time"""
+    try:
+        query = SessionQuery(
+            sort_by=sort_by,
+            descending=order.lower() != "asc",
+            cursor=cursor,
+            limit=limit,
+            min_messages=min_messages,
+            max_messages=max_messages,
+            min_age=min_age_seconds,
+            max_age=max_age_seconds
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    sessions, next_cursor = await session_store.list_sessions(query)
     
     return {
         "success": True,
         "sessions": sessions,
-        "total_sessions": len(sessions)
+        "count": len(sessions),
+        "next_cursor": next_cursor,
+        "total_sessions": await session_store.count()
     }
 
 @router.delete("/sessions/{session_id}")
-async def delete_chat_session(session_id: str):
+async def delete_chat_session(session_id: str, session_store: SessionStore = Depends(get_chat_session_store)):
     """Delete a chat session"""
-    if session_id not in chat_sessions:
+    if not await session_store.delete(session_id):
         raise HTTPException(status_code=404, detail="Chat session not found")
     
-    del chat_sessions[session_id]
-    logger.info(f"Chat session {session_id} deleted")
+    logger.info("Chat session %s deleted", session_id)
     
     return {
         "success": True,
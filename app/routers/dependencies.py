@@ -0,0 +1,26 @@
+from fastapi import Request
+from app.services.llm_service import LLMService
+from app.services.registry import ServiceRegistry
+from app.services.session_store import SessionStore
+from app.services.stt_service import STTService
+from app.services.tts_service import TTSService
+from app.utils.file_utils import FileUtils
+
+def get_services(request: Request) -> ServiceRegistry:
+    """The service registry created in the application lifespan"""
+    return request.app.state.services
+
+def get_tts_service(request: Request) -> TTSService:
+    return get_services(request).tts
+
+def get_stt_service(request: Request) -> STTService:
+    return get_services(request).stt
+
+def get_llm_service(request: Request) -> LLMService:
+    return get_services(request).llm
+
+def get_file_utils(request: Request) -> FileUtils:
+    return get_services(request).file_utils
+
+def get_chat_session_store(request: Request) -> SessionStore:
+    return get_services(request).session_store
@@ -1,8 +1,16 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
 import time
 import os
 from app.models.schemas import HealthResponse, DetailedHealthResponse
-from app.utils.logging import get_logger
+from app.services.provider_probes import PLACEHOLDER_KEYS, get_provider_prober
+from app.services.resilience import resilience_stats
+from app.services.upload_janitor import get_upload_janitor
+from app.services.worker_health import get_worker_health
+from app.utils.upload_usage import get_upload_usage
+from app.utils.blob_store import get_blob_store
+from app.utils.logging import get_logger, logging_stats
+from app.utils.tracing import get_tracer
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/api/health", tags=["health"])
@@ -16,82 +24,100 @@ async def health_check():
         message="Voice Agents Backend is running!"
     )
 
+@router.get("/live")
+async def liveness_check():
+    """Liveness: the worker's event loop is answering"""
+    return get_worker_health().liveness()
+
+@router.get("/ready")
+async def readiness_check():
+    """Readiness: warm-up finished, not shutting down and no required provider circuit open or repeatedly failing probes; 503 otherwise"""
+    ready, body = get_worker_health().readiness()
+    return JSONResponse(status_code=200 if ready else 503, content=body)
+
+@router.get("/saturation")
+async def saturation_check():
+    """Saturation: event loop lag, in-flight work and queue depth; 503 when over the limits"""
+    saturated, body = get_worker_health().saturation()
+    return JSONResponse(status_code=503 if saturated else 200, content=body)
+
+# Detailed health service names for each probed provider
+HEALTH_SERVICES = {"assembly_ai": "assemblyai", "gemini_llm": "gemini", "murf_tts": "murf"}
+
 @router.get("/detailed", response_model=DetailedHealthResponse)
 async def detailed_health_check():
-    """Detailed health check that monitors all API services"""
+    """Detailed health check that reports the latest background probe of each API service"""
     logger.info("Detailed health check requested")
     
     health_status = {
         "overall_status": "healthy",
         "timestamp": time.time(),
-        "services": {
-            "assembly_ai": {"status": "unknown", "message": ""},
-            "gemini_llm": {"status": "unknown", "message": ""},
-            "murf_tts": {"status": "unknown", "message": ""}
-        }
+        "services": {}
     }
     
-    # Check AssemblyAI
-    try:
-        assembly_ai_key = os.getenv("ASSEMBLY_AI_API_KEY", "YOUR_ASSEMBLY_AI_API_KEY_HERE")
-        if assembly_ai_key == "YOUR_ASSEMBLY_AI_API_KEY_HERE":
-            health_status["services"]["assembly_ai"] = {
-                "status": "error",
-                "message": "API key not configured"
-            }
-        else:
-            health_status["services"]["assembly_ai"] = {
-                "status": "configured",
-                "message": "API key configured"
-            }
-    except Exception as e:
-        health_status["services"]["assembly_ai"] = {
-            "status": "error",
-            "message": str(e)
-        }
-    
-    # Check Gemini
-    try:
-        gemini_key = os.getenv("GEMINI_API_KEY", "YOUR_GEMINI_API_KEY_HERE")
-        if gemini_key == "YOUR_GEMINI_API_KEY_HERE":
-            health_status["services"]["gemini_llm"] = {
-                "status": "error",
-                "message": "API key not configured"
-            }
-        else:
-            health_status["services"]["gemini_llm"] = {
-                "status": "configured",
-                "message": "API key configured"
-            }
-    except Exception as e:
-        health_status["services"]["gemini_llm"] = {
-            "status": "error",
-            "message": str(e)
-        }
-    
-    # Check Murf
-    try:
-        murf_key = os.getenv("MURF_API_KEY", "YOUR_MURF_API_KEY_HERE")
-        if murf_key == "YOUR_MURF_API_KEY_HERE":
-            health_status["services"]["murf_tts"] = {
+    # Probes run in the background; this only reads their cached results
+    probes = get_provider_prober().snapshot()
+    for service, provider in HEALTH_SERVICES.items():
+        probe = probes.get(provider)
+        if probe and probe["status"] not in ("unknown", "not_configured"):
+            health_status["services"][service] = probe
+            continue
+        
+        # Not probed (yet) or no key: fall back to checking the API key is set
+        env_name, placeholder = PLACEHOLDER_KEYS[provider]
+        if os.getenv(env_name, placeholder) == placeholder:
+            health_status["services"][service] = {
                 "status": "error",
                 "message": "API key not configured"
             }
         else:
-            health_status["services"]["murf_tts"] = {
+            health_status["services"][service] = {
                 "status": "configured",
                 "message": "API key configured"
             }
-    except Exception as e:
-        health_status["services"]["murf_tts"] = {
-            "status": "error",
-            "message": str(e)
-        }
     
     # Determine overall status
     error_count = sum(1 for service in health_status["services"].values() if service["status"] == "error")
     if error_count > 0:
         health_status["overall_status"] = "degraded" if error_count < len(health_status["services"]) else "unhealthy"
     
-    logger.info(f"Health check completed: {health_status['overall_status']}")
+    logger.info("Health check completed: %s", health_status['overall_status'])
     return DetailedHealthResponse(**health_status)
+
+@router.get("/resilience")
+async def resilience_status():
+    """Circuit breaker state and retry counters for each upstream provider"""
+    return {
+        "success": True,
+        "timestamp": time.time(),
+        "providers": resilience_stats()
+    }
+
+@router.get("/uploads")
+async def uploads_status():
+    """Uploads disk usage, janitor activity and reclaimed disk space"""
+    return {
+        "success": True,
+        "timestamp": time.time(),
+        "usage": get_upload_usage().stats(),
+        "storage": get_blob_store().stats(),
+        "janitor": get_upload_janitor().stats()
+    }
+
+@router.get("/logging")
+async def logging_status():
+    """Log queue depth and records dropped under pressure"""
+    return {
+        "success": True,
+        "timestamp": time.time(),
+        "logging": logging_stats()
+    }
+
+@router.get("/tracing")
+async def tracing_status():
+    """Spans recorded, exported and dropped"""
+    return {
+        "success": True,
+        "timestamp": time.time(),
+        "tracing": get_tracer().stats()
+    }
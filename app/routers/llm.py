@@ -1,40 +1,108 @@
-from fastapi import APIRouter, HTTPException
-from app.models.schemas import LLMRequest, LLMResponse, LLMQueryRequest, LLMQueryResponse
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi.responses import StreamingResponse
+import json
+import time
+from app.models.schemas import (
+    LLMRequest, LLMResponse, LLMQueryRequest, LLMQueryResponse,
+    LLMBatchRequest, LLMBatchResponse, PromptPrefixRequest
+)
+from app.services.llm_cache import cache_bypass_requested
 from app.services.llm_service import LLMService
+from app.routers.dependencies import get_llm_service
 from app.utils.logging import get_logger
+from app.utils.sse import format_sse
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/api/llm", tags=["llm"])
 
-# Initialize LLM service
-llm_service = LLMService()
-
 @router.post("/generate", response_model=LLMResponse)
-async def generate_llm_response(request: LLMRequest):
+async def generate_llm_response(
+    request: LLMRequest,
+    cache_control: Optional[str] = Header(None),
+    x_llm_cache: Optional[str] = Header(None),
+    llm_service: LLMService = Depends(get_llm_service)
+):
     """Generate response using LLM"""
-    logger.info(f"LLM generation request: {len(request.text)} characters")
+    logger.info("LLM generation request: %s characters", len(request.text))
     
     try:
-        response = await llm_service.generate_response(request)
+        use_cache = not cache_bypass_requested(cache_control, x_llm_cache)
+        response = await llm_service.generate_response(request, use_cache=use_cache)
         return response
     except Exception as e:
-        logger.error(f"LLM generation endpoint error: {str(e)}")
+        logger.error("LLM generation endpoint error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/query", response_model=LLMQueryResponse)
-async def query_llm(request: LLMQueryRequest):
+async def query_llm(
+    request: LLMQueryRequest,
+    cache_control: Optional[str] = Header(None),
+    x_llm_cache: Optional[str] = Header(None),
+    llm_service: LLMService = Depends(get_llm_service)
+):
     """Query LLM with advanced parameters"""
-    logger.info(f"LLM query request: {len(request.text)} characters")
+    logger.info("LLM query request: %s characters", len(request.text))
     
     try:
-        response = await llm_service.query_llm(request)
+        use_cache = not cache_bypass_requested(cache_control, x_llm_cache)
+        response = await llm_service.query_llm(request, use_cache=use_cache)
         return response
     except Exception as e:
-        logger.error(f"LLM query endpoint error: {str(e)}")
+        logger.error("LLM query endpoint error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/stream")
+async def stream_llm(request: LLMQueryRequest, llm_service: LLMService = Depends(get_llm_service)):
+    """Stream LLM response tokens as Server-Sent Events"""
+    logger.info("LLM stream request: %s characters", len(request.text))
+    
+    async def event_stream():
+        async for event in llm_service.stream_query(request):
+            yield format_sse(event["data"], event=event["event"])
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+@router.post("/batch", response_model=LLMBatchResponse)
+async def batch_query_llm(request: LLMBatchRequest, llm_service: LLMService = Depends(get_llm_service)):
+    """Run a batch of LLM queries concurrently"""
+    logger.info("LLM batch request: %s items, concurrency=%s", len(request.items), request.concurrency)
+    
+    if not request.items:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one item")
+    if len(request.items) > llm_service.batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch exceeds the limit of {llm_service.batch_max_items} items"
+        )
+    
+    if request.stream:
+        async def ndjson_stream():
+            start_time = time.time()
+            results = []
+            async for item in llm_service.stream_batch(request.items, request.concurrency):
+                results.append(item)
+                yield item.model_dump_json() + "\n"
+            summary = llm_service.batch_summary(request.items, results, time.time() - start_time)
+            yield json.dumps({"summary": summary}) + "\n"
+        
+        return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+    
+    try:
+        return await llm_service.run_batch(request.items, request.concurrency)
+    except Exception as e:
+        logger.error("LLM batch endpoint error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/models")
-async def get_available_models():
+async def get_available_models(llm_service: LLMService = Depends(get_llm_service)):
     """Get list of available LLM models"""
     logger.info("LLM models list requested")
     
@@ -47,5 +115,87 @@ async def get_available_models():
             "default_model": llm_service.default_model
         }
     except Exception as e:
-        logger.error(f"Error getting models: {str(e)}")
+        logger.error("Error getting models: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/prefixes")
+async def register_prompt_prefix(request: PromptPrefixRequest, llm_service: LLMService = Depends(get_llm_service)):
+    """Register a named system prompt / shared context prefix"""
+    logger.info("Prompt prefix registration: %s (%s characters)", request.name, len(request.text))
+    
+    try:
+        prefix = llm_service.prefixes.register(request.name, request.text)
+        return {
+            "success": True,
+            "prefix": prefix.to_dict()
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Prompt prefix registration error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/prefixes")
+async def list_prompt_prefixes(llm_service: LLMService = Depends(get_llm_service)):
+    """List prompt prefixes with reuse metrics"""
+    return {
+        "success": True,
+        **llm_service.prefixes.stats()
+    }
+
+@router.delete("/prefixes/{name}")
+async def delete_prompt_prefix(name: str, llm_service: LLMService = Depends(get_llm_service)):
+    """Remove a prompt prefix"""
+    if not llm_service.prefixes.remove(name):
+        raise HTTPException(status_code=404, detail="Prompt prefix not found")
+    
+    return {
+        "success": True,
+        "message": f"Prompt prefix {name} removed"
+    }
+
+@router.get("/routing")
+async def get_routing_stats(llm_service: LLMService = Depends(get_llm_service)):
+    """Get model routing, live latency and hedging statistics"""
+    return {
+        "success": True,
+        "routing": llm_service.router.stats()
+    }
+
+@router.get("/cache")
+async def get_cache_stats(llm_service: LLMService = Depends(get_llm_service)):
+    """Get LLM response cache statistics"""
+    return {
+        "success": True,
+        "cache": llm_service.cache.stats()
+    }
+
+@router.delete("/cache")
+async def clear_cache(llm_service: LLMService = Depends(get_llm_service)):
+    """Clear the LLM response cache"""
+    removed = llm_service.cache.clear()
+    return {
+        "success": True,
+        "message": f"Removed {removed} cached responses"
+    }
+
+@router.get("/usage")
+async def get_token_usage(llm_service: LLMService = Depends(get_llm_service)):
+    """Get token usage aggregated by model, route and session"""
+    return {
+        "success": True,
+        "usage": llm_service.accountant.stats()
+    }
+
+@router.get("/usage/{session_id}")
+async def get_session_token_usage(session_id: str, llm_service: LLMService = Depends(get_llm_service)):
+    """Get token usage and remaining budget for a session"""
+    usage = llm_service.accountant.session_usage(session_id)
+    if usage is None:
+        raise HTTPException(status_code=404, detail="No token usage recorded for this session")
+    
+    return {
+        "success": True,
+        "session_id": session_id,
+        "usage": usage
+    }
@@ -0,0 +1,28 @@
+from typing import Awaitable, Callable
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import Response
+from app.services.session_store import InMemorySessionStore
+from app.utils.logging import get_logger
+from app.utils.metrics import CONTENT_TYPE, SESSION_STORE_SESSIONS, get_metrics_registry
+
+logger = get_logger(__name__)
+router = APIRouter(tags=["metrics"])
+
+registry = get_metrics_registry()
+
+def session_store_collector(app: FastAPI) -> Callable[[], Awaitable[None]]:
+    """Collector for the size of the session store in the app's service registry"""
+    async def collect_session_store():
+        services = getattr(app.state, "services", None)
+        if services is None:
+            return
+        session_store = services.session_store
+        # Each worker holds its own in-memory sessions; shared backends report the same count everywhere
+        SESSION_STORE_SESSIONS.multiprocess_mode = "sum" if isinstance(session_store, InMemorySessionStore) else "max"
+        SESSION_STORE_SESSIONS.set(await session_store.count())
+    return collect_session_store
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for all workers"""
+    return Response(content=await registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,27 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+from app.utils.logging import get_logger
+from app.utils.profiler import get_request_profiler
+
+logger = get_logger(__name__)
+router = APIRouter(prefix="/api/profiles", tags=["profiles"])
+
+profiler = get_request_profiler()
+
+@router.get("")
+async def list_profiles(limit: int = Query(50, ge=1, le=500)):
+    """List captured request profiles, newest first"""
+    return {
+        "success": True,
+        "profiler": profiler.stats(),
+        "profiles": await asyncio.to_thread(profiler.list_profiles, limit)
+    }
+
+@router.get("/{profile_id}")
+async def download_profile(profile_id: str):
+    """Download a profile as folded stacks for flamegraph.pl or speedscope"""
+    path = await asyncio.to_thread(profiler.profile_path, profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=path.name)
@@ -1,20 +1,17 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from app.models.schemas import TranscriptionResponse, AudioUploadResponse
 from app.services.stt_service import STTService
 from app.utils.file_utils import FileUtils
+from app.routers.dependencies import get_file_utils, get_stt_service
 from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/api/stt", tags=["stt"])
 
-# Initialize services
-stt_service = STTService()
-file_utils = FileUtils()
-
 @router.post("/transcribe-file", response_model=TranscriptionResponse)
-async def transcribe_audio_file(file: UploadFile = File(...)):
+async def transcribe_audio_file(file: UploadFile = File(...), stt_service: STTService = Depends(get_stt_service)):
     """Transcribe uploaded audio file"""
-    logger.info(f"Audio transcription request: {file.filename}")
+    logger.info("Audio transcription request: %s", file.filename)
     
     try:
         # Validate file type
@@ -31,26 +28,26 @@ async def transcribe_audio_file(file: UploadFile = File(...)):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"STT endpoint error: {str(e)}")
+        logger.error("STT endpoint error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/transcribe-path", response_model=TranscriptionResponse)
-async def transcribe_audio_path(file_path: str):
+async def transcribe_audio_path(file_path: str, stt_service: STTService = Depends(get_stt_service)):
     """Transcribe audio file from path"""
-    logger.info(f"Audio transcription from path: {file_path}")
+    logger.info("Audio transcription from path: %s", file_path)
     
     try:
         response = await stt_service.transcribe_audio(file_path)
         return response
         
     except Exception as e:
-        logger.error(f"STT path endpoint error: {str(e)}")
+        logger.error("STT path endpoint error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/upload", response_model=AudioUploadResponse)
-async def upload_audio_file(file: UploadFile = File(...)):
+async def upload_audio_file(file: UploadFile = File(...), file_utils: FileUtils = Depends(get_file_utils)):
     """Upload audio file for later transcription"""
-    logger.info(f"Audio upload request: {file.filename}")
+    logger.info("Audio upload request: %s", file.filename)
     
     try:
         # Validate file type
@@ -75,11 +72,11 @@ async def upload_audio_file(file: UploadFile = File(...)):
             upload_path=filepath
         )
         
-        logger.info(f"Audio upload successful: {filename}")
+        logger.info("Audio upload successful: %s", filename)
         return response
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Upload endpoint error: {str(e)}")
+        logger.error("Upload endpoint error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
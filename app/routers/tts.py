@@ -1,28 +1,26 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from app.models.schemas import TTSRequest, TTSResponse
 from app.services.tts_service import TTSService
+from app.routers.dependencies import get_tts_service
 from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
 router = APIRouter(prefix="/api/tts", tags=["tts"])
 
-# Initialize TTS service
-tts_service = TTSService()
-
 @router.post("/generate", response_model=TTSResponse)
-async def generate_speech(request: TTSRequest):
+async def generate_speech(request: TTSRequest, tts_service: TTSService = Depends(get_tts_service)):
     """Convert text to speech"""
-    logger.info(f"TTS request received: {len(request.text)} characters")
+    logger.info("TTS request received: %s characters", len(request.text))
     
     try:
         response = await tts_service.text_to_speech(request)
         return response
     except Exception as e:
-        logger.error(f"TTS endpoint error: {str(e)}")
+        logger.error("TTS endpoint error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/voices")
-async def get_available_voices():
+async def get_available_voices(tts_service: TTSService = Depends(get_tts_service)):
     """Get list of available voices"""
     logger.info("Voice list requested")
     
@@ -34,5 +32,5 @@ async def get_available_voices():
             "count": len(voices)
         }
     except Exception as e:
-        logger.error(f"Error getting voices: {str(e)}")
+        logger.error("Error getting voices: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -2,3 +2,17 @@
 from .tts_service import TTSService
 from .stt_service import STTService
 from .llm_service import LLMService
+from .llm_clients import LLMClientRegistry, get_llm_client_registry
+from .llm_cache import LLMResponseCache, get_llm_response_cache
+from .token_accounting import TokenAccountant, get_token_accountant
+from .llm_router import ModelRouter, get_model_router
+from .resilience import ResilientClient, get_resilient_client
+from .prompt_prefixes import PromptPrefixRegistry, get_prompt_prefix_registry
+from .session_store import SessionStore, InMemorySessionStore, get_session_store
+from .message_log import MessageLog
+from .resp_client import RespPool, RespCache, get_resp_pool
+from .redis_session_store import RedisSessionStore
+from .upload_janitor import UploadJanitor, get_upload_janitor
+from .provider_probes import ProviderProber, get_provider_prober
+from .worker_health import WorkerHealth, get_worker_health
+from .registry import ServiceRegistry
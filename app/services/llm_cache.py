@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+BYPASS_HEADER = "X-LLM-Cache"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = " .!?;,"
+
+def normalize_prompt(text: str) -> str:
+    """Normalize prompt text so trivially different phrasings share a cache entry"""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    return text.rstrip(_TRAILING_PUNCTUATION)
+
+def cache_bypass_requested(cache_control: Optional[str] = None, llm_cache: Optional[str] = None) -> bool:
+    """Check request headers for a cache bypass"""
+    if llm_cache and llm_cache.strip().lower() in ("bypass", "off", "no-cache"):
+        return True
+    if cache_control:
+        directives = {d.strip().lower() for d in cache_control.split(",")}
+        if directives & {"no-cache", "no-store"}:
+            return True
+    return False
+
+class LLMResponseCache:
+    """Bounded TTL cache for low-temperature LLM responses.
+
+    With ``LLM_CACHE_BACKEND=redis`` entries are also written to a shared
+    Redis-protocol cache, so a response generated on one node is served
+    from the local tier on any other node after its first lookup there.
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        max_temperature: Optional[float] = None,
+        shared=None
+    ):
+        if enabled is None:
+            enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.max_entries = max_entries or int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+        self.max_temperature = (
+            max_temperature if max_temperature is not None
+            else float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.3"))
+        )
+        if shared is None and os.getenv("LLM_CACHE_BACKEND", "memory").lower() == "redis":
+            from app.services.resp_client import RespCache, get_resp_pool
+            shared = RespCache(get_resp_pool(), "llm")
+        self.shared = shared
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.ineligible = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.shared_hits = 0
+        self.shared_errors = 0
+
+    def is_eligible(self, temperature: Optional[float]) -> bool:
+        """Only cache requests that are (close to) deterministic.
+
+        A missing temperature means the model samples at its default
+        (around 1.0 for Gemini), so those requests are not cached.
+        """
+        if not self.enabled or temperature is None:
+            return False
+        return temperature <= self.max_temperature
+
+    def make_key(
+        self,
+        text: str,
+        model: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """Build a cache key from the normalized prompt and generation settings"""
+        raw = json.dumps([normalize_prompt(text), model, temperature, max_tokens])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup_key(
+        self,
+        text: str,
+        model: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        bypass: bool = False
+    ) -> Optional[str]:
+        """Return the cache key for a request, or None if it must not be cached"""
+        if not self.enabled:
+            return None
+        if bypass:
+            self.bypasses += 1
+            return None
+        if not self.is_eligible(temperature):
+            self.ineligible += 1
+            return None
+        return self.make_key(text, model, temperature, max_tokens)
+
+    async def get(self, key: str) -> Optional[dict]:
+        """Get a cached response payload"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < time.time():
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+
+        if entry is None:
+            payload = await self._get_shared(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+            self.hits += 1
+            self._put_local(key, payload)
+            return payload
+
+        expires_at, payload = entry
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    async def set(self, key: str, payload: dict):
+        """Store a response payload"""
+        self._put_local(key, payload)
+        if self.shared is not None:
+            try:
+                await self.shared.set(key, payload, self.ttl_seconds)
+            except Exception as e:
+                self.shared_errors += 1
+                logger.warning("Shared LLM cache write failed: %s", e)
+
+    def _put_local(self, key: str, payload: dict):
+        self._entries[key] = (time.time() + self.ttl_seconds, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def _get_shared(self, key: str) -> Optional[dict]:
+        if self.shared is None:
+            return None
+        try:
+            return await self.shared.get(key)
+        except Exception as e:
+            # The shared tier is an optimization; fall back to a miss
+            self.shared_errors += 1
+            logger.warning("Shared LLM cache read failed: %s", e)
+            return None
+
+    def clear(self) -> int:
+        """Remove all cached responses held by this process (shared entries expire by TTL)"""
+        count = len(self._entries)
+        self._entries.clear()
+        logger.info("LLM response cache cleared: %s entries removed", count)
+        return count
+
+    def stats(self) -> dict:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": "redis" if self.shared is not None else "memory",
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "max_temperature": self.max_temperature,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "ineligible": self.ineligible,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "shared_hits": self.shared_hits,
+            "shared_errors": self.shared_errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+_cache: Optional[LLMResponseCache] = None
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """Get the process-wide LLM response cache"""
+    global _cache
+    if _cache is None:
+        _cache = LLMResponseCache()
+    return _cache
@@ -0,0 +1,121 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+import google.generativeai as genai
+from app.services.llm_router import DEFAULT_MODEL, FALLBACK_MODEL, FAST_MODEL
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Models warmed at startup: every model the router can pick on its own
+DEFAULT_WARM_MODELS = tuple(dict.fromkeys((DEFAULT_MODEL, FAST_MODEL, FALLBACK_MODEL)))
+
+ModelKey = Tuple[str, Optional[int], Optional[float]]
+
+class LLMClientRegistry:
+    """Creates Gemini model handles once and reuses them across requests.
+
+    Handles are keyed by (model name, max_output_tokens, temperature). All of
+    them share the process-wide Gemini client created by ``genai.configure``,
+    so the underlying transport and its connections are reused as well.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, max_models: Optional[int] = None):
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY", "YOUR_GEMINI_API_KEY_HERE")
+        self.max_models = max_models or int(os.getenv("LLM_CLIENT_POOL_SIZE", "32"))
+        self._models: "OrderedDict[ModelKey, genai.GenerativeModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._configured = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self):
+        """Configure the shared Gemini client once per process"""
+        if self._configured:
+            return
+        with self._lock:
+            if not self._configured:
+                genai.configure(api_key=self.api_key)
+                self._configured = True
+                logger.info("Gemini client configured")
+
+    def get_model(
+        self,
+        model_name: str,
+        max_output_tokens: Optional[int] = None,
+        temperature: Optional[float] = None
+    ) -> genai.GenerativeModel:
+        """Return a cached model handle for the given generation settings"""
+        key = (model_name, max_output_tokens, temperature)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return model
+
+        self.configure()
+
+        generation_config = None
+        if max_output_tokens is not None or temperature is not None:
+            generation_config = genai.types.GenerationConfig(
+                max_output_tokens=max_output_tokens,
+                temperature=temperature
+            )
+        model = genai.GenerativeModel(model_name=model_name, generation_config=generation_config)
+
+        with self._lock:
+            # Another request may have built the same handle in the meantime
+            existing = self._models.get(key)
+            if existing is not None:
+                self.hits += 1
+                return existing
+            self._models[key] = model
+            self.misses += 1
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+                self.evictions += 1
+        return model
+
+    def warm(self, model_names: Iterable[str] = DEFAULT_WARM_MODELS):
+        """Pre-build model handles and the shared client before the first request"""
+        self.configure()
+        for model_name in model_names:
+            self.get_model(model_name)
+
+        # Creating the default clients sets up the transport ahead of time
+        try:
+            from google.generativeai import client as genai_client
+            for factory_name in ("get_default_generative_client", "get_default_generative_async_client"):
+                factory = getattr(genai_client, factory_name, None)
+                if factory is not None:
+                    factory()
+        except Exception as e:
+            logger.warning("Gemini client warm-up skipped: %s", e)
+
+        logger.info("LLM client registry warmed: %s model handles", len(self._models))
+
+    def stats(self) -> dict:
+        """Get registry usage statistics"""
+        with self._lock:
+            return {
+                "models": len(self._models),
+                "max_models": self.max_models,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+_registry: Optional[LLMClientRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_llm_client_registry() -> LLMClientRegistry:
+    """Get the process-wide LLM client registry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = LLMClientRegistry()
+    return _registry
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Single source of truth for LLM model defaults; all GA models; set LLM_FAST_MODEL
+# to opt in to an experimental model such as gemini-2.0-flash-exp
+DEFAULT_MODEL = os.getenv("LLM_DEFAULT_MODEL", "gemini-1.5-flash")
+FAST_MODEL = os.getenv("LLM_FAST_MODEL", "gemini-1.5-flash-8b")
+FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "gemini-1.5-flash")
+
+class ModelLatencyTracker:
+    """Rolling window of call latencies for one model"""
+
+    def __init__(self, window: int = 200):
+        self.samples: deque = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.cancelled = 0
+
+    def record(self, latency: float, success: bool = True):
+        self.samples.append(latency)
+        self.calls += 1
+        if not success:
+            self.errors += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "samples": len(self.samples),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95)
+        }
+
+class ModelRouter:
+    """Chooses a Gemini model per request and hedges slow calls to a fallback model"""
+
+    def __init__(
+        self,
+        default_model: str = DEFAULT_MODEL,
+        fast_model: str = FAST_MODEL,
+        fallback_model: str = FALLBACK_MODEL
+    ):
+        self.default_model = default_model
+        self.fast_model = fast_model
+        self.fallback_model = fallback_model
+        # Prompts longer than this go to the default model rather than the fast one
+        self.long_prompt_chars = int(os.getenv("LLM_LONG_PROMPT_CHARS", "2000"))
+        self.latency_slo = float(os.getenv("LLM_LATENCY_SLO_MS", "2500")) / 1000
+        self.hedge_enabled = os.getenv("LLM_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.hedge_min_delay = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "300")) / 1000
+        self.min_samples = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+        self.trackers: Dict[str, ModelLatencyTracker] = {}
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    def tracker(self, model: str) -> ModelLatencyTracker:
+        tracker = self.trackers.get(model)
+        if tracker is None:
+            tracker = self.trackers[model] = ModelLatencyTracker()
+        return tracker
+
+    def choose_model(self, prompt_text: str, requested_model: Optional[str] = None) -> str:
+        """Pick a model from the prompt length and live latency, unless one was requested"""
+        if requested_model:
+            return requested_model
+
+        preferred = self.fast_model if len(prompt_text) <= self.long_prompt_chars else self.default_model
+        alternative = self.default_model if preferred == self.fast_model else self.fast_model
+
+        # Move off a model that is currently missing the SLO if the other one is meeting it
+        preferred_p95 = self.tracker(preferred).percentile(95)
+        alternative_p95 = self.tracker(alternative).percentile(95)
+        if (
+            preferred_p95 is not None and preferred_p95 > self.latency_slo
+            and alternative_p95 is not None and alternative_p95 <= self.latency_slo
+        ):
+            return alternative
+        return preferred
+
+    def fallback_for(self, model: str) -> Optional[str]:
+        """Model to hedge against, or None if there is no distinct fallback"""
+        for candidate in (self.fallback_model, self.fast_model, self.default_model):
+            if candidate != model:
+                return candidate
+        return None
+
+    def hedge_delay(self, model: str) -> float:
+        """Delay before firing a hedge: the model's p95, or the SLO until enough samples exist"""
+        tracker = self.tracker(model)
+        if len(tracker.samples) < self.min_samples:
+            return self.latency_slo
+        return max(tracker.percentile(95), self.hedge_min_delay)
+
+    async def _timed(self, model: str, call: Callable[[str], Awaitable[T]]) -> T:
+        start_time = time.time()
+        try:
+            result = await call(model)
+        except asyncio.CancelledError:
+            # A cancelled call took at least this long; keep it as a lower bound
+            self.tracker(model).cancelled += 1
+            self.tracker(model).samples.append(time.time() - start_time)
+            raise
+        except Exception:
+            self.tracker(model).record(time.time() - start_time, success=False)
+            raise
+        self.tracker(model).record(time.time() - start_time)
+        return result
+
+    async def run(self, model: str, call: Callable[[str], Awaitable[T]]) -> Tuple[T, str]:
+        """Run call(model), hedging to a fallback model if it is slower than its p95.
+
+        Returns the first successful result and the model that produced it;
+        the losing call is cancelled.
+        """
+        fallback = self.fallback_for(model) if self.hedge_enabled else None
+        if fallback is None:
+            return await self._timed(model, call), model
+
+        primary = asyncio.ensure_future(self._timed(model, call))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_delay(model))
+            if done:
+                return primary.result(), model
+
+            self.hedges_fired += 1
+            logger.info("Hedging slow %s call with %s", model, fallback)
+            hedge = asyncio.ensure_future(self._timed(fallback, call))
+            attempts = {primary: model, hedge: fallback}
+            pending = set(attempts)
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedges_won += 1
+                        return task.result(), attempts[task]
+            # Both attempts failed: surface the primary's error
+            return primary.result(), model
+        finally:
+            # Also reached when the caller is cancelled while waiting
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        """Get routing and hedging statistics"""
+        return {
+            "default_model": self.default_model,
+            "fast_model": self.fast_model,
+            "fallback_model": self.fallback_model,
+            "latency_slo_ms": self.latency_slo * 1000,
+            "hedge_enabled": self.hedge_enabled,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "models": {model: tracker.to_dict() for model, tracker in self.trackers.items()}
+        }
+
+_router: Optional[ModelRouter] = None
+
+def get_model_router() -> ModelRouter:
+    """Get the process-wide model router"""
+    global _router
+    if _router is None:
+        _router = ModelRouter()
+    return _router
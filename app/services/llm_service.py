@@ -1,95 +1,425 @@
+import asyncio
 import os
 import time
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import google.generativeai as genai
-from app.models.schemas import LLMRequest, LLMResponse, LLMQueryRequest, LLMQueryResponse
+from app.models.schemas import (
+    LLMRequest, LLMResponse, LLMQueryRequest, LLMQueryResponse,
+    LLMBatchItemResult, LLMBatchResponse
+)
+from app.services.llm_cache import LLMResponseCache, get_llm_response_cache
+from app.services.llm_clients import LLMClientRegistry, get_llm_client_registry
+from app.services.llm_router import ModelRouter, get_model_router
+from app.services.prompt_prefixes import PromptPrefix, PromptPrefixRegistry, get_prompt_prefix_registry
+from app.services.resilience import ResilientClient, get_resilient_client
+from app.services.token_accounting import (
+    TokenAccountant, TokenBudgetExceeded, get_token_accountant, usage_from_response
+)
 from app.utils.logging import get_logger
+from app.utils.tracing import start_span
 
 logger = get_logger(__name__)
 
 class LLMService:
-    def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY", "YOUR_GEMINI_API_KEY_HERE")
-        genai.configure(api_key=self.api_key)
-        self.default_model = "gemini-1.5-flash"
+    def __init__(
+        self,
+        clients: Optional[LLMClientRegistry] = None,
+        cache: Optional[LLMResponseCache] = None,
+        accountant: Optional[TokenAccountant] = None,
+        router: Optional[ModelRouter] = None,
+        resilience: Optional[ResilientClient] = None,
+        prefixes: Optional[PromptPrefixRegistry] = None
+    ):
+        # Model handles and the Gemini transport are shared across all LLMService instances
+        self.clients = clients or get_llm_client_registry()
+        self.cache = cache or get_llm_response_cache()
+        self.accountant = accountant or get_token_accountant()
+        self.router = router or get_model_router()
+        self.resilience = resilience or get_resilient_client("gemini")
+        self.prefixes = prefixes or get_prompt_prefix_registry()
+        self.api_key = self.clients.api_key
+        self.default_model = self.router.default_model
+        self.batch_max_items = int(os.getenv("LLM_BATCH_MAX_ITEMS", "500"))
+        self.batch_max_concurrency = int(os.getenv("LLM_BATCH_MAX_CONCURRENCY", "16"))
+        # Chat requests carry no generation settings and run at the model's default
+        # temperature, which the response cache skips; set this to pin and cache them
+        chat_temperature = os.getenv("LLM_CHAT_TEMPERATURE")
+        self.chat_temperature = float(chat_temperature) if chat_temperature else None
         
-    async def generate_response(self, request: LLMRequest) -> LLMResponse:
+    async def generate_response(
+        self,
+        request: LLMRequest,
+        use_cache: bool = True,
+        route: str = "llm.generate"
+    ) -> LLMResponse:
         """Generate response using Gemini LLM"""
         try:
-            logger.info(f"Generating LLM response for: {request.text[:50]}...")
+            logger.info("Generating LLM response for: %s...", request.text[:50])
             
-            # Initialize model
-            model = genai.GenerativeModel(request.model or self.default_model)
+            prefix = self._resolve_prefix(request.prefix)
+            prompt_text = prefix.assemble(request.text) if prefix else request.text
             
-            # Generate response
-            response = model.generate_content(request.text)
+            # Serve repeated prompts from the response cache
+            temperature = self.chat_temperature
+            cache_key = self.cache.lookup_key(
+                self._cache_text(request.text, prefix),
+                request.model or "auto",
+                temperature=temperature,
+                bypass=not use_cache
+            )
+            if cache_key:
+                cached = await self.cache.get(cache_key)
+                if cached:
+                    logger.info("LLM response served from cache for %s", cached['model_used'])
+                    return LLMResponse(
+                        success=True,
+                        message="Response generated successfully",
+                        response_text=cached["response_text"],
+                        model_used=cached["model_used"],
+                        tokens_used=cached.get("tokens_used"),
+                        cached=True
+                    )
+            
+            # Shorten generation if the session is close to its token budget
+            max_tokens = self.accountant.plan_max_tokens(request.session_id, prompt_text, None)
+            
+            # Route to a model and hedge slow calls to the fallback model
+            self._record_prefix_use(prefix)
+            model_name = self.router.choose_model(prompt_text, request.model)
+            response, model_name = await self.router.run(
+                model_name,
+                lambda model: self._generate(model, prompt_text, max_tokens, temperature, prefix)
+            )
             
             # Extract response text
             response_text = response.text if response.text else "No response generated"
             
+            # Record real token usage
+            usage = usage_from_response(response, prompt_text, response.text)
+            self.accountant.record(usage, model_name, route, request.session_id)
+            
             result = LLMResponse(
                 success=True,
                 message="Response generated successfully",
                 response_text=response_text,
-                model_used=request.model or self.default_model
+                model_used=model_name,
+                tokens_used=usage.total_tokens,
+                cached=False
             )
             
-            logger.info(f"LLM response generated successfully using {result.model_used}")
+            # An answer shortened by the session budget is not cached for callers with a full one
+            if cache_key and response.text and max_tokens is None:
+                await self.cache.set(cache_key, {
+                    "response_text": response_text,
+                    "model_used": model_name,
+                    "tokens_used": usage.total_tokens
+                })
+            
+            logger.info("LLM response generated successfully using %s", result.model_used)
             return result
             
+        except TokenBudgetExceeded as e:
+            logger.warning("LLM generation rejected: %s", str(e))
+            return LLMResponse(
+                success=False,
+                message=str(e)
+            )
         except Exception as e:
-            logger.error(f"LLM generation error: {str(e)}")
+            logger.error("LLM generation error: %s", e)
             return LLMResponse(
                 success=False,
                 message=f"Error generating response: {str(e)}"
             )
     
-    async def query_llm(self, request: LLMQueryRequest) -> LLMQueryResponse:
+    async def query_llm(
+        self,
+        request: LLMQueryRequest,
+        use_cache: bool = True,
+        route: str = "llm.query"
+    ) -> LLMQueryResponse:
         """Query LLM with advanced parameters"""
         try:
-            logger.info(f"Querying LLM with parameters: model={request.model}, max_tokens={request.max_tokens}")
-            
-            # Initialize model with parameters
-            model = genai.GenerativeModel(
-                model_name=request.model or self.default_model,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=request.max_tokens,
-                    temperature=request.temperature
-                )
+            logger.info("Querying LLM with parameters: model=%s, max_tokens=%s", request.model, request.max_tokens)
+            
+            prefix = self._resolve_prefix(request.prefix)
+            prompt_text = prefix.assemble(request.text) if prefix else request.text
+            
+            # Serve repeated low-temperature queries from the response cache
+            cache_key = self.cache.lookup_key(
+                self._cache_text(request.text, prefix),
+                request.model or "auto",
+                temperature=request.temperature,
+                max_tokens=request.max_tokens,
+                bypass=not use_cache
             )
+            if cache_key:
+                cached = await self.cache.get(cache_key)
+                if cached:
+                    logger.info("LLM query served from cache for %s", cached['model_used'])
+                    return LLMQueryResponse(
+                        success=True,
+                        message="Query processed successfully",
+                        query=request.text,
+                        response=cached["response_text"],
+                        model_used=cached["model_used"],
+                        tokens_used=cached.get("tokens_used"),
+                        prompt_tokens=cached.get("prompt_tokens"),
+                        completion_tokens=cached.get("completion_tokens"),
+                        tokens_estimated=cached.get("tokens_estimated"),
+                        cached=True
+                    )
             
-            # Generate response
-            response = model.generate_content(request.text)
+            # Shorten generation if the session is close to its token budget
+            max_tokens = self.accountant.plan_max_tokens(request.session_id, prompt_text, request.max_tokens)
+            
+            # Route to a model and hedge slow calls to the fallback model
+            self._record_prefix_use(prefix)
+            model_name = self.router.choose_model(prompt_text, request.model)
+            response, model_name = await self.router.run(
+                model_name,
+                lambda model: self._generate(model, prompt_text, max_tokens, request.temperature, prefix)
+            )
             
             # Extract response
             response_text = response.text if response.text else "No response generated"
             
+            # Record real token usage
+            usage = usage_from_response(response, prompt_text, response.text)
+            self.accountant.record(usage, model_name, route, request.session_id)
+            
             result = LLMQueryResponse(
                 success=True,
                 message="Query processed successfully",
                 query=request.text,
                 response=response_text,
-                model_used=request.model or self.default_model,
-                tokens_used=len(response_text.split())  # Approximate token count
+                model_used=model_name,
+                tokens_used=usage.total_tokens,
+                prompt_tokens=usage.prompt_tokens,
+                completion_tokens=usage.completion_tokens,
+                tokens_estimated=usage.estimated,
+                cached=False
             )
             
-            logger.info(f"LLM query successful: {result.tokens_used} tokens used")
+            # An answer shortened by the session budget is not cached for callers with a full one
+            if cache_key and response.text and max_tokens == request.max_tokens:
+                await self.cache.set(cache_key, {
+                    "response_text": response_text,
+                    "model_used": model_name,
+                    "tokens_used": usage.total_tokens,
+                    "prompt_tokens": usage.prompt_tokens,
+                    "completion_tokens": usage.completion_tokens,
+                    "tokens_estimated": usage.estimated
+                })
+            
+            logger.info("LLM query successful: %s tokens used", result.tokens_used)
             return result
             
+        except TokenBudgetExceeded as e:
+            logger.warning("LLM query rejected: %s", str(e))
+            return LLMQueryResponse(
+                success=False,
+                message=str(e),
+                query=request.text
+            )
         except Exception as e:
-            logger.error(f"LLM query error: {str(e)}")
+            logger.error("LLM query error: %s", e)
             return LLMQueryResponse(
                 success=False,
                 message=f"Error processing query: {str(e)}",
                 query=request.text
             )
     
+    async def stream_query(
+        self,
+        request: LLMQueryRequest,
+        route: str = "llm.stream"
+    ) -> AsyncIterator[dict]:
+        """Stream LLM output as events: one per text chunk, then a final summary"""
+        start_time = time.time()
+        first_token_time = None
+        model_name = request.model or self.default_model
+        chunks = 0
+        response_text = ""
+        
+        try:
+            prefix = self._resolve_prefix(request.prefix)
+            prompt_text = prefix.assemble(request.text) if prefix else request.text
+            model_name = self.router.choose_model(prompt_text, request.model)
+            logger.info("Streaming LLM query: model=%s, max_tokens=%s", model_name, request.max_tokens)
+            
+            # Shorten generation if the session is close to its token budget
+            max_tokens = self.accountant.plan_max_tokens(request.session_id, prompt_text, request.max_tokens)
+            
+            self._record_prefix_use(prefix)
+            model = self.clients.get_model(model_name, max_output_tokens=max_tokens, temperature=request.temperature)
+            
+            # Forward chunks as soon as Gemini produces them
+            response = await self.resilience.call(model.generate_content_async, prompt_text, stream=True)
+            stream = self.resilience.stream(response)
+            try:
+                async for chunk in stream:
+                    text = self._chunk_text(chunk)
+                    if not text:
+                        continue
+                    if first_token_time is None:
+                        first_token_time = time.time()
+                    chunks += 1
+                    response_text += text
+                    yield {"event": "token", "data": {"text": text}}
+            finally:
+                # Release the upstream stream now if the client disconnected mid-stream
+                await stream.aclose()
+            
+            # Record real token usage
+            usage = usage_from_response(response, prompt_text, response_text)
+            self.accountant.record(usage, model_name, route, request.session_id)
+            
+            total_time = time.time() - start_time
+            yield {
+                "event": "done",
+                "data": {
+                    "success": True,
+                    "model_used": model_name,
+                    "usage": usage.to_dict(),
+                    "chunks": chunks,
+                    "characters": len(response_text),
+                    "time_to_first_token": (first_token_time - start_time) if first_token_time else None,
+                    "total_time": total_time
+                }
+            }
+            logger.info("LLM stream completed: %s chunks in %.2fs", chunks, total_time)
+            
+        except Exception as e:
+            logger.error("LLM stream error: %s", e)
+            yield {
+                "event": "error",
+                "data": {
+                    "success": False,
+                    "message": f"Error streaming response: {str(e)}",
+                    "model_used": model_name,
+                    "total_time": time.time() - start_time
+                }
+            }
+    
+    async def stream_batch(
+        self,
+        items: List[LLMQueryRequest],
+        concurrency: int = 4,
+        route: str = "llm.batch"
+    ) -> AsyncIterator[LLMBatchItemResult]:
+        """Run queries with bounded concurrency, yielding results as they complete.
+
+        Identical queries are sent once and their result is reported for
+        every index that asked for it.
+        """
+        concurrency = max(1, min(concurrency, self.batch_max_concurrency))
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        # Group identical queries so each is only sent once
+        groups: Dict[Tuple, List[int]] = {}
+        for index, item in enumerate(items):
+            key = (item.text, item.model, item.max_tokens, item.temperature, item.session_id, item.prefix)
+            groups.setdefault(key, []).append(index)
+        
+        async def run_group(indexes: List[int]):
+            async with semaphore:
+                start_time = time.time()
+                result = await self.query_llm(items[indexes[0]], route=route)
+                return indexes, result, time.time() - start_time
+        
+        tasks = [asyncio.ensure_future(run_group(indexes)) for indexes in groups.values()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                indexes, result, duration = await next_done
+                for position, index in enumerate(indexes):
+                    yield LLMBatchItemResult(
+                        index=index,
+                        result=result,
+                        duration=duration,
+                        deduplicated=position > 0
+                    )
+        finally:
+            # Stop outstanding work if the client goes away mid-stream
+            for task in tasks:
+                task.cancel()
+    
+    async def run_batch(self, items: List[LLMQueryRequest], concurrency: int = 4) -> LLMBatchResponse:
+        """Run queries with bounded concurrency and return results in request order"""
+        start_time = time.time()
+        results = [result async for result in self.stream_batch(items, concurrency)]
+        results.sort(key=lambda item: item.index)
+        
+        summary = self.batch_summary(items, results, time.time() - start_time)
+        return LLMBatchResponse(
+            success=summary["failed"] == 0,
+            message=f"Processed {len(results)} queries",
+            results=results,
+            **summary
+        )
+    
+    @staticmethod
+    def batch_summary(items: List[LLMQueryRequest], results: List[LLMBatchItemResult], total_time: float) -> dict:
+        """Aggregate counts and throughput for a batch"""
+        succeeded = sum(1 for item in results if item.result.success)
+        return {
+            "total_items": len(items),
+            "unique_items": sum(1 for item in results if not item.deduplicated),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "total_time": total_time,
+            "throughput": len(results) / total_time if total_time > 0 else 0.0
+        }
+    
+    async def _generate(
+        self,
+        model_name: str,
+        prompt_text: str,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        prefix: Optional[PromptPrefix] = None
+    ):
+        """Run a single non-streaming Gemini call with the already assembled prompt"""
+        model = self.clients.get_model(model_name, max_output_tokens=max_tokens, temperature=temperature)
+        # Hedged attempts run in their own tasks and show up as sibling spans
+        with start_span("llm.generate", model=model_name, max_tokens=max_tokens, prefix=prefix.name if prefix else None):
+            return await self.resilience.call(model.generate_content_async, prompt_text)
+    
+    def _record_prefix_use(self, prefix: Optional[PromptPrefix]):
+        """Count one request sent with the prefix; hedged attempts are not counted again"""
+        if prefix is not None:
+            self.prefixes.record_use(prefix)
+    
+    def _resolve_prefix(self, name: Optional[str]) -> Optional[PromptPrefix]:
+        """Look up a registered prompt prefix by name"""
+        if not name:
+            return None
+        prefix = self.prefixes.get(name)
+        if prefix is None:
+            raise ValueError(f"Unknown prompt prefix: {name}")
+        return prefix
+    
+    @staticmethod
+    def _cache_text(text: str, prefix: Optional[PromptPrefix]) -> str:
+        """Response cache text; includes the prefix version so re-registering it invalidates entries"""
+        if prefix is None:
+            return text
+        return f"[prefix:{prefix.name}:{prefix.created_at}] {text}"
+    
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        """Get text from a streamed chunk, ignoring chunks without text parts"""
+        try:
+            return chunk.text or ""
+        except (ValueError, AttributeError):
+            return ""
+    
     def get_available_models(self) -> list:
         """Get list of available Gemini models"""
         try:
+            self.clients.configure()
             models = genai.list_models()
             gemini_models = [model.name for model in models if 'gemini' in model.name.lower()]
             return gemini_models
         except Exception as e:
-            logger.error(f"Error getting models: {str(e)}")
+            logger.error("Error getting models: %s", e)
             return [self.default_model]
@@ -0,0 +1,108 @@
+import sys
+from array import array
+from typing import List, Optional, Tuple
+from app.models.schemas import ChatMessage
+
+# Roles are stored as one-byte codes; new role names get the next code
+_ROLE_NAMES: List[str] = ["user", "assistant", "system"]
+_ROLE_CODES = {name: code for code, name in enumerate(_ROLE_NAMES)}
+
+def _role_code(role: str) -> int:
+    code = _ROLE_CODES.get(role)
+    if code is None:
+        if len(_ROLE_NAMES) >= 256:
+            raise ValueError("Too many distinct message roles")
+        code = len(_ROLE_NAMES)
+        _ROLE_NAMES.append(sys.intern(role))
+        _ROLE_CODES[role] = code
+    return code
+
+# Fixed bytes per message outside the text buffer: role code, timestamp, end offset
+MESSAGE_OVERHEAD_BYTES = 1 + 8 + 8
+
+class MessageLog:
+    """Append-only chat history stored column-wise.
+
+    Roles, timestamps and text end offsets live in typed arrays and all
+    message text is kept UTF-8 encoded in one shared buffer, so a message
+    costs its text plus 17 bytes instead of a Pydantic model and its dict.
+    Dropping old messages only advances a start index; the arrays are
+    compacted once more than half of them is dead.
+    """
+
+    __slots__ = ("_roles", "_timestamps", "_ends", "_buffer", "_start")
+
+    def __init__(self):
+        self._roles = array("B")
+        self._timestamps = array("d")
+        self._ends = array("Q")
+        self._buffer = bytearray()
+        self._start = 0
+
+    def __len__(self) -> int:
+        return len(self._roles) - self._start
+
+    def append(self, role: str, content: str, timestamp: float):
+        self._buffer += content.encode("utf-8")
+        self._roles.append(_role_code(role))
+        self._timestamps.append(timestamp)
+        self._ends.append(len(self._buffer))
+
+    def extend(self, messages: List[ChatMessage]):
+        for message in messages:
+            self.append(message.role, message.content, message.timestamp)
+
+    def trim(self, max_messages: int) -> int:
+        """Keep only the newest max_messages, returning the number dropped"""
+        overflow = len(self) - max_messages
+        if overflow <= 0:
+            return 0
+        self._start += overflow
+        if self._start > len(self._roles) // 2:
+            self._compact()
+        return overflow
+
+    def last(self, n: Optional[int] = None) -> List[Tuple[str, str, float]]:
+        """Get the newest n messages (all when n is None) as (role, content, timestamp)"""
+        total = len(self._roles)
+        first = self._start if n is None else max(self._start, total - n)
+        messages = []
+        for i in range(first, total):
+            begin = self._ends[i - 1] if i > 0 else 0
+            content = self._buffer[begin:self._ends[i]].decode("utf-8")
+            messages.append((_ROLE_NAMES[self._roles[i]], content, self._timestamps[i]))
+        return messages
+
+    def to_chat_messages(self, n: Optional[int] = None) -> List[ChatMessage]:
+        """Build Pydantic messages for an API response"""
+        return [
+            ChatMessage(role=role, content=content, timestamp=timestamp)
+            for role, content, timestamp in self.last(n)
+        ]
+
+    @property
+    def content_bytes(self) -> int:
+        """Bytes of live message text"""
+        if not len(self):
+            return 0
+        begin = self._ends[self._start - 1] if self._start > 0 else 0
+        return self._ends[-1] - begin
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the log, including dead space awaiting compaction"""
+        return (
+            len(self._buffer)
+            + len(self._roles) * self._roles.itemsize
+            + len(self._timestamps) * self._timestamps.itemsize
+            + len(self._ends) * self._ends.itemsize
+        )
+
+    def _compact(self):
+        start = self._start
+        offset = self._ends[start - 1]
+        self._buffer = self._buffer[offset:]
+        self._roles = self._roles[start:]
+        self._timestamps = self._timestamps[start:]
+        self._ends = array("Q", (end - offset for end in self._ends[start:]))
+        self._start = 0
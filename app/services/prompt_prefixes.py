@@ -0,0 +1,93 @@
+import os
+import time
+from typing import Dict, Optional
+from app.services.token_accounting import estimate_tokens
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+PREFIX_SEPARATOR = "\n\n"
+
+class PromptPrefix:
+    """A named system prompt / shared context block prepended to user prompts"""
+
+    __slots__ = ("name", "text", "token_count", "block", "created_at", "uses", "prefix_tokens_sent")
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        # Pre-assembled prefix block and token count, reused on every call
+        self.block = text + PREFIX_SEPARATOR
+        self.token_count = estimate_tokens(text)
+        self.created_at = time.time()
+        self.uses = 0
+        # Estimated; Gemini reads and bills the prefix again on every call
+        self.prefix_tokens_sent = 0
+
+    def assemble(self, text: str) -> str:
+        """Build the full prompt from the pre-assembled prefix block"""
+        return self.block + text
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "token_count": self.token_count,
+            "characters": len(self.text),
+            "created_at": self.created_at,
+            "uses": self.uses,
+            "prefix_tokens_sent": self.prefix_tokens_sent
+        }
+
+class PromptPrefixRegistry:
+    """Named prompt prefixes, assembled and token-counted once at registration.
+
+    Gemini context caching is not used: the pinned google-generativeai
+    0.3.2 has no caching API, so every call sends the pre-assembled block.
+    """
+
+    def __init__(self):
+        self.prefixes: Dict[str, PromptPrefix] = {}
+        self.max_prefixes = int(os.getenv("LLM_MAX_PROMPT_PREFIXES", "64"))
+
+    def register(self, name: str, text: str) -> PromptPrefix:
+        """Register or replace a named prefix"""
+        if name not in self.prefixes and len(self.prefixes) >= self.max_prefixes:
+            raise ValueError(f"Prompt prefix limit of {self.max_prefixes} reached")
+
+        self.remove(name)
+        prefix = PromptPrefix(name, text)
+        self.prefixes[name] = prefix
+
+        logger.info("Prompt prefix registered: %s (%s tokens)", name, prefix.token_count)
+        return prefix
+
+    def get(self, name: str) -> Optional[PromptPrefix]:
+        return self.prefixes.get(name)
+
+    def remove(self, name: str) -> bool:
+        """Remove a prefix"""
+        return self.prefixes.pop(name, None) is not None
+
+    def record_use(self, prefix: PromptPrefix):
+        """Record a request sent to the model with the prefix"""
+        prefix.uses += 1
+        prefix.prefix_tokens_sent += prefix.token_count
+
+    def stats(self) -> dict:
+        """Get per-prefix and total usage"""
+        prefixes = [prefix.to_dict() for prefix in self.prefixes.values()]
+        return {
+            "count": len(prefixes),
+            "uses": sum(prefix.uses for prefix in self.prefixes.values()),
+            "prefix_tokens_sent": sum(prefix.prefix_tokens_sent for prefix in self.prefixes.values()),
+            "prefixes": prefixes
+        }
+
+_registry: Optional[PromptPrefixRegistry] = None
+
+def get_prompt_prefix_registry() -> PromptPrefixRegistry:
+    """Get the process-wide prompt prefix registry"""
+    global _registry
+    if _registry is None:
+        _registry = PromptPrefixRegistry()
+    return _registry
@@ -0,0 +1,247 @@
+import asyncio
+import math
+import os
+import struct
+import tempfile
+import time
+import wave
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+import assemblyai as aai
+from murf import Murf
+from app.services.llm_clients import get_llm_client_registry
+from app.services.llm_router import FAST_MODEL
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+PLACEHOLDER_KEYS = {
+    "murf": ("MURF_API_KEY", "YOUR_MURF_API_KEY_HERE"),
+    "assemblyai": ("ASSEMBLY_AI_API_KEY", "YOUR_ASSEMBLY_AI_API_KEY_HERE"),
+    "gemini": ("GEMINI_API_KEY", "YOUR_GEMINI_API_KEY_HERE")
+}
+
+def write_probe_clip(path: str, seconds: float = 1.0, sample_rate: int = 8000):
+    """Write a short mono 16-bit WAV tone used by the STT probe"""
+    frames = b"".join(
+        struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * i / sample_rate)))
+        for i in range(int(seconds * sample_rate))
+    )
+    with wave.open(path, "wb") as clip:
+        clip.setnchannels(1)
+        clip.setsampwidth(2)
+        clip.setframerate(sample_rate)
+        clip.writeframes(frames)
+
+class ProbeResult:
+    """Rolling outcome of one provider's probes"""
+
+    def __init__(self, provider: str, history: int):
+        self.provider = provider
+        self.outcomes: Deque[Tuple[bool, float]] = deque(maxlen=history)
+        self.status = "unknown"
+        self.message = "Not probed yet"
+        self.last_checked: Optional[float] = None
+        self.last_latency_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.probes = 0
+        self.consecutive_failures = 0
+
+    def record(self, ok: bool, latency_ms: float, error: Optional[str] = None):
+        self.probes += 1
+        self.outcomes.append((ok, latency_ms))
+        self.last_checked = time.time()
+        self.last_latency_ms = round(latency_ms, 3)
+        if ok:
+            self.status = "healthy"
+            self.message = f"Probe succeeded in {latency_ms:.0f} ms"
+            self.consecutive_failures = 0
+        else:
+            self.status = "error"
+            self.message = f"Probe failed: {error}"
+            self.last_error = error
+            self.consecutive_failures += 1
+
+    def mark_not_configured(self):
+        """Record that the provider has no API key; this is not a probe failure"""
+        self.status = "not_configured"
+        self.message = "API key not configured"
+        self.last_checked = time.time()
+        self.consecutive_failures = 0
+
+    def to_dict(self) -> dict:
+        latencies = sorted(latency for ok, latency in self.outcomes if ok)
+        failures = sum(1 for ok, _ in self.outcomes if not ok)
+        return {
+            "status": self.status,
+            "message": self.message,
+            "last_checked": self.last_checked,
+            "last_latency_ms": self.last_latency_ms,
+            "p50_latency_ms": round(latencies[len(latencies) // 2], 3) if latencies else None,
+            "max_latency_ms": round(latencies[-1], 3) if latencies else None,
+            "error_rate": round(failures / len(self.outcomes), 3) if self.outcomes else None,
+            "window": len(self.outcomes),
+            "probes": self.probes,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error
+        }
+
+class ProviderProber:
+    """Probe each upstream provider on a background schedule.
+
+    Murf is probed by listing voices, AssemblyAI by listing one
+    transcript and Gemini by a one-token generation. With
+    ``PROBE_ASSEMBLYAI_TRANSCRIBE`` AssemblyAI instead transcribes a
+    one-second generated clip, which exercises the whole STT path but is
+    billed. Probes bypass the resilience wrappers so they observe the
+    provider directly and never consume retry budget. Results are cached,
+    so health checks read them without calling the providers.
+
+    Probing is off unless ``PROBES_ENABLED`` is set: every worker probes
+    on its own, and the Gemini probe (plus the AssemblyAI one when
+    transcribing) is a billed call, about 720 a day per worker at the
+    default interval.
+    """
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        timeout: Optional[float] = None,
+        history: Optional[int] = None,
+        providers: Optional[str] = None,
+        enabled: Optional[bool] = None
+    ):
+        if enabled is None:
+            enabled = os.getenv("PROBES_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.enabled = enabled
+        self.transcribe_clip = os.getenv("PROBE_ASSEMBLYAI_TRANSCRIBE", "false").lower() in ("1", "true", "yes")
+        self.interval = interval or float(os.getenv("PROBE_INTERVAL_SECONDS", "120"))
+        self.timeout = timeout or float(os.getenv("PROBE_TIMEOUT_SECONDS", "15"))
+        history = history or int(os.getenv("PROBE_HISTORY", "20"))
+        providers = providers if providers is not None else os.getenv("PROBE_PROVIDERS", "murf,assemblyai,gemini")
+        self.providers = [name.strip() for name in providers.split(",") if name.strip() in PLACEHOLDER_KEYS]
+        self.results: Dict[str, ProbeResult] = {name: ProbeResult(name, history) for name in self.providers}
+        self._probes: Dict[str, Callable[[], Awaitable]] = {
+            "murf": self._probe_murf,
+            "assemblyai": self._probe_assemblyai,
+            "gemini": self._probe_gemini
+        }
+        self._murf: Optional[Murf] = None
+        self._transcriber: Optional[aai.Transcriber] = None
+        self._assemblyai_client: Optional[aai.Client] = None
+        self._clip_path: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def use_clients(self, murf: Murf, transcriber: aai.Transcriber, assemblyai_client: Optional[aai.Client] = None):
+        """Probe through the application's shared SDK clients and their connection pools"""
+        self._murf = murf
+        self._transcriber = transcriber
+        self._assemblyai_client = assemblyai_client
+
+    def start(self):
+        """Start probing in the background"""
+        if self.enabled and self.providers and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+            logger.info("Provider probes started for %s every %.0fs", ", ".join(self.providers), self.interval)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._clip_path:
+            try:
+                os.unlink(self._clip_path)
+            except FileNotFoundError:
+                pass
+            self._clip_path = None
+
+    async def _loop(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> Dict[str, dict]:
+        """Probe every provider concurrently and return the updated results"""
+        await asyncio.gather(*(self._run_probe(name) for name in self.providers))
+        return self.snapshot()
+
+    async def _run_probe(self, provider: str):
+        result = self.results[provider]
+        env_name, placeholder = PLACEHOLDER_KEYS[provider]
+        if os.getenv(env_name, placeholder) == placeholder:
+            result.mark_not_configured()
+            return
+
+        start_time = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._probes[provider](), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            result.record(False, (time.perf_counter() - start_time) * 1000, f"timed out after {self.timeout:.0f}s")
+        except Exception as e:
+            result.record(False, (time.perf_counter() - start_time) * 1000, str(e) or type(e).__name__)
+        else:
+            result.record(True, (time.perf_counter() - start_time) * 1000)
+        if result.status == "error":
+            logger.warning("Provider probe failed for %s: %s", provider, result.last_error)
+
+    async def _probe_murf(self):
+        if self._murf is None:
+            self._murf = Murf(api_key=os.getenv("MURF_API_KEY"))
+        voices = await asyncio.to_thread(self._murf.get_voices)
+        if not voices:
+            raise RuntimeError("no voices returned")
+
+    async def _probe_assemblyai(self):
+        if self.transcribe_clip:
+            await self._probe_assemblyai_transcription()
+            return
+        # An authenticated listing checks the key and the API without starting a billed job
+        if self._assemblyai_client is None:
+            self._assemblyai_client = aai.Client(settings=aai.Settings(api_key=os.getenv("ASSEMBLY_AI_API_KEY")))
+        response = await asyncio.to_thread(
+            self._assemblyai_client.http_client.get, "/v2/transcript", params={"limit": 1}
+        )
+        response.raise_for_status()
+
+    async def _probe_assemblyai_transcription(self):
+        if self._clip_path is None:
+            fd, path = tempfile.mkstemp(prefix="stt-probe-", suffix=".wav")
+            os.close(fd)
+            await asyncio.to_thread(write_probe_clip, path)
+            self._clip_path = path
+        if self._transcriber is None:
+            aai.settings.api_key = os.getenv("ASSEMBLY_AI_API_KEY")
+            self._transcriber = aai.Transcriber()
+        transcript = await asyncio.to_thread(self._transcriber.transcribe, self._clip_path)
+        if transcript.status == aai.TranscriptStatus.error:
+            raise RuntimeError(transcript.error)
+
+    async def _probe_gemini(self):
+        model = get_llm_client_registry().get_model(FAST_MODEL, max_output_tokens=1, temperature=0.0)
+        await model.generate_content_async("ping")
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {provider: result.to_dict() for provider, result in self.results.items()}
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "assemblyai_transcribe": self.transcribe_clip,
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval,
+            "timeout_seconds": self.timeout,
+            "providers": self.snapshot()
+        }
+
+_prober: Optional[ProviderProber] = None
+
+def get_provider_prober() -> ProviderProber:
+    """Get the process-wide provider prober"""
+    global _prober
+    if _prober is None:
+        _prober = ProviderProber()
+    return _prober
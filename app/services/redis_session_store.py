@@ -0,0 +1,245 @@
+import os
+import time
+import uuid
+from typing import List, Optional, Tuple
+from app.models.schemas import ChatMessage, ChatSession
+from app.services.message_log import MessageLog
+from app.services.resp_client import RespPool, get_resp_pool, pack, unpack
+from app.services.session_store import SessionQuery, SessionRecord, SessionStore, encode_cursor
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+class RedisSessionStore(SessionStore):
+    """Session store on a Redis-protocol server shared by every node.
+
+    Each session is a hash (created_at, updated_at, message_count) plus a
+    capped list of msgpack-encoded messages; both expire after
+    ``idle_ttl`` without writes. Two sorted sets index sessions by
+    created_at and updated_at for keyset pagination. Every write is a
+    single pipelined round trip, except appends: they WATCH the session
+    hash and write in MULTI/EXEC only if it still has ``created_at``.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[RespPool] = None,
+        max_messages: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        key_prefix: Optional[str] = None
+    ):
+        self.pool = pool or get_resp_pool(os.getenv("SESSION_REDIS_URL") or None)
+        self.max_messages = max_messages or int(os.getenv("SESSION_MAX_MESSAGES", "200"))
+        self.idle_ttl = idle_ttl or float(os.getenv("SESSION_IDLE_TTL_SECONDS", "3600"))
+        prefix = key_prefix or os.getenv("REDIS_KEY_PREFIX", "voice-agents")
+        self._meta_prefix = f"{prefix}:session:"
+        self._messages_prefix = f"{prefix}:messages:"
+        self._index_keys = {
+            "created_at": f"{prefix}:sessions:by_created_at",
+            "updated_at": f"{prefix}:sessions:by_updated_at"
+        }
+        self._last_prune = 0.0
+        self.stale_index_entries = 0
+
+    def _meta_key(self, session_id: str) -> str:
+        return self._meta_prefix + session_id
+
+    def _messages_key(self, session_id: str) -> str:
+        return self._messages_prefix + session_id
+
+    def _expiry_ms(self) -> int:
+        return int(self.idle_ttl * 1000)
+
+    async def exists(self, session_id: str) -> bool:
+        return bool(await self.pool.execute("EXISTS", self._meta_key(session_id)))
+
+    async def get(self, session_id: str, last_n: Optional[int] = None) -> Optional[ChatSession]:
+        commands = [("HMGET", self._meta_key(session_id), "created_at", "updated_at")]
+        if last_n != 0:
+            start = -last_n if last_n is not None else 0
+            commands.append(("LRANGE", self._messages_key(session_id), start, -1))
+        replies = await self.pool.pipeline(commands)
+
+        created_at, updated_at = replies[0]
+        if created_at is None:
+            return None
+        log = MessageLog()
+        for packed in replies[1] if len(replies) > 1 else ():
+            role, content, timestamp = unpack(packed)
+            log.append(role, content, timestamp)
+        record = SessionRecord(session_id, float(created_at), float(updated_at), log)
+        return record.to_chat_session()
+
+    async def message_count(self, session_id: str) -> int:
+        count = await self.pool.execute("HGET", self._meta_key(session_id), "message_count")
+        return int(count) if count is not None else 0
+
+    async def create(self, session_id: Optional[str] = None) -> ChatSession:
+        now = time.time()
+        record = SessionRecord(session_id or str(uuid.uuid4()), now, now)
+        meta_key = self._meta_key(record.session_id)
+        await self.pool.pipeline([
+            ("DEL", meta_key, self._messages_key(record.session_id)),
+            ("HSET", meta_key, "created_at", now, "updated_at", now, "message_count", 0),
+            ("PEXPIRE", meta_key, self._expiry_ms()),
+            ("ZADD", self._index_keys["created_at"], now, record.session_id),
+            ("ZADD", self._index_keys["updated_at"], now, record.session_id)
+        ])
+        await self._maybe_prune()
+        return record.to_chat_session()
+
+    async def append_messages(self, session_id: str, messages: List[ChatMessage]) -> int:
+        meta_key = self._meta_key(session_id)
+        now = time.time()
+        messages_key = self._messages_key(session_id)
+        # Written only if the session still exists when EXEC runs; otherwise
+        # HINCRBY/HSET would recreate a hash without created_at
+        replies = await self.pool.transaction([meta_key], ("HGET", meta_key, "created_at"), [
+            ("RPUSH", messages_key, *(pack([m.role, m.content, m.timestamp]) for m in messages)),
+            ("LTRIM", messages_key, -self.max_messages, -1),
+            ("HINCRBY", meta_key, "message_count", len(messages)),
+            ("HSET", meta_key, "updated_at", now),
+            ("PEXPIRE", meta_key, self._expiry_ms()),
+            ("PEXPIRE", messages_key, self._expiry_ms()),
+            ("ZADD", self._index_keys["updated_at"], now, session_id)
+        ])
+        if replies is None:
+            raise KeyError(session_id)
+        return replies[2]
+
+    async def delete(self, session_id: str) -> bool:
+        replies = await self.pool.pipeline([
+            ("DEL", self._meta_key(session_id), self._messages_key(session_id)),
+            ("ZREM", self._index_keys["created_at"], session_id),
+            ("ZREM", self._index_keys["updated_at"], session_id)
+        ])
+        return replies[0] > 0
+
+    async def import_sessions(self, records: List[SessionRecord]) -> int:
+        commands = []
+        for record in records:
+            meta_key = self._meta_key(record.session_id)
+            messages_key = self._messages_key(record.session_id)
+            messages = record.log.last(self.max_messages)
+            commands.extend([
+                ("DEL", meta_key, messages_key),
+                (
+                    "HSET", meta_key, "created_at", record.created_at,
+                    "updated_at", record.updated_at, "message_count", len(record.log)
+                ),
+                ("PEXPIRE", meta_key, self._expiry_ms()),
+                ("ZADD", self._index_keys["created_at"], record.created_at, record.session_id),
+                ("ZADD", self._index_keys["updated_at"], record.updated_at, record.session_id)
+            ])
+            if messages:
+                commands.append(("RPUSH", messages_key, *(pack(list(message)) for message in messages)))
+                commands.append(("PEXPIRE", messages_key, self._expiry_ms()))
+        if commands:
+            await self.pool.pipeline(commands)
+        return len(records)
+
+    async def list_sessions(self, query: Optional[SessionQuery] = None) -> Tuple[List[dict], Optional[str]]:
+        query = query or SessionQuery()
+        await self._maybe_prune()
+        index_key = self._index_keys[query.sort_by]
+
+        # Keyset pagination: Redis orders equal scores by member, matching
+        # the (sort value, session_id) cursor order. Start at the cursor's
+        # score inclusively and skip entries at or before the cursor itself.
+        if query.descending:
+            command, bounds = "ZREVRANGEBYSCORE", (query.cursor[0] if query.cursor else "+inf", "-inf")
+        else:
+            command, bounds = "ZRANGEBYSCORE", (query.cursor[0] if query.cursor else "-inf", "+inf")
+        batch_size = max(query.limit * 2, 64)
+
+        now = time.time()
+        sessions = []
+        last_key = None
+        offset = 0
+        while len(sessions) < query.limit:
+            entries = await self.pool.execute(
+                command, index_key, *bounds, "WITHSCORES", "LIMIT", offset, batch_size
+            )
+            if not entries:
+                break
+            offset += len(entries) // 2
+            keys = [
+                (float(entries[i + 1]), entries[i].decode("utf-8"))
+                for i in range(0, len(entries), 2)
+            ]
+            if query.cursor:
+                keys = [
+                    key for key in keys
+                    if (key < query.cursor if query.descending else key > query.cursor)
+                ]
+            rows = await self.pool.pipeline([
+                ("HMGET", self._meta_key(session_id), "created_at", "updated_at", "message_count")
+                for _, session_id in keys
+            ]) if keys else []
+
+            stale = []
+            for (sort_value, session_id), (created_at, updated_at, message_count) in zip(keys, rows):
+                if created_at is None:
+                    stale.append(session_id)
+                    continue
+                created_at, message_count = float(created_at), int(message_count)
+                if not query.matches(message_count, created_at, now):
+                    continue
+                sessions.append({
+                    "session_id": session_id,
+                    "message_count": message_count,
+                    "created_at": created_at,
+                    "updated_at": float(updated_at)
+                })
+                last_key = (sort_value, session_id)
+                if len(sessions) >= query.limit:
+                    break
+            if stale:
+                await self._remove_from_indexes(stale)
+                # The removed entries were behind the offset
+                offset -= len(stale)
+
+        next_cursor = encode_cursor(*last_key) if last_key and len(sessions) >= query.limit else None
+        return sessions, next_cursor
+
+    async def count(self) -> int:
+        # Plain ZCARD: may include sessions expired since the last rate-limited prune
+        return await self.pool.execute("ZCARD", self._index_keys["created_at"])
+
+    async def close(self):
+        await self.pool.close()
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis",
+            "idle_ttl_seconds": self.idle_ttl,
+            "max_messages_per_session": self.max_messages,
+            "stale_index_entries_removed": self.stale_index_entries,
+            "pool": self.pool.stats()
+        }
+
+    async def _remove_from_indexes(self, session_ids: List[str]):
+        await self.pool.pipeline([
+            ("ZREM", self._index_keys["created_at"], *session_ids),
+            ("ZREM", self._index_keys["updated_at"], *session_ids)
+        ])
+        self.stale_index_entries += len(session_ids)
+
+    async def _maybe_prune(self):
+        """Drop index entries of sessions whose keys have expired, at most once a minute"""
+        now = time.time()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        candidates = await self.pool.execute(
+            "ZRANGEBYSCORE", self._index_keys["updated_at"], "-inf", f"({now - self.idle_ttl}"
+        )
+        if not candidates:
+            return
+        # Imported sessions keep their original updated_at but expire from their import time
+        session_ids = [session_id.decode("utf-8") for session_id in candidates]
+        alive = await self.pool.pipeline([("EXISTS", self._meta_key(session_id)) for session_id in session_ids])
+        expired = [session_id for session_id, exists in zip(session_ids, alive) if not exists]
+        if expired:
+            await self._remove_from_indexes(expired)
+            logger.info("Pruned %s expired chat sessions from the session indexes", len(expired))
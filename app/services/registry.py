@@ -0,0 +1,96 @@
+import os
+from typing import Optional
+import assemblyai as aai
+import httpx
+from murf import Murf
+from app.services.llm_clients import get_llm_client_registry
+from app.services.llm_service import LLMService
+from app.services.session_store import SessionStore, get_session_store
+from app.services.stt_service import STTService
+from app.services.tts_service import TTSService
+from app.utils.file_utils import FileUtils
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+def create_http_pool() -> httpx.Client:
+    """Keep-alive connection pool for one provider's SDK"""
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("HTTP_POOL_KEEPALIVE_SECONDS", "60"))
+        ),
+        timeout=float(os.getenv("HTTP_POOL_TIMEOUT_SECONDS", "60"))
+    )
+
+class ServiceRegistry:
+    """The services shared by every router in a worker.
+
+    Created once in the application lifespan and stored on
+    ``app.state.services``; routers receive the services through
+    dependencies in ``app.routers.dependencies``. ``create`` builds one
+    SDK client per provider: Murf on a keep-alive pool owned by the
+    registry, AssemblyAI on a single client whose connections every
+    transcription reuses, and Gemini on the process-wide client
+    registry. Pass instances to the constructor to swap in test doubles.
+    """
+
+    def __init__(
+        self,
+        tts: TTSService,
+        stt: STTService,
+        llm: LLMService,
+        file_utils: FileUtils,
+        session_store: SessionStore,
+        murf_http: Optional[httpx.Client] = None,
+        assemblyai_client: Optional[aai.Client] = None
+    ):
+        self.tts = tts
+        self.stt = stt
+        self.llm = llm
+        self.file_utils = file_utils
+        self.session_store = session_store
+        self.murf_http = murf_http
+        self.assemblyai_client = assemblyai_client
+        self.closed = False
+
+    @classmethod
+    def create(cls) -> "ServiceRegistry":
+        murf_http = create_http_pool()
+        try:
+            murf = Murf(api_key=os.getenv("MURF_API_KEY", "YOUR_MURF_API_KEY_HERE"), httpx_client=murf_http)
+        except TypeError:
+            # Older SDKs do not accept a client and manage their own connections
+            logger.warning("Murf SDK does not accept an HTTP client; using its own connection pool")
+            murf_http.close()
+            murf_http = None
+            murf = Murf(api_key=os.getenv("MURF_API_KEY", "YOUR_MURF_API_KEY_HERE"))
+
+        assemblyai_client = aai.Client(settings=aai.Settings(api_key=os.getenv("ASSEMBLY_AI_API_KEY", "YOUR_ASSEMBLY_AI_API_KEY_HERE")))
+
+        llm_clients = get_llm_client_registry()
+        llm_clients.configure()
+
+        return cls(
+            tts=TTSService(client=murf),
+            stt=STTService(transcriber=aai.Transcriber(client=assemblyai_client)),
+            llm=LLMService(clients=llm_clients),
+            file_utils=FileUtils(),
+            session_store=get_session_store(),
+            murf_http=murf_http,
+            assemblyai_client=assemblyai_client
+        )
+
+    async def close(self):
+        """Flush the session store and close provider connections"""
+        if self.closed:
+            return
+        self.closed = True
+        await self.session_store.close()
+        if self.murf_http is not None:
+            self.murf_http.close()
+        http_client = getattr(self.assemblyai_client, "http_client", None)
+        if http_client is not None:
+            http_client.close()
+        logger.info("Service registry closed")
@@ -0,0 +1,348 @@
+import asyncio
+import inspect
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from app.utils.logging import get_logger
+from app.utils.metrics import UPSTREAM_ERRORS, UPSTREAM_REQUEST_DURATION
+from app.utils.tracing import current_span, start_span
+
+logger = get_logger(__name__)
+
+# Default (attempt timeout, overall deadline) in seconds per provider
+PROVIDER_DEFAULTS = {
+    "murf": (15.0, 30.0),
+    "assemblyai": (120.0, 180.0),
+    "gemini": (20.0, 40.0)
+}
+
+# Exception class name fragments that indicate a transient upstream problem
+_TRANSIENT_ERROR_NAMES = (
+    "timeout", "unavailable", "deadlineexceeded", "resourceexhausted",
+    "internalservererror", "serviceunavailable", "connect", "remoteprotocol"
+)
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit breaker is open"""
+
+class UpstreamTimeoutError(Exception):
+    """Raised when a provider call exceeds its deadline"""
+
+def is_retryable(error: BaseException) -> bool:
+    """Decide whether an upstream error is transient and worth retrying"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (UpstreamTimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+
+    status_code = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status_code, int):
+        return status_code == 429 or status_code >= 500
+
+    name = type(error).__name__.lower()
+    return any(fragment in name for fragment in _TRANSIENT_ERROR_NAMES)
+
+class CircuitBreaker:
+    """Opens after consecutive transient failures and fails fast until a trial call succeeds"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Check whether a call may go to the provider"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.time() - self.opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+            self.trial_in_flight = False
+        if self.state == self.HALF_OPEN and not self.trial_in_flight:
+            # Let a single trial call through
+            self.trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    @property
+    def rejecting(self) -> bool:
+        """Whether calls are currently failing fast, without starting a trial"""
+        return self.state == self.OPEN and time.time() - self.opened_at < self.recovery_timeout
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.time()
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout,
+            "opened_at": self.opened_at,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
+
+class RetryBudget:
+    """Token bucket limiting retries to a fraction of first attempts.
+
+    Each first attempt deposits ``ratio`` tokens and each retry spends one,
+    so during an outage retries add at most ``ratio`` extra load.
+    """
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self):
+        self.tokens = min(self.tokens + self.ratio, self.max_tokens)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+class ResilientClient:
+    """Wraps calls to one upstream provider with deadlines, jittered retries and a circuit breaker.
+
+    Blocking SDK calls run on a thread pool owned by the provider, so a
+    slow provider cannot exhaust the threads other code gets from
+    ``asyncio.to_thread``. A timed-out thread cannot be killed: it stays
+    in flight until the SDK returns, and no retry is started while the
+    provider's threads are all in use. Streamed responses are bounded per
+    chunk by ``stream_idle_timeout``.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        attempt_timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        max_threads: Optional[int] = None,
+        stream_idle_timeout: Optional[float] = None
+    ):
+        env_prefix = provider.upper()
+        default_timeout, default_deadline = PROVIDER_DEFAULTS.get(provider, (15.0, 30.0))
+        self.provider = provider
+        self.attempt_timeout = attempt_timeout or float(os.getenv(f"{env_prefix}_TIMEOUT_SECONDS", default_timeout))
+        self.deadline = deadline or float(os.getenv(f"{env_prefix}_DEADLINE_SECONDS", default_deadline))
+        self.max_attempts = max_attempts or int(os.getenv(f"{env_prefix}_MAX_ATTEMPTS", "3"))
+        self.max_threads = max_threads or int(os.getenv(f"{env_prefix}_MAX_THREADS", "8"))
+        self.stream_idle_timeout = stream_idle_timeout or float(
+            os.getenv(f"{env_prefix}_STREAM_IDLE_TIMEOUT_SECONDS", self.attempt_timeout)
+        )
+        self._executor = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix=f"{provider}-calls")
+        self._in_flight_lock = threading.Lock()
+        # Calls submitted to the thread pool and not yet returned, including abandoned ones
+        self.in_flight = 0
+        self.base_backoff = float(os.getenv("RESILIENCE_BACKOFF_SECONDS", "0.2"))
+        self.max_backoff = float(os.getenv("RESILIENCE_MAX_BACKOFF_SECONDS", "2.0"))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv(f"{env_prefix}_BREAKER_THRESHOLD", "5")),
+            recovery_timeout=float(os.getenv(f"{env_prefix}_BREAKER_RECOVERY_SECONDS", "30"))
+        )
+        self.retry_budget = RetryBudget(ratio=float(os.getenv("RESILIENCE_RETRY_BUDGET_RATIO", "0.2")))
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.retries_denied = 0
+
+    async def call(self, func: Callable, *args, retry: bool = True, retry_timeouts: bool = True, **kwargs) -> Any:
+        """Call the provider, enforcing the breaker, deadline and retry budget.
+
+        Pass ``retry_timeouts=False`` for billed jobs that are not
+        idempotent: the timed-out attempt may still complete upstream.
+        """
+        if not self.breaker.allow():
+            UPSTREAM_ERRORS.inc(self.provider, "circuit_open")
+            raise CircuitOpenError(f"{self.provider} circuit breaker is open")
+
+        self.calls += 1
+        self.retry_budget.deposit()
+        deadline_at = time.monotonic() + self.deadline
+        attempt = 0
+
+        while True:
+            attempt += 1
+            remaining = deadline_at - time.monotonic()
+            attempt_start = time.perf_counter()
+            with start_span(f"{self.provider}.request", kind="client", attempt=attempt) as span:
+                try:
+                    result = await asyncio.wait_for(
+                        self._invoke(func, *args, **kwargs),
+                        timeout=max(min(self.attempt_timeout, remaining), 0.001)
+                    )
+                    UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - attempt_start, self.provider, "success")
+                    self.successes += 1
+                    self.breaker.record_success()
+                    return result
+
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    error = UpstreamTimeoutError(f"{self.provider} call timed out after attempt {attempt}")
+                except asyncio.CancelledError:
+                    # Cancelled by the caller (e.g. a losing hedge); free any half-open trial slot
+                    self.breaker.trial_in_flight = False
+                    raise
+                except Exception as e:
+                    error = e
+                span.record_error(error)
+
+            # Only transient errors count against the provider; a client error still
+            # proves it is reachable
+            transient = is_retryable(error)
+            if isinstance(error, UpstreamTimeoutError):
+                kind = "timeout"
+            else:
+                kind = "transient" if transient else "client"
+            UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - attempt_start, self.provider, kind)
+            UPSTREAM_ERRORS.inc(self.provider, kind)
+            if transient:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+            backoff = self._backoff(attempt)
+            can_retry = (
+                retry and transient
+                and (retry_timeouts or not isinstance(error, UpstreamTimeoutError))
+                and attempt < self.max_attempts
+                # A retry would only queue behind calls that are still hanging
+                and self.in_flight < self.max_threads
+                and self.breaker.state == CircuitBreaker.CLOSED
+                and deadline_at - time.monotonic() > backoff
+            )
+            if can_retry and not self.retry_budget.try_spend():
+                self.retries_denied += 1
+                can_retry = False
+
+            if not can_retry:
+                self.failures += 1
+                raise error
+
+            self.retries += 1
+            logger.warning("Retrying %s call (attempt %s) after: %s", self.provider, attempt + 1, error)
+            await asyncio.sleep(backoff)
+
+    async def stream(self, chunks: AsyncIterator) -> AsyncIterator:
+        """Yield from a streamed response, failing when no chunk arrives within the idle timeout.
+
+        The upstream iterator is closed when this generator is, so a caller
+        that stops early (e.g. a disconnected client) releases the stream.
+        """
+        iterator = chunks.__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout=self.stream_idle_timeout)
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    self.failures += 1
+                    self.breaker.record_failure()
+                    UPSTREAM_ERRORS.inc(self.provider, "timeout")
+                    raise UpstreamTimeoutError(
+                        f"{self.provider} stream sent nothing for {self.stream_idle_timeout:.0f}s"
+                    )
+                yield chunk
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def _invoke(self, func: Callable, *args, **kwargs) -> Any:
+        if inspect.iscoroutinefunction(func):
+            return await func(*args, **kwargs)
+        span = current_span()
+        queued_at = time.perf_counter()
+
+        def run():
+            # Time spent waiting for a free worker thread
+            if span is not None:
+                span.set_attribute("thread_queue_ms", round((time.perf_counter() - queued_at) * 1000, 3))
+            return func(*args, **kwargs)
+
+        with self._in_flight_lock:
+            self.in_flight += 1
+        future = self._executor.submit(run)
+        # Runs when the thread returns, even if the caller stopped waiting
+        future.add_done_callback(self._call_returned)
+        return await asyncio.wrap_future(future)
+
+    def _call_returned(self, future):
+        with self._in_flight_lock:
+            self.in_flight -= 1
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** (attempt - 1))))
+
+    def stats(self) -> dict:
+        """Get breaker state and call/retry counters"""
+        return {
+            "provider": self.provider,
+            "attempt_timeout": self.attempt_timeout,
+            "deadline": self.deadline,
+            "max_attempts": self.max_attempts,
+            "max_threads": self.max_threads,
+            "in_flight": self.in_flight,
+            "stream_idle_timeout": self.stream_idle_timeout,
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "retries_denied": self.retries_denied,
+            "retry_budget_tokens": round(self.retry_budget.tokens, 2),
+            "circuit_breaker": self.breaker.to_dict()
+        }
+
+_clients: Dict[str, ResilientClient] = {}
+
+def get_resilient_client(provider: str) -> ResilientClient:
+    """Get the shared resilience wrapper for a provider"""
+    client = _clients.get(provider)
+    if client is None:
+        client = _clients[provider] = ResilientClient(provider)
+    return client
+
+def open_circuits() -> List[str]:
+    """Get the providers whose circuit breaker is rejecting calls"""
+    return [provider for provider, client in _clients.items() if client.breaker.rejecting]
+
+def queued_calls() -> int:
+    """Get the number of blocking provider calls waiting for a free provider thread"""
+    return sum(max(client.in_flight - client.max_threads, 0) for client in _clients.values())
+
+def resilience_stats() -> dict:
+    """Get resilience statistics for every provider"""
+    return {provider: client.stats() for provider, client in _clients.items()}
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import urlparse
+from app.utils.logging import get_logger
+
+try:
+    import msgpack
+except ImportError:  # Optional: fall back to JSON encoding
+    msgpack = None
+
+logger = get_logger(__name__)
+
+class RespError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+def pack(value) -> bytes:
+    """Encode a value compactly, tagged with its codec so either codec can read it back"""
+    if msgpack is not None:
+        return b"m" + msgpack.packb(value, use_bin_type=True)
+    return b"j" + json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+def unpack(data: Optional[bytes]):
+    """Decode a value produced by pack"""
+    if data is None:
+        return None
+    codec, payload = data[:1], data[1:]
+    if codec == b"m":
+        if msgpack is None:
+            raise RuntimeError("msgpack is required to read this value")
+        return msgpack.unpackb(payload, raw=False)
+    return json.loads(payload)
+
+def _encode_command(args: Sequence) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        elif isinstance(arg, str):
+            data = arg.encode("utf-8")
+        else:
+            data = repr(arg).encode("ascii") if isinstance(arg, float) else str(arg).encode("ascii")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+async def read_reply(reader: asyncio.StreamReader):
+    """Read one RESP2 reply"""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by server")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode("utf-8")
+    if kind == b"-":
+        return RespError(body.decode("utf-8"))
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        count = int(body)
+        if count < 0:
+            return None
+        return [await read_reply(reader) for _ in range(count)]
+    raise ConnectionError(f"Unexpected RESP reply: {line!r}")
+
+class RespConnection:
+    """A single connection speaking the Redis protocol"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def execute_many(self, commands: List[Sequence]) -> list:
+        """Send commands in one write and read all replies (pipelining)"""
+        self.writer.write(b"".join(_encode_command(command) for command in commands))
+        await self.writer.drain()
+        return [await read_reply(self.reader) for _ in commands]
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except Exception:
+            pass
+
+class RespPool:
+    """Bounded pool of Redis-protocol connections"""
+
+    def __init__(self, url: str, max_connections: Optional[int] = None, timeout: Optional[float] = None):
+        parsed = urlparse(url)
+        self.url = url
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.max_connections = max_connections or int(os.getenv("REDIS_MAX_CONNECTIONS", "20"))
+        self.timeout = timeout or float(os.getenv("REDIS_TIMEOUT_SECONDS", "5"))
+        self.max_transaction_attempts = 5
+        self._idle: List[RespConnection] = []
+        self._open = 0
+        self._available = asyncio.Condition()
+        self.commands = 0
+        self.pipelines = 0
+
+    async def _connect(self) -> RespConnection:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), timeout=self.timeout
+        )
+        connection = RespConnection(reader, writer)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            for reply in await connection.execute_many(setup):
+                if isinstance(reply, RespError):
+                    await connection.close()
+                    raise reply
+        return connection
+
+    async def _acquire(self) -> RespConnection:
+        async with self._available:
+            while not self._idle and self._open >= self.max_connections:
+                await self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._open += 1
+        try:
+            return await self._connect()
+        except Exception:
+            async with self._available:
+                self._open -= 1
+                self._available.notify()
+            raise
+
+    async def _release(self, connection: RespConnection, healthy: bool):
+        async with self._available:
+            if healthy:
+                self._idle.append(connection)
+            else:
+                self._open -= 1
+            self._available.notify()
+        if not healthy:
+            await connection.close()
+
+    async def pipeline(self, commands: List[Sequence], raise_errors: bool = True) -> list:
+        """Run several commands in one round trip"""
+        connection = await self._acquire()
+        healthy = False
+        try:
+            replies = await asyncio.wait_for(connection.execute_many(commands), timeout=self.timeout)
+            healthy = True
+        finally:
+            await self._release(connection, healthy)
+        self.pipelines += 1
+        self.commands += len(commands)
+        if raise_errors:
+            for reply in replies:
+                if isinstance(reply, RespError):
+                    raise reply
+        return replies
+
+    async def execute(self, *args):
+        """Run a single command"""
+        return (await self.pipeline([args]))[0]
+
+    async def transaction(self, watch_keys: Sequence[str], check: Sequence, commands: List[Sequence]) -> Optional[list]:
+        """Run commands atomically, provided ``check`` returns a value and the watched keys stay unchanged.
+
+        WATCHes the keys and runs ``check`` in one round trip, then sends
+        the commands in MULTI/EXEC in a second one. Returns None without
+        writing when ``check`` replies nil or 0. If a watched key changes
+        (or expires) in between, EXEC is aborted and the check is repeated.
+        """
+        connection = await self._acquire()
+        healthy = False
+        try:
+            for _ in range(self.max_transaction_attempts):
+                _, checked = await asyncio.wait_for(
+                    connection.execute_many([("WATCH", *watch_keys), check]), timeout=self.timeout
+                )
+                if isinstance(checked, RespError):
+                    await asyncio.wait_for(connection.execute_many([("UNWATCH",)]), timeout=self.timeout)
+                    healthy = True
+                    raise checked
+                if not checked:
+                    await asyncio.wait_for(connection.execute_many([("UNWATCH",)]), timeout=self.timeout)
+                    healthy = True
+                    return None
+                replies = await asyncio.wait_for(
+                    connection.execute_many([("MULTI",), *commands, ("EXEC",)]), timeout=self.timeout
+                )
+                self.pipelines += 2
+                self.commands += len(commands) + 4
+                results = replies[-1]
+                if isinstance(results, RespError):
+                    healthy = True
+                    raise results
+                if results is not None:
+                    healthy = True
+                    for reply in results:
+                        if isinstance(reply, RespError):
+                            raise reply
+                    return results
+            healthy = True
+            raise RespError("ERR transaction aborted: watched keys kept changing")
+        finally:
+            await self._release(connection, healthy)
+
+    async def close(self):
+        async with self._available:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for connection in idle:
+            await connection.close()
+
+    def stats(self) -> dict:
+        return {
+            "url": f"{self.host}:{self.port}/{self.db}",
+            "open_connections": self._open,
+            "idle_connections": len(self._idle),
+            "max_connections": self.max_connections,
+            "commands": self.commands,
+            "pipelines": self.pipelines,
+            "codec": "msgpack" if msgpack is not None else "json"
+        }
+
+class RespCache:
+    """Shared key/value cache on a Redis-protocol server"""
+
+    def __init__(self, pool: RespPool, namespace: str = "cache"):
+        self.pool = pool
+        self.prefix = f"{os.getenv('REDIS_KEY_PREFIX', 'voice-agents')}:{namespace}:"
+
+    async def get(self, key: str):
+        return unpack(await self.pool.execute("GET", self.prefix + key))
+
+    async def set(self, key: str, value, ttl: Optional[float] = None):
+        if ttl:
+            await self.pool.execute("SET", self.prefix + key, pack(value), "PX", int(ttl * 1000))
+        else:
+            await self.pool.execute("SET", self.prefix + key, pack(value))
+
+    async def delete(self, key: str) -> bool:
+        return bool(await self.pool.execute("DEL", self.prefix + key))
+
+_pools: Dict[str, RespPool] = {}
+
+def get_resp_pool(url: Optional[str] = None) -> RespPool:
+    """Get the shared connection pool for a Redis URL"""
+    url = url or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    pool = _pools.get(url)
+    if pool is None:
+        pool = _pools[url] = RespPool(url)
+    return pool
+
+async def close_resp_pools():
+    """Close all shared Redis-protocol connection pools"""
+    for pool in list(_pools.values()):
+        await pool.close()
+    _pools.clear()
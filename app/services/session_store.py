@@ -0,0 +1,358 @@
+import base64
+import bisect
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from app.models.schemas import ChatMessage, ChatSession
+from app.services.message_log import MessageLog
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Approximate fixed cost of a SessionRecord, its log arrays and index entries
+SESSION_OVERHEAD_BYTES = 512
+
+SORT_FIELDS = ("updated_at", "created_at")
+
+def encode_cursor(sort_value: float, session_id: str) -> str:
+    """Encode a pagination position as an opaque cursor"""
+    raw = json.dumps([sort_value, session_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        sort_value, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(sort_value), str(session_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+class SessionQuery:
+    """Sorting, filtering and pagination options for listing sessions"""
+
+    __slots__ = (
+        "sort_by", "descending", "cursor", "limit",
+        "min_messages", "max_messages", "min_age", "max_age"
+    )
+
+    def __init__(
+        self,
+        sort_by: str = "updated_at",
+        descending: bool = True,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        min_messages: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        min_age: Optional[float] = None,
+        max_age: Optional[float] = None
+    ):
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"sort_by must be one of: {', '.join(SORT_FIELDS)}")
+        self.sort_by = sort_by
+        self.descending = descending
+        self.cursor = decode_cursor(cursor) if cursor else None
+        self.limit = limit
+        self.min_messages = min_messages
+        self.max_messages = max_messages
+        # Ages are seconds since the session was created
+        self.min_age = min_age
+        self.max_age = max_age
+
+    def matches(self, message_count: int, created_at: float, now: float) -> bool:
+        if self.min_messages is not None and message_count < self.min_messages:
+            return False
+        if self.max_messages is not None and message_count > self.max_messages:
+            return False
+        age = now - created_at
+        if self.min_age is not None and age < self.min_age:
+            return False
+        if self.max_age is not None and age > self.max_age:
+            return False
+        return True
+
+class SessionRecord:
+    """Stored session: metadata plus a compact message log"""
+
+    __slots__ = ("session_id", "created_at", "updated_at", "last_access", "log")
+
+    def __init__(self, session_id: str, created_at: float, updated_at: float, log: Optional[MessageLog] = None):
+        self.session_id = session_id
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.last_access = time.time()
+        self.log = log if log is not None else MessageLog()
+
+    def to_chat_session(self, last_n: Optional[int] = None) -> ChatSession:
+        """Build the API model, with only the newest last_n messages if given"""
+        return ChatSession(
+            session_id=self.session_id,
+            messages=self.log.to_chat_messages(last_n),
+            created_at=self.created_at,
+            updated_at=self.updated_at
+        )
+
+class SessionStore:
+    """Interface for chat session storage"""
+
+    async def exists(self, session_id: str) -> bool:
+        """Check whether a live session exists, without loading its history"""
+        raise NotImplementedError
+
+    async def get(self, session_id: str, last_n: Optional[int] = None) -> Optional[ChatSession]:
+        """Get a session with its newest last_n messages, or None if it does not exist or has expired"""
+        raise NotImplementedError
+
+    async def message_count(self, session_id: str) -> int:
+        """Get the number of messages stored for a session"""
+        raise NotImplementedError
+
+    async def create(self, session_id: Optional[str] = None) -> ChatSession:
+        """Create an empty session"""
+        raise NotImplementedError
+
+    async def append_messages(self, session_id: str, messages: List[ChatMessage]) -> int:
+        """Append messages to a session and return its message count; raises KeyError if it does not exist"""
+        raise NotImplementedError
+
+    async def delete(self, session_id: str) -> bool:
+        """Delete a session, returning whether it existed"""
+        raise NotImplementedError
+
+    async def import_sessions(self, records: List[SessionRecord]) -> int:
+        """Bulk insert sessions, replacing stored sessions with the same ids, and return the number written"""
+        raise NotImplementedError
+
+    async def list_sessions(self, query: Optional[SessionQuery] = None) -> Tuple[List[dict], Optional[str]]:
+        """Get one page of session summaries and the cursor for the next page"""
+        raise NotImplementedError
+
+    async def count(self) -> int:
+        """Get the number of stored sessions"""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """Get store statistics"""
+        raise NotImplementedError
+
+    async def close(self):
+        """Release any resources held by the store"""
+
+class InMemorySessionStore(SessionStore):
+    """Process-local session store with a bounded footprint.
+
+    Sessions are kept in LRU order. The least recently used session is
+    evicted beyond ``max_sessions``, sessions idle for longer than
+    ``idle_ttl`` expire, and each session keeps only its newest
+    ``max_messages`` messages. History is held in compact MessageLogs and
+    Pydantic models are only built when a session is read. Sorted
+    (timestamp, session_id) indexes are maintained on every write so
+    listing pages never scans every session.
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        idle_ttl: Optional[float] = None,
+        max_messages: Optional[int] = None
+    ):
+        self.max_sessions = max_sessions or int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+        self.idle_ttl = idle_ttl or float(os.getenv("SESSION_IDLE_TTL_SECONDS", "3600"))
+        self.max_messages = max_messages or int(os.getenv("SESSION_MAX_MESSAGES", "200"))
+        self._sessions: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        self._index = {field: [] for field in SORT_FIELDS}
+        self.total_messages = 0
+        self.total_content_bytes = 0
+        self.total_log_bytes = 0
+        self.evicted = 0
+        self.expired = 0
+        self.trimmed_messages = 0
+
+    def _live_record(self, session_id: str) -> Optional[SessionRecord]:
+        """Get a record and mark it as used, expiring it if idle too long"""
+        record = self._sessions.get(session_id)
+        if record is None:
+            return None
+        if record.last_access + self.idle_ttl < time.time():
+            self._remove(session_id)
+            self.expired += 1
+            return None
+
+        record.last_access = time.time()
+        self._sessions.move_to_end(session_id)
+        return record
+
+    async def exists(self, session_id: str) -> bool:
+        return self._live_record(session_id) is not None
+
+    async def get(self, session_id: str, last_n: Optional[int] = None) -> Optional[ChatSession]:
+        record = self._live_record(session_id)
+        return record.to_chat_session(last_n) if record else None
+
+    async def message_count(self, session_id: str) -> int:
+        record = self._sessions.get(session_id)
+        return len(record.log) if record else 0
+
+    async def create(self, session_id: Optional[str] = None) -> ChatSession:
+        self._expire_idle()
+
+        now = time.time()
+        record = SessionRecord(session_id or str(uuid.uuid4()), now, now)
+        self._remove(record.session_id)
+        self._sessions[record.session_id] = record
+        bisect.insort(self._index["created_at"], (record.created_at, record.session_id))
+        bisect.insort(self._index["updated_at"], (record.updated_at, record.session_id))
+
+        while len(self._sessions) > self.max_sessions:
+            oldest_id = next(iter(self._sessions))
+            self._remove(oldest_id)
+            self.evicted += 1
+
+        return record.to_chat_session()
+
+    async def append_messages(self, session_id: str, messages: List[ChatMessage]) -> int:
+        record = self._sessions.get(session_id)
+        if record is None:
+            raise KeyError(session_id)
+
+        content_before, log_before = record.log.content_bytes, record.log.nbytes
+        record.log.extend(messages)
+        self.total_messages += len(messages)
+
+        # Keep only the newest messages
+        dropped = record.log.trim(self.max_messages)
+        self.total_messages -= dropped
+        self.trimmed_messages += dropped
+        self.total_content_bytes += record.log.content_bytes - content_before
+        self.total_log_bytes += record.log.nbytes - log_before
+
+        self._index_remove("updated_at", record.updated_at, session_id)
+        record.updated_at = time.time()
+        bisect.insort(self._index["updated_at"], (record.updated_at, session_id))
+        record.last_access = record.updated_at
+        self._sessions.move_to_end(session_id)
+        return len(record.log)
+
+    async def delete(self, session_id: str) -> bool:
+        return self._remove(session_id)
+
+    async def import_sessions(self, records: List[SessionRecord]) -> int:
+        for record in records:
+            self._remove(record.session_id)
+            dropped = record.log.trim(self.max_messages)
+            self.trimmed_messages += dropped
+            self._sessions[record.session_id] = record
+            bisect.insort(self._index["created_at"], (record.created_at, record.session_id))
+            bisect.insort(self._index["updated_at"], (record.updated_at, record.session_id))
+            self.total_messages += len(record.log)
+            self.total_content_bytes += record.log.content_bytes
+            self.total_log_bytes += record.log.nbytes
+
+        while len(self._sessions) > self.max_sessions:
+            oldest_id = next(iter(self._sessions))
+            self._remove(oldest_id)
+            self.evicted += 1
+        return len(records)
+
+    async def list_sessions(self, query: Optional[SessionQuery] = None) -> Tuple[List[dict], Optional[str]]:
+        query = query or SessionQuery()
+        self._expire_idle()
+        index = self._index[query.sort_by]
+
+        # Walk the sorted index from the cursor position
+        if query.descending:
+            position = bisect.bisect_left(index, query.cursor) if query.cursor else len(index)
+            positions = range(position - 1, -1, -1)
+        else:
+            position = bisect.bisect_right(index, query.cursor) if query.cursor else 0
+            positions = range(position, len(index))
+
+        now = time.time()
+        sessions = []
+        last_key = None
+        for i in positions:
+            sort_value, session_id = index[i]
+            record = self._sessions[session_id]
+            if not query.matches(len(record.log), record.created_at, now):
+                continue
+            sessions.append({
+                "session_id": session_id,
+                "message_count": len(record.log),
+                "created_at": record.created_at,
+                "updated_at": record.updated_at
+            })
+            last_key = (sort_value, session_id)
+            if len(sessions) >= query.limit:
+                break
+
+        next_cursor = encode_cursor(*last_key) if last_key and len(sessions) >= query.limit else None
+        return sessions, next_cursor
+
+    async def count(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "idle_ttl_seconds": self.idle_ttl,
+            "max_messages_per_session": self.max_messages,
+            "messages": self.total_messages,
+            "content_bytes": self.total_content_bytes,
+            "approx_memory_bytes": self.total_log_bytes + len(self._sessions) * SESSION_OVERHEAD_BYTES,
+            "evicted": self.evicted,
+            "expired": self.expired,
+            "trimmed_messages": self.trimmed_messages
+        }
+
+    def _remove(self, session_id: str) -> bool:
+        record = self._sessions.pop(session_id, None)
+        if record is None:
+            return False
+        self._index_remove("created_at", record.created_at, session_id)
+        self._index_remove("updated_at", record.updated_at, session_id)
+        self.total_messages -= len(record.log)
+        self.total_content_bytes -= record.log.content_bytes
+        self.total_log_bytes -= record.log.nbytes
+        return True
+
+    def _index_remove(self, field: str, sort_value: float, session_id: str):
+        index = self._index[field]
+        i = bisect.bisect_left(index, (sort_value, session_id))
+        if i < len(index) and index[i] == (sort_value, session_id):
+            del index[i]
+
+    def _expire_idle(self):
+        """Drop idle sessions from the least recently used end"""
+        cutoff = time.time() - self.idle_ttl
+        while self._sessions:
+            session_id, record = next(iter(self._sessions.items()))
+            if record.last_access >= cutoff:
+                break
+            self._remove(session_id)
+            self.expired += 1
+
+def create_session_store() -> SessionStore:
+    """Create the session store selected by SESSION_STORE_BACKEND"""
+    backend = os.getenv("SESSION_STORE_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        from app.services.sqlite_session_store import SQLiteSessionStore
+        return SQLiteSessionStore()
+    if backend == "redis":
+        from app.services.redis_session_store import RedisSessionStore
+        return RedisSessionStore()
+    if backend != "memory":
+        logger.warning("Unknown session store backend '%s', using memory", backend)
+    return InMemorySessionStore()
+
+_store: Optional[SessionStore] = None
+
+def get_session_store() -> SessionStore:
+    """Get the process-wide session store"""
+    global _store
+    if _store is None:
+        _store = create_session_store()
+    return _store
@@ -0,0 +1,137 @@
+import json
+import os
+from typing import AsyncIterator, List, Optional
+from app.services.message_log import MessageLog
+from app.services.session_store import SessionQuery, SessionRecord, SessionStore, decode_cursor
+from app.utils.logging import get_logger
+from app.utils.ndjson import iter_ndjson_lines
+
+logger = get_logger(__name__)
+
+# Errors reported back to the client per import; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+async def export_sessions(store: SessionStore, query: SessionQuery) -> AsyncIterator[str]:
+    """Yield matching sessions as NDJSON lines, one session per line.
+
+    Sessions are read one page at a time, so memory stays bounded by the
+    page size no matter how many sessions are exported.
+    """
+    exported = 0
+    while True:
+        page, next_cursor = await store.list_sessions(query)
+        for summary in page:
+            session = await store.get(summary["session_id"])
+            if session is None:
+                # Deleted or expired since the page was listed
+                continue
+            exported += 1
+            yield session.model_dump_json() + "\n"
+        if not next_cursor:
+            break
+        query.cursor = decode_cursor(next_cursor)
+    logger.info("Exported %s chat sessions", exported)
+
+def parse_session_line(line: bytes) -> SessionRecord:
+    """Build a SessionRecord from one exported NDJSON line"""
+    data = json.loads(line)
+    log = MessageLog()
+    for message in data.get("messages") or ():
+        log.append(str(message["role"]), str(message["content"]), float(message["timestamp"]))
+    return SessionRecord(
+        str(data["session_id"]),
+        float(data["created_at"]),
+        float(data["updated_at"]),
+        log
+    )
+
+class SessionImportError(Exception):
+    """Raised when an import stops on a store error; ``result`` says which lines are committed"""
+
+    def __init__(self, message: str, result: dict):
+        super().__init__(message)
+        self.result = result
+
+class SessionImporter:
+    """Stream NDJSON sessions into a store in bulk batches.
+
+    Imports are idempotent (a session replaces any stored session with the
+    same id) and report how many lines were committed, so an interrupted
+    import can be resumed with ``skip_lines`` or simply re-run. Lines that
+    cannot be imported, including lines over ``max_line_bytes``, are
+    reported as failed and consumed, so a resumed import never stops on
+    them again.
+    """
+
+    def __init__(self, store: SessionStore, batch_size: Optional[int] = None, max_line_bytes: Optional[int] = None):
+        self.store = store
+        self.batch_size = batch_size or int(os.getenv("SESSION_IMPORT_BATCH_SIZE", "100"))
+        self.max_line_bytes = max_line_bytes or int(os.getenv("SESSION_IMPORT_MAX_LINE_BYTES", str(16 * 1024 * 1024)))
+
+    async def run(self, chunks: AsyncIterator[bytes], skip_lines: int = 0) -> dict:
+        line_number = 0
+        committed_lines = skip_lines
+        imported = 0
+        messages = 0
+        failed = 0
+        errors: List[dict] = []
+        batch: List[SessionRecord] = []
+
+        async def commit():
+            nonlocal imported, messages, committed_lines
+            imported += await self.store.import_sessions(batch)
+            messages += sum(len(record.log) for record in batch)
+            committed_lines = line_number
+            batch.clear()
+
+        try:
+            async for line in iter_ndjson_lines(chunks, self.max_line_bytes, skip_oversized=True):
+                line_number += 1
+                if line_number <= skip_lines:
+                    continue
+                if line is None:
+                    failed += 1
+                    if len(errors) < MAX_REPORTED_ERRORS:
+                        errors.append({"line": line_number, "error": f"Line exceeds {self.max_line_bytes} bytes"})
+                    continue
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(parse_session_line(line))
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    failed += 1
+                    if len(errors) < MAX_REPORTED_ERRORS:
+                        errors.append({"line": line_number, "error": str(e)})
+                    continue
+                if len(batch) >= self.batch_size:
+                    await commit()
+            if batch:
+                await commit()
+            committed_lines = max(committed_lines, line_number)
+        except Exception as e:
+            logger.warning("Session import interrupted; lines up to %s are committed", committed_lines)
+            result = self._result(False, imported, messages, failed, errors, committed_lines, f"Import interrupted: {e}")
+            raise SessionImportError(str(e), result) from e
+
+        logger.info("Imported %s chat sessions (%s messages), %s lines failed", imported, messages, failed)
+        return self._result(True, imported, messages, failed, errors, committed_lines, None)
+
+    @staticmethod
+    def _result(
+        complete: bool,
+        imported: int,
+        messages: int,
+        failed: int,
+        errors: List[dict],
+        committed_lines: int,
+        error: Optional[str]
+    ) -> dict:
+        return {
+            "success": complete,
+            "imported_sessions": imported,
+            "imported_messages": messages,
+            "failed_lines": failed,
+            "errors": errors,
+            "committed_lines": committed_lines,
+            "error": error
+        }
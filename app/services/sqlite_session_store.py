@@ -0,0 +1,427 @@
+import asyncio
+import os
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from app.models.schemas import ChatMessage, ChatSession
+from app.services.message_log import MessageLog
+from app.services.session_store import SessionQuery, SessionRecord, SessionStore, encode_cursor
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions (updated_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_created_at ON sessions (created_at);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session_timestamp ON messages (session_id, timestamp);
+"""
+
+class SQLiteSessionStore(SessionStore):
+    """Session store in a WAL-mode SQLite database shared by all workers on a host.
+
+    Messages are append-only rows, trimmed to the newest ``max_messages``
+    per session when a batch is written; ``message_count`` still counts
+    every message appended. Appends are buffered and written in
+    batches by a background flusher; each worker keeps a small read-through
+    cache that is revalidated against the session's ``updated_at`` so turns
+    handled by other workers are picked up.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        cache_size: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        retention: Optional[float] = None
+    ):
+        self.path = Path(path or os.getenv("SESSION_SQLITE_PATH", "data/sessions.db"))
+        self.cache_size = cache_size or int(os.getenv("SESSION_SQLITE_CACHE_SIZE", "256"))
+        self.max_messages = max_messages or int(os.getenv("SESSION_MAX_MESSAGES", "200"))
+        self.retention = retention or float(os.getenv("SESSION_SQLITE_RETENTION_SECONDS", str(7 * 24 * 3600)))
+        self.flush_interval = float(os.getenv("SESSION_SQLITE_FLUSH_MS", "50")) / 1000
+        self.batch_size = int(os.getenv("SESSION_SQLITE_BATCH_SIZE", "256"))
+
+        # All database access happens on one thread that owns the connection
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-sessions")
+        self._connection: Optional[sqlite3.Connection] = None
+        self._cache: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        self._pending: Dict[str, List[Tuple[str, str, float]]] = {}
+        # updated_at each pending session had in the database when its messages were appended
+        self._pending_base: Dict[str, float] = {}
+        self._pending_count = 0
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._last_prune = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            with connection:
+                # Messages written by earlier versions for sessions deleted meanwhile
+                connection.execute(
+                    "DELETE FROM messages WHERE session_id NOT IN (SELECT session_id FROM sessions)"
+                )
+            self._connection = connection
+        return self._connection
+
+    async def _record(self, session_id: str) -> Optional[SessionRecord]:
+        """Get the cached record, reloading it if another worker changed the session"""
+        if session_id in self._pending:
+            await self.flush()
+
+        row = await self._run(self._select_session, session_id)
+        if row is None:
+            self._cache.pop(session_id, None)
+            return None
+
+        created_at, updated_at = row
+        cached = self._cache.get(session_id)
+        if cached is not None and cached.updated_at == updated_at:
+            self._cache.move_to_end(session_id)
+            self.cache_hits += 1
+            return cached
+
+        # Another worker changed the session (or it is not cached): reload recent history
+        self.cache_misses += 1
+        rows = await self._run(self._select_messages, session_id, self.max_messages)
+        log = MessageLog()
+        for role, content, ts in rows:
+            log.append(role, content, ts)
+        record = SessionRecord(session_id, created_at, updated_at, log)
+        self._cache_put(record)
+        return record
+
+    async def exists(self, session_id: str) -> bool:
+        return await self._run(self._select_session, session_id) is not None
+
+    async def get(self, session_id: str, last_n: Optional[int] = None) -> Optional[ChatSession]:
+        record = await self._record(session_id)
+        return record.to_chat_session(last_n) if record else None
+
+    async def message_count(self, session_id: str) -> int:
+        count = await self._run(self._select_message_count, session_id)
+        return count + len(self._pending.get(session_id, ()))
+
+    async def create(self, session_id: Optional[str] = None) -> ChatSession:
+        now = time.time()
+        record = SessionRecord(session_id or str(uuid.uuid4()), now, now)
+        # Written immediately so other workers can see the session
+        await self._run(self._insert_session, record.session_id, now)
+        self._cache_put(record)
+        await self._maybe_prune()
+        return record.to_chat_session()
+
+    async def append_messages(self, session_id: str, messages: List[ChatMessage]) -> int:
+        # Revalidate so turns written by other workers are not overwritten by a stale cache
+        record = await self._record(session_id)
+        if record is None:
+            raise KeyError(session_id)
+
+        now = time.time()
+        self._pending_base.setdefault(session_id, record.updated_at)
+        record.log.extend(messages)
+        record.log.trim(self.max_messages)
+        record.updated_at = now
+
+        pending = self._pending.setdefault(session_id, [])
+        pending.extend((message.role, message.content, message.timestamp) for message in messages)
+        self._pending_count += len(messages)
+        self._ensure_flusher()
+        if self._pending_count >= self.batch_size:
+            await self.flush()
+
+        return await self.message_count(session_id)
+
+    async def delete(self, session_id: str) -> bool:
+        self._pending_count -= len(self._pending.pop(session_id, ()))
+        self._pending_base.pop(session_id, None)
+        self._cache.pop(session_id, None)
+        return await self._run(self._delete_session, session_id)
+
+    async def import_sessions(self, records: List[SessionRecord]) -> int:
+        for record in records:
+            # Imported sessions replace any buffered or cached state
+            self._pending_count -= len(self._pending.pop(record.session_id, ()))
+            self._pending_base.pop(record.session_id, None)
+            self._cache.pop(record.session_id, None)
+        rows = [
+            (record.session_id, record.created_at, record.updated_at, len(record.log), record.log.last(self.max_messages))
+            for record in records
+        ]
+        await self._run(self._replace_sessions, rows)
+        self.rows_written += sum(len(messages) for *_, messages in rows)
+        return len(records)
+
+    async def list_sessions(self, query: Optional[SessionQuery] = None) -> Tuple[List[dict], Optional[str]]:
+        query = query or SessionQuery()
+        await self.flush()
+        rows = await self._run(self._select_page, query)
+        sessions = [
+            {
+                "session_id": session_id,
+                "message_count": message_count,
+                "created_at": created_at,
+                "updated_at": updated_at
+            }
+            for session_id, message_count, created_at, updated_at in rows
+        ]
+
+        next_cursor = None
+        if len(sessions) >= query.limit:
+            last = sessions[-1]
+            next_cursor = encode_cursor(last[query.sort_by], last["session_id"])
+        return sessions, next_cursor
+
+    async def count(self) -> int:
+        return await self._run(self._select_count)
+
+    async def flush(self):
+        """Write buffered messages in a single transaction"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, bases = self._pending, self._pending_base
+            self._pending, self._pending_base = {}, {}
+            self._pending_count = 0
+            updated = {
+                session_id: self._cache[session_id].updated_at if session_id in self._cache else time.time()
+                for session_id in batch
+            }
+            try:
+                stale = await self._run(self._write_batch, batch, updated, bases)
+            except BaseException:
+                # Put the batch back ahead of anything appended meanwhile so it is retried in order
+                for session_id, rows in batch.items():
+                    self._pending[session_id] = rows + self._pending.get(session_id, [])
+                    self._pending_base[session_id] = bases[session_id]
+                self._pending_count = sum(len(rows) for rows in self._pending.values())
+                raise
+            for session_id in stale:
+                # Another worker wrote to the session since it was cached: reload on next read
+                self._cache.pop(session_id, None)
+            self.flushes += 1
+            self.rows_written += sum(len(rows) for rows in batch.values())
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+        if self._connection is not None:
+            await self._run(self._connection.close)
+            self._connection = None
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "sqlite",
+            "path": str(self.path),
+            "cached_sessions": len(self._cache),
+            "cache_size": self.cache_size,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "pending_messages": self._pending_count,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "max_messages_per_session": self.max_messages,
+            "retention_seconds": self.retention
+        }
+
+    def _cache_put(self, record: SessionRecord):
+        self._cache[record.session_id] = record
+        self._cache.move_to_end(record.session_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _ensure_flusher(self):
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while self._pending:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Session flush error: %s", e)
+
+    async def _maybe_prune(self):
+        """Delete sessions idle beyond the retention period, at most once a minute"""
+        now = time.time()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        removed = await self._run(self._delete_idle, now - self.retention)
+        if removed:
+            logger.info("Pruned %s idle chat sessions", removed)
+
+    # Database operations, run on the store's thread
+
+    def _select_session(self, session_id: str):
+        return self._db().execute(
+            "SELECT created_at, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+
+    def _select_messages(self, session_id: str, limit: int):
+        rows = self._db().execute(
+            "SELECT role, content, timestamp FROM messages WHERE session_id = ? "
+            "ORDER BY timestamp DESC, id DESC LIMIT ?",
+            (session_id, limit)
+        ).fetchall()
+        rows.reverse()
+        return rows
+
+    def _select_message_count(self, session_id: str) -> int:
+        row = self._db().execute(
+            "SELECT message_count FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _select_page(self, query: SessionQuery):
+        # Keyset pagination over the (sort column, session_id) order, served by the column's index
+        column = query.sort_by
+        direction = "DESC" if query.descending else "ASC"
+        comparison = "<" if query.descending else ">"
+        conditions = []
+        params: list = []
+
+        if query.cursor:
+            sort_value, session_id = query.cursor
+            conditions.append(f"({column} {comparison} ? OR ({column} = ? AND session_id {comparison} ?))")
+            params.extend([sort_value, sort_value, session_id])
+        if query.min_messages is not None:
+            conditions.append("message_count >= ?")
+            params.append(query.min_messages)
+        if query.max_messages is not None:
+            conditions.append("message_count <= ?")
+            params.append(query.max_messages)
+        now = time.time()
+        if query.min_age is not None:
+            conditions.append("created_at <= ?")
+            params.append(now - query.min_age)
+        if query.max_age is not None:
+            conditions.append("created_at >= ?")
+            params.append(now - query.max_age)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(query.limit)
+        return self._db().execute(
+            f"SELECT session_id, message_count, created_at, updated_at FROM sessions {where} "
+            f"ORDER BY {column} {direction}, session_id {direction} LIMIT ?",
+            params
+        ).fetchall()
+
+    def _select_count(self) -> int:
+        return self._db().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def _insert_session(self, session_id: str, now: float):
+        db = self._db()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, created_at, updated_at, message_count) "
+                "VALUES (?, ?, ?, 0)",
+                (session_id, now, now)
+            )
+
+    def _write_batch(
+        self,
+        batch: Dict[str, List[Tuple[str, str, float]]],
+        updated: Dict[str, float],
+        bases: Dict[str, float]
+    ) -> List[str]:
+        """Write the batch and return the sessions changed or deleted by another worker since they were read"""
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            stale = []
+            live = {}
+            for session_id, rows in batch.items():
+                row = db.execute("SELECT updated_at FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+                if row is None or row[0] != bases[session_id]:
+                    stale.append(session_id)
+                # Messages of a session deleted meanwhile are dropped; nothing would ever remove them
+                if row is not None:
+                    live[session_id] = rows
+            db.executemany(
+                "INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                [(session_id, role, content, ts) for session_id, rows in live.items() for role, content, ts in rows]
+            )
+            db.executemany(
+                "UPDATE sessions SET updated_at = MAX(updated_at, ?), message_count = message_count + ? "
+                "WHERE session_id = ?",
+                [(updated[session_id], len(rows), session_id) for session_id, rows in live.items()]
+            )
+            self._trim_messages(db, list(live))
+        return stale
+
+    def _trim_messages(self, db: sqlite3.Connection, session_ids: List[str]):
+        """Keep only the newest max_messages rows of each session, in history order"""
+        db.executemany(
+            "DELETE FROM messages WHERE session_id = ? AND id NOT IN ("
+            "SELECT id FROM messages WHERE session_id = ? ORDER BY timestamp DESC, id DESC LIMIT ?)",
+            [(session_id, session_id, self.max_messages) for session_id in session_ids]
+        )
+
+    def _replace_sessions(self, rows: List[Tuple[str, float, float, int, List[Tuple[str, str, float]]]]):
+        db = self._db()
+        with db:
+            db.executemany("DELETE FROM messages WHERE session_id = ?", [(row[0],) for row in rows])
+            db.executemany(
+                "INSERT OR REPLACE INTO sessions (session_id, created_at, updated_at, message_count) "
+                "VALUES (?, ?, ?, ?)",
+                [(session_id, created_at, updated_at, count) for session_id, created_at, updated_at, count, _ in rows]
+            )
+            db.executemany(
+                "INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                [
+                    (session_id, role, content, ts)
+                    for session_id, _, _, _, messages in rows
+                    for role, content, ts in messages
+                ]
+            )
+
+    def _delete_session(self, session_id: str) -> bool:
+        db = self._db()
+        with db:
+            cursor = db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        return cursor.rowcount > 0
+
+    def _delete_idle(self, cutoff: float) -> int:
+        db = self._db()
+        with db:
+            idle = [row[0] for row in db.execute(
+                "SELECT session_id FROM sessions WHERE updated_at < ?", (cutoff,)
+            )]
+            db.executemany("DELETE FROM messages WHERE session_id = ?", [(sid,) for sid in idle])
+            db.executemany("DELETE FROM sessions WHERE session_id = ?", [(sid,) for sid in idle])
+        return len(idle)
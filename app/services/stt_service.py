@@ -1,23 +1,29 @@
 import os
-import time
 from typing import Optional
 from pathlib import Path
 import assemblyai as aai
 from app.models.schemas import TranscriptionResponse
+from app.services.resilience import get_resilient_client
 from app.utils.logging import get_logger
+from app.utils.blob_store import get_blob_store
+from app.utils.tracing import start_span
 
 logger = get_logger(__name__)
 
 class STTService:
-    def __init__(self):
+    def __init__(self, transcriber: Optional[aai.Transcriber] = None):
         self.api_key = os.getenv("ASSEMBLY_AI_API_KEY", "YOUR_ASSEMBLY_AI_API_KEY_HERE")
-        aai.settings.api_key = self.api_key
-        self.transcriber = aai.Transcriber()
+        if transcriber is None:
+            aai.settings.api_key = self.api_key
+            transcriber = aai.Transcriber()
+        self.transcriber = transcriber
+        self.resilience = get_resilient_client("assemblyai")
+        self.blobs = get_blob_store()
         
     async def transcribe_audio(self, audio_file_path: str) -> TranscriptionResponse:
         """Transcribe audio file using AssemblyAI"""
         try:
-            logger.info(f"Transcribing audio file: {audio_file_path}")
+            logger.info("Transcribing audio file: %s", audio_file_path)
             
             # Check if file exists
             if not Path(audio_file_path).exists():
@@ -26,8 +32,14 @@ class STTService:
                     message="Audio file not found"
                 )
             
-            # Transcribe audio
-            transcript = self.transcriber.transcribe(audio_file_path)
+            # Transcribe audio with deadline, retries and circuit breaker; the SDK uploads,
+            # submits and polls within this call, so a timed-out attempt is not retried: the
+            # billed job may still be running
+            with start_span("stt.transcribe") as span:
+                transcript = await self.resilience.call(
+                    self.transcriber.transcribe, audio_file_path, retry_timeouts=False
+                )
+                span.set_attribute("stt.status", str(transcript.status))
             
             if transcript.status == aai.TranscriptStatus.error:
                 return TranscriptionResponse(
@@ -44,11 +56,11 @@ class STTService:
                 audio_duration=transcript.audio_duration
             )
             
-            logger.info(f"Transcription successful: {len(transcript.text)} characters")
+            logger.info("Transcription successful: %s characters", len(transcript.text))
             return response
             
         except Exception as e:
-            logger.error(f"Transcription error: {str(e)}")
+            logger.error("Transcription error: %s", e)
             return TranscriptionResponse(
                 success=False,
                 message=f"Error transcribing audio: {str(e)}"
@@ -57,26 +69,26 @@ class STTService:
     async def transcribe_uploaded_file(self, file_content: bytes, filename: str) -> TranscriptionResponse:
         """Transcribe uploaded audio file"""
         try:
-            logger.info(f"Transcribing uploaded file: {filename}")
+            logger.info("Transcribing uploaded file: %s", filename)
             
             # Save uploaded file temporarily
-            temp_path = Path("uploads") / filename
-            temp_path.parent.mkdir(exist_ok=True)
-            
-            with open(temp_path, "wb") as f:
-                f.write(file_content)
-            
-            # Transcribe the file
-            result = await self.transcribe_audio(str(temp_path))
+            with start_span("stt.file_write", bytes=len(file_content)) as span:
+                blob = self.blobs.put_bytes(file_content, Path(filename).suffix)
+                span.set_attribute("deduplicated", not blob.created)
             
-            # Clean up temp file
-            if temp_path.exists():
-                temp_path.unlink()
+            # Lease the content so no other worker or the janitor can remove it mid-transcription
+            lease_path = self.blobs.lease(blob.path)
+            try:
+                # Transcribe the file
+                result = await self.transcribe_audio(str(lease_path))
+            finally:
+                # Remove the file only if this request created it and nobody else stored or leased it since
+                self.blobs.release(lease_path, blob)
             
             return result
             
         except Exception as e:
-            logger.error(f"Upload transcription error: {str(e)}")
+            logger.error("Upload transcription error: %s", e)
             return TranscriptionResponse(
                 success=False,
                 message=f"Error processing uploaded audio: {str(e)}"
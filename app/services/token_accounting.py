@@ -0,0 +1,209 @@
+import math
+import os
+import re
+from collections import OrderedDict
+from typing import Optional
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Estimate the token count of text without calling the API.
+
+    Takes the larger of the word/punctuation piece count and the common
+    four-characters-per-token rule, which tracks Gemini's tokenizer closely
+    enough for budgeting.
+    """
+    if not text:
+        return 0
+    return max(len(_TOKEN_RE.findall(text)), math.ceil(len(text) / 4))
+
+class TokenUsage:
+    """Prompt and completion token counts for one LLM call"""
+
+    __slots__ = ("prompt_tokens", "completion_tokens", "estimated")
+
+    def __init__(self, prompt_tokens: int = 0, completion_tokens: int = 0, estimated: bool = False):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.estimated = estimated
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def to_dict(self) -> dict:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "estimated": self.estimated
+        }
+
+def usage_from_response(response, prompt_text: str, completion_text: Optional[str]) -> TokenUsage:
+    """Read token counts from Gemini usage metadata, estimating whatever is missing.
+
+    The pinned google-generativeai 0.3.2 returns no usage metadata, so with
+    it every count is an estimate.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None) if usage else None
+    completion_tokens = getattr(usage, "candidates_token_count", None) if usage else None
+
+    estimated = False
+    if not prompt_tokens:
+        prompt_tokens = estimate_tokens(prompt_text)
+        estimated = True
+    if completion_tokens is None:
+        completion_tokens = estimate_tokens(completion_text)
+        estimated = True
+
+    return TokenUsage(prompt_tokens, completion_tokens, estimated)
+
+class _UsageTotals:
+    __slots__ = ("calls", "prompt_tokens", "completion_tokens")
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, usage: TokenUsage):
+        self.calls += 1
+        self.prompt_tokens += usage.prompt_tokens
+        self.completion_tokens += usage.completion_tokens
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens
+        }
+
+class TokenBudgetExceeded(Exception):
+    """Raised when a session has no token budget left"""
+
+class TokenAccountant:
+    """Aggregates token usage per session, model and route and enforces session budgets.
+
+    Usage is held in this process only: with several workers each one
+    enforces the budget separately, so a session can use up to one budget
+    per worker. Sessions beyond ``max_sessions`` are forgotten least
+    recently used first, and a forgotten session starts over with a full
+    budget.
+    """
+
+    def __init__(self, session_budget: Optional[int] = None, max_sessions: Optional[int] = None):
+        # A budget of 0 disables enforcement
+        self.session_budget = (
+            session_budget if session_budget is not None
+            else int(os.getenv("LLM_SESSION_TOKEN_BUDGET", "0"))
+        )
+        self.max_sessions = max_sessions or int(os.getenv("LLM_USAGE_MAX_SESSIONS", "10000"))
+        self.totals = _UsageTotals()
+        self.by_model: dict = {}
+        self.by_route: dict = {}
+        self.by_session: "OrderedDict[str, _UsageTotals]" = OrderedDict()
+        self.budget_rejections = 0
+        self.budget_truncations = 0
+
+    def record(
+        self,
+        usage: TokenUsage,
+        model: str,
+        route: str,
+        session_id: Optional[str] = None
+    ):
+        """Record token usage for a completed call"""
+        self.totals.add(usage)
+        self.by_model.setdefault(model, _UsageTotals()).add(usage)
+        self.by_route.setdefault(route, _UsageTotals()).add(usage)
+
+        if session_id:
+            totals = self.by_session.get(session_id)
+            if totals is None:
+                totals = self.by_session[session_id] = _UsageTotals()
+            self.by_session.move_to_end(session_id)
+            totals.add(usage)
+            # Forget the least recently active sessions beyond the cap
+            while len(self.by_session) > self.max_sessions:
+                self.by_session.popitem(last=False)
+
+    def remaining_budget(self, session_id: Optional[str]) -> Optional[int]:
+        """Tokens left for a session, or None when no budget applies"""
+        if not session_id or self.session_budget <= 0:
+            return None
+        totals = self.by_session.get(session_id)
+        used = totals.total_tokens if totals else 0
+        return max(self.session_budget - used, 0)
+
+    def plan_max_tokens(
+        self,
+        session_id: Optional[str],
+        prompt_text: str,
+        requested_max_tokens: Optional[int]
+    ) -> Optional[int]:
+        """Return the output token limit allowed by the session budget.
+
+        Shortens generation when the budget is nearly spent and raises
+        TokenBudgetExceeded when the prompt alone would exceed it. Only a
+        requested limit that had to be lowered counts as a truncation.
+        """
+        remaining = self.remaining_budget(session_id)
+        if remaining is None:
+            return requested_max_tokens
+
+        available = remaining - estimate_tokens(prompt_text)
+        if available <= 0:
+            self.budget_rejections += 1
+            raise TokenBudgetExceeded(
+                f"Token budget of {self.session_budget} exhausted for session {session_id}"
+            )
+
+        if requested_max_tokens is None:
+            # Cap open-ended generation at the budget; no explicit limit was lowered
+            return available
+        if requested_max_tokens > available:
+            self.budget_truncations += 1
+            logger.info("Shortening generation for session %s to %s tokens", session_id, available)
+            return available
+        return requested_max_tokens
+
+    def session_usage(self, session_id: str) -> Optional[dict]:
+        """Get usage and remaining budget for one session"""
+        totals = self.by_session.get(session_id)
+        if totals is None:
+            return None
+        return {
+            **totals.to_dict(),
+            "budget": self.session_budget or None,
+            "remaining": self.remaining_budget(session_id)
+        }
+
+    def stats(self) -> dict:
+        """Get aggregated usage"""
+        return {
+            "totals": self.totals.to_dict(),
+            "by_model": {name: totals.to_dict() for name, totals in self.by_model.items()},
+            "by_route": {name: totals.to_dict() for name, totals in self.by_route.items()},
+            "sessions_tracked": len(self.by_session),
+            "session_budget": self.session_budget or None,
+            "budget_rejections": self.budget_rejections,
+            "budget_truncations": self.budget_truncations
+        }
+
+_accountant: Optional[TokenAccountant] = None
+
+def get_token_accountant() -> TokenAccountant:
+    """Get the process-wide token accountant"""
+    global _accountant
+    if _accountant is None:
+        _accountant = TokenAccountant()
+    return _accountant
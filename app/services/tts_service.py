@@ -1,29 +1,25 @@
 import os
-import time
 from typing import Optional
-from pathlib import Path
 from murf import Murf
 from app.models.schemas import TTSRequest, TTSResponse
+from app.services.resilience import get_resilient_client
 from app.utils.logging import get_logger
+from app.utils.blob_store import get_blob_store
+from app.utils.tracing import start_span
 
 logger = get_logger(__name__)
 
 class TTSService:
-    def __init__(self):
+    def __init__(self, client: Optional[Murf] = None):
         self.api_key = os.getenv("MURF_API_KEY", "YOUR_MURF_API_KEY_HERE")
-        self.client = Murf(api_key=self.api_key)
-        self.uploads_dir = Path("uploads")
-        self.uploads_dir.mkdir(exist_ok=True)
+        self.client = client or Murf(api_key=self.api_key)
+        self.resilience = get_resilient_client("murf")
+        self.blobs = get_blob_store()
         
     async def text_to_speech(self, request: TTSRequest) -> TTSResponse:
         """Convert text to speech using Murf API"""
         try:
-            logger.info(f"Converting text to speech: {request.text[:50]}...")
-            
-            # Generate unique filename
-            timestamp = int(time.time())
-            filename = f"tts_{timestamp}.mp3"
-            filepath = self.uploads_dir / filename
+            logger.info("Converting text to speech: %s...", request.text[:50])
             
             # Create TTS request
             tts_request = {
@@ -33,12 +29,13 @@ class TTSService:
                 "pitch": request.pitch
             }
             
-            # Generate audio
-            audio_data = self.client.generate_audio(**tts_request)
+            # Generate audio with deadline, retries and circuit breaker
+            with start_span("tts.synthesize", voice_id=request.voice_id, characters=len(request.text)):
+                audio_data = await self.resilience.call(self.client.generate_audio, **tts_request)
             
-            # Save audio file
-            with open(filepath, "wb") as f:
-                f.write(audio_data)
+            # Save audio file; identical audio is stored once
+            with start_span("tts.file_save", bytes=len(audio_data)):
+                filename = self.blobs.put_bytes(audio_data, ".mp3").relative_path
             
             # Create response
             response = TTSResponse(
@@ -48,11 +45,11 @@ class TTSService:
                 audio_id=filename
             )
             
-            logger.info(f"TTS successful: {filename}")
+            logger.info("TTS successful: %s", filename)
             return response
             
         except Exception as e:
-            logger.error(f"TTS error: {str(e)}")
+            logger.error("TTS error: %s", e)
             return TTSResponse(
                 success=False,
                 message=f"Error converting text to speech: {str(e)}"
@@ -64,5 +61,5 @@ class TTSService:
             voices = self.client.get_voices()
             return voices
         except Exception as e:
-            logger.error(f"Error getting voices: {str(e)}")
+            logger.error("Error getting voices: %s", e)
             return []
@@ -0,0 +1,231 @@
+import asyncio
+import heapq
+import os
+import time
+from typing import List, Optional, Set, Tuple
+from app.utils.logging import get_logger
+from app.utils.upload_usage import get_upload_usage
+
+logger = get_logger(__name__)
+
+class UploadJanitor:
+    """Background cleanup of the uploads directory.
+
+    Each pass walks the directory tree with ``os.scandir``, builds an
+    mtime-ordered heap and removes files oldest-first while they are past
+    ``max_age`` or the directory is over ``max_bytes``. Work is done in
+    short time slices that yield to the event loop between them, so a
+    large directory never stalls request handling. Every pass also
+    reconciles the running uploads usage counters. With ``evict=False``
+    the janitor only scans and reconciles. Files with more than one link
+    are leased by a request in some worker (see ``BlobStore.lease``); they
+    are counted once and only removed once past ``max_age``, which also
+    clears leases left behind by a crashed worker.
+    """
+
+    def __init__(
+        self,
+        uploads_dir: str = "uploads",
+        max_age: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        interval: Optional[float] = None,
+        slice_seconds: Optional[float] = None,
+        min_age: Optional[float] = None,
+        evict: Optional[bool] = None
+    ):
+        self.uploads_dir = uploads_dir
+        if evict is None:
+            evict = os.getenv("UPLOAD_JANITOR_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.evict = evict
+        self.usage = get_upload_usage()
+        self.max_age = max_age if max_age is not None else float(os.getenv("UPLOAD_MAX_AGE_HOURS", "24")) * 3600
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("UPLOAD_MAX_BYTES", str(1024 ** 3)))
+        self.interval = interval or float(os.getenv("UPLOAD_JANITOR_INTERVAL_SECONDS", "300"))
+        self.slice_seconds = slice_seconds or float(os.getenv("UPLOAD_JANITOR_SLICE_MS", "5")) / 1000
+        # Files younger than this are never evicted for quota; they may still be in use
+        self.min_age = min_age if min_age is not None else float(os.getenv("UPLOAD_MIN_AGE_SECONDS", "60"))
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.files_scanned = 0
+        self.files_removed = 0
+        self.bytes_reclaimed = 0
+        self.removed_for_age = 0
+        self.removed_for_quota = 0
+        self.errors = 0
+        self.last_run_at: Optional[float] = None
+        self.last_run_seconds = 0.0
+        self.last_total_bytes = 0
+        self.last_file_count = 0
+
+    def start(self):
+        """Start the periodic cleanup task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+            logger.info(
+                "Upload janitor started (eviction %s): max age %.0fs, quota %s bytes, every %.0fs",
+                "on" if self.evict else "off", self.max_age, self.max_bytes, self.interval
+            )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.errors += 1
+                logger.error("Upload janitor error: %s", e)
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> dict:
+        """Run one scan-and-evict pass and return what it reclaimed"""
+        started = time.time()
+        heap, total_bytes = await self._scan()
+        removed, reclaimed, remaining = 0, 0, len(heap)
+        if self.evict:
+            removed, reclaimed, remaining = await self._evict(heap, total_bytes, started)
+        self.usage.reconcile(total_bytes - reclaimed, remaining)
+
+        self.runs += 1
+        self.last_run_at = started
+        self.last_run_seconds = time.time() - started
+        self.last_total_bytes = total_bytes - reclaimed
+        self.last_file_count = remaining
+        if removed:
+            logger.info("Upload janitor removed %s files, reclaimed %s bytes", removed, reclaimed)
+        return {"files_removed": removed, "bytes_reclaimed": reclaimed}
+
+    async def _scan(self) -> Tuple[List[Tuple[float, int, str, int, Tuple[int, int]]], int]:
+        """Collect (mtime, size, path, links, inode) for every file, yielding between time slices"""
+        entries: List[Tuple[float, int, str, int, Tuple[int, int]]] = []
+        total_bytes = 0
+        linked: Set[Tuple[int, int]] = set()
+        pending = [self.uploads_dir]
+        slice_end = time.perf_counter() + self.slice_seconds
+
+        while pending:
+            directory = pending.pop()
+            try:
+                with os.scandir(directory) as iterator:
+                    for entry in iterator:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            try:
+                                stat = entry.stat(follow_symlinks=False)
+                            except FileNotFoundError:
+                                continue
+                            inode = (stat.st_dev, stat.st_ino)
+                            entries.append((stat.st_mtime, stat.st_size, entry.path, stat.st_nlink, inode))
+                            if stat.st_nlink > 1:
+                                # A blob and its leases share one inode
+                                if inode in linked:
+                                    continue
+                                linked.add(inode)
+                            total_bytes += stat.st_size
+                        if time.perf_counter() >= slice_end:
+                            await asyncio.sleep(0)
+                            slice_end = time.perf_counter() + self.slice_seconds
+            except FileNotFoundError:
+                continue
+
+        self.files_scanned += len(entries)
+        heapq.heapify(entries)
+        return entries, total_bytes
+
+    async def _evict(
+        self,
+        heap: List[Tuple[float, int, str, int, Tuple[int, int]]],
+        total_bytes: int,
+        now: float
+    ) -> Tuple[int, int, int]:
+        """Remove files oldest-first while they are expired or the quota is exceeded.
+
+        Returns the files removed, the bytes reclaimed and the files remaining.
+        Only bytes this pass freed count as reclaimed: a file that was already
+        gone is not counted, and an inode shared by a blob and its leases is
+        counted once, as in the scan.
+        """
+        age_cutoff = now - self.max_age
+        quota_cutoff = now - self.min_age
+        removed = 0
+        reclaimed = 0
+        kept = 0
+        freed: Set[Tuple[int, int]] = set()
+        slice_end = time.perf_counter() + self.slice_seconds
+
+        while heap:
+            mtime, size, path, links, inode = heap[0]
+            expired = mtime < age_cutoff
+            over_quota = total_bytes - reclaimed > self.max_bytes and mtime < quota_cutoff
+            if not expired and not over_quota:
+                break
+            heapq.heappop(heap)
+            if links > 1 and not expired:
+                # Leased by an in-flight request
+                kept += 1
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                # Already gone, e.g. a temporary file removed by its owner; nothing freed here
+                continue
+            except OSError as e:
+                self.errors += 1
+                logger.warning("Upload janitor could not remove %s: %s", path, e)
+                kept += 1
+                continue
+
+            removed += 1
+            self.files_removed += 1
+            if inode not in freed:
+                freed.add(inode)
+                reclaimed += size
+                self.bytes_reclaimed += size
+            if expired:
+                self.removed_for_age += 1
+            else:
+                self.removed_for_quota += 1
+
+            if time.perf_counter() >= slice_end:
+                await asyncio.sleep(0)
+                slice_end = time.perf_counter() + self.slice_seconds
+
+        return removed, reclaimed, len(heap) + kept
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "evict": self.evict,
+            "uploads_dir": self.uploads_dir,
+            "max_age_seconds": self.max_age,
+            "max_bytes": self.max_bytes,
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "files_scanned": self.files_scanned,
+            "files_removed": self.files_removed,
+            "removed_for_age": self.removed_for_age,
+            "removed_for_quota": self.removed_for_quota,
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "errors": self.errors,
+            "last_run_at": self.last_run_at,
+            "last_run_seconds": round(self.last_run_seconds, 3),
+            "last_total_bytes": self.last_total_bytes,
+            "last_file_count": self.last_file_count
+        }
+
+_janitor: Optional[UploadJanitor] = None
+
+def get_upload_janitor() -> UploadJanitor:
+    """Get the process-wide upload janitor"""
+    global _janitor
+    if _janitor is None:
+        _janitor = UploadJanitor()
+    return _janitor
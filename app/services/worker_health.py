@@ -0,0 +1,190 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+from app.services.provider_probes import get_provider_prober
+from app.services.resilience import open_circuits, queued_calls
+from app.utils.logging import get_logger, logging_stats
+from app.utils.metrics import HTTP_REQUESTS_IN_FLIGHT, PIPELINES_IN_FLIGHT
+from app.utils.tracing import get_tracer
+
+logger = get_logger(__name__)
+
+class EventLoopLagMonitor:
+    """Measure how late the event loop wakes a sleeping task.
+
+    A task sleeps for ``interval`` and records how much longer than that
+    it took to be resumed; on a saturated loop callbacks queue up and the
+    lag grows before request latency does.
+    """
+
+    def __init__(self, interval: Optional[float] = None, window: int = 20):
+        self.interval = interval or float(os.getenv("LOOP_LAG_INTERVAL_MS", "250")) / 1000
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.last_lag = 0.0
+        self.last_tick: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(0.0, time.perf_counter() - expected)
+            self.samples.append(self.last_lag)
+            self.last_tick = time.time()
+
+    def stats(self) -> dict:
+        return {
+            "last_ms": round(self.last_lag * 1000, 3),
+            "max_ms": round(max(self.samples, default=0.0) * 1000, 3),
+            "avg_ms": round(sum(self.samples) / len(self.samples) * 1000, 3) if self.samples else 0.0,
+            "window": len(self.samples),
+            "last_tick": self.last_tick
+        }
+
+class WorkerHealth:
+    """Liveness, readiness and saturation of this worker process.
+
+    Liveness only says the event loop answers. Readiness requires startup
+    warm-up to have finished, no shutdown in progress, no required
+    provider circuit breaker rejecting calls and no required provider
+    failing ``probe_failure_threshold`` background probes in a row.
+    Providers not probed yet, without an API key, or with probes
+    disabled do not count. No provider is required by default: every
+    worker probes the same providers, so a required provider's outage
+    takes all workers out of rotation at once, including for endpoints
+    that never call it. Failing providers that are not required leave
+    the worker ready and report it as ``degraded``. Saturation compares event
+    loop lag, in-flight pipelines and the worker thread queue against
+    thresholds so load balancers can drain an overloaded worker early.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+        self.draining = False
+        self.lag_monitor = EventLoopLagMonitor()
+        self.required_providers = [
+            name.strip() for name in os.getenv("READINESS_REQUIRED_PROVIDERS", "").split(",") if name.strip()
+        ]
+        # Consecutive failed probes before a required provider fails readiness
+        self.probe_failure_threshold = max(1, int(os.getenv("READINESS_PROBE_FAILURES", "3")))
+        self.max_loop_lag = float(os.getenv("SATURATION_MAX_LOOP_LAG_MS", "200")) / 1000
+        self.max_pipelines = int(os.getenv("SATURATION_MAX_PIPELINES", "32"))
+        self.max_thread_queue = int(os.getenv("SATURATION_MAX_THREAD_QUEUE", "16"))
+
+    def start(self):
+        """Mark warm-up as finished and start measuring event loop lag"""
+        self.lag_monitor.start()
+        self.ready_at = time.time()
+        logger.info("Worker ready after %.2fs", self.ready_at - self.started_at)
+
+    async def stop(self):
+        """Fail readiness for the rest of shutdown"""
+        self.draining = True
+        await self.lag_monitor.stop()
+
+    def liveness(self) -> dict:
+        return {
+            "status": "alive",
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started_at, 3)
+        }
+
+    def readiness(self) -> Tuple[bool, dict]:
+        reasons = []
+        if self.ready_at is None:
+            reasons.append("warming up")
+        if self.draining:
+            reasons.append("shutting down")
+        circuits = open_circuits()
+        open_required = [provider for provider in circuits if provider in self.required_providers]
+        if open_required:
+            reasons.append(f"circuit open: {', '.join(open_required)}")
+        probes = get_provider_prober().snapshot()
+        unhealthy = sorted(
+            provider for provider, probe in probes.items()
+            if probe["consecutive_failures"] >= self.probe_failure_threshold
+        )
+        failing = [provider for provider in unhealthy if provider in self.required_providers]
+        if failing:
+            reasons.append(f"probe failing: {', '.join(failing)}")
+        degraded = sorted(
+            {provider for provider in unhealthy + circuits if provider not in self.required_providers}
+        )
+        ready = not reasons
+        if not ready:
+            status = "not_ready"
+        else:
+            status = "degraded" if degraded else "ready"
+        return ready, {
+            "status": status,
+            "reasons": reasons,
+            "degraded_providers": degraded,
+            "warmed_up": self.ready_at is not None,
+            "draining": self.draining,
+            "open_circuits": circuits,
+            "failing_probes": failing
+        }
+
+    @staticmethod
+    def _thread_queue_depth() -> int:
+        # Provider SDK calls wait for a thread of their provider's pool; other
+        # blocking work waits in asyncio.to_thread's executor
+        executor = getattr(asyncio.get_running_loop(), "_default_executor", None)
+        work_queue = getattr(executor, "_work_queue", None)
+        return queued_calls() + (work_queue.qsize() if work_queue is not None else 0)
+
+    def saturation(self) -> Tuple[bool, dict]:
+        lag = self.lag_monitor.stats()
+        pipelines = int(PIPELINES_IN_FLIGHT.total())
+        thread_queue = self._thread_queue_depth()
+        tracer = get_tracer()
+        reasons = []
+        if lag["max_ms"] > self.max_loop_lag * 1000:
+            reasons.append(f"event loop lag {lag['max_ms']:.0f} ms")
+        if pipelines >= self.max_pipelines:
+            reasons.append(f"{pipelines} pipelines in flight")
+        if thread_queue >= self.max_thread_queue:
+            reasons.append(f"{thread_queue} calls waiting for a worker thread")
+        saturated = bool(reasons)
+        return saturated, {
+            "status": "saturated" if saturated else "ok",
+            "reasons": reasons,
+            "event_loop_lag": lag,
+            "requests_in_flight": int(HTTP_REQUESTS_IN_FLIGHT.total()),
+            "pipelines_in_flight": pipelines,
+            "queues": {
+                "worker_threads": thread_queue,
+                "logging": logging_stats()["queue_depth"],
+                "spans": tracer.exporter.queue.qsize() if tracer.exporter else 0
+            },
+            "limits": {
+                "max_loop_lag_ms": self.max_loop_lag * 1000,
+                "max_pipelines": self.max_pipelines,
+                "max_thread_queue": self.max_thread_queue
+            }
+        }
+
+_worker_health: Optional[WorkerHealth] = None
+
+def get_worker_health() -> WorkerHealth:
+    """Get this process's health state"""
+    global _worker_health
+    if _worker_health is None:
+        _worker_health = WorkerHealth()
+    return _worker_health
@@ -1,3 +1,10 @@
 # Utils package
-from .logging import get_logger, setup_logging
+from .logging import get_logger, setup_logging, shutdown_logging, logging_stats
 from .file_utils import FileUtils
+from .sse import format_sse
+from .ndjson import iter_ndjson_lines, LineTooLongError
+from .upload_usage import UploadUsage, get_upload_usage
+from .blob_store import BlobStore, get_blob_store
+from .metrics import MetricsRegistry, get_metrics_registry
+from .profiler import RequestProfiler, get_request_profiler
+from .tracing import Tracer, get_tracer, start_span
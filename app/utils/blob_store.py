@@ -0,0 +1,188 @@
+import hashlib
+import os
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Optional
+from app.utils.logging import get_logger
+from app.utils.upload_usage import get_upload_usage
+
+logger = get_logger(__name__)
+
+COPY_CHUNK_BYTES = 1024 * 1024
+
+class StoredBlob:
+    """Result of storing content in the blob store"""
+
+    __slots__ = ("digest", "path", "relative_path", "size", "created", "mtime_ns")
+
+    def __init__(self, digest: str, path: Path, relative_path: str, size: int, created: bool, mtime_ns: int = 0):
+        self.digest = digest
+        self.path = path
+        self.relative_path = relative_path
+        self.size = size
+        # False when identical content was already stored
+        self.created = created
+        # Modification time when stored; any later store of the same content changes it
+        self.mtime_ns = mtime_ns
+
+class BlobStore:
+    """Content-addressed file storage under the uploads directory.
+
+    Content is stored once at ``<root>/ab/cd/<sha256>.<ext>``, so shard
+    directories stay small and concurrent writes never overwrite each
+    other. Writes go to a temporary file that is renamed into place.
+    Stored content is removed by the upload janitor.
+
+    A caller that needs content only while it works on it takes a
+    ``lease``: a hard link under ``.tmp`` that stays readable even if the
+    blob path is removed. Leases are visible to every worker through the
+    file's link count, so ``release`` deletes the blob only when no worker
+    holds another lease and the janitor never evicts leased files for quota.
+    ``release`` also deletes only blobs the caller created: storing content
+    that already exists refreshes its mtime, so a blob another request or a
+    saved upload has stored since is left to the janitor.
+    """
+
+    def __init__(self, root: str = "uploads"):
+        self.root = Path(root)
+        self.tmp_dir = self.root / ".tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.usage = get_upload_usage()
+        self._lock = threading.Lock()
+        self.active_leases = 0
+        self.blobs_written = 0
+        self.deduplicated = 0
+        self.bytes_deduplicated = 0
+
+    def _blob_path(self, digest: str, extension: str) -> Path:
+        extension = extension.lower()
+        if extension and not extension.startswith("."):
+            extension = "." + extension
+        return self.root / digest[:2] / digest[2:4] / f"{digest}{extension}"
+
+    def put_file(self, source: BinaryIO, extension: str = "") -> StoredBlob:
+        """Store the content of a file object, streaming it while hashing"""
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while True:
+                    chunk = source.read(COPY_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            return self._commit(Path(tmp_name), digest.hexdigest(), extension, size)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def put_bytes(self, data: bytes, extension: str = "") -> StoredBlob:
+        """Store in-memory content"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest, extension)
+        if path.exists():
+            # Skip the temporary write for content that is already stored
+            blob = self._reuse(path, digest, len(data))
+            if blob is not None:
+                return blob
+
+        fd, tmp_name = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            return self._commit(Path(tmp_name), digest, extension, len(data))
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def _commit(self, tmp_path: Path, digest: str, extension: str, size: int) -> StoredBlob:
+        path = self._blob_path(digest, extension)
+        if path.exists():
+            blob = self._reuse(path, digest, size)
+            if blob is not None:
+                tmp_path.unlink()
+                return blob
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Atomic: readers see either no file or the complete one
+        os.replace(tmp_path, path)
+        self.blobs_written += 1
+        self.usage.record_write(size)
+        return StoredBlob(digest, path, self._relative(path), size, created=True, mtime_ns=path.stat().st_mtime_ns)
+
+    def _reuse(self, path: Path, digest: str, size: int) -> Optional[StoredBlob]:
+        """Refresh an existing blob; returns None if it was removed after the existence check"""
+        try:
+            # Refresh the mtime so age-based cleanup treats the content as new
+            os.utime(path)
+            mtime_ns = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            # The janitor removed it in the meantime; the caller writes it again
+            return None
+        self.deduplicated += 1
+        self.bytes_deduplicated += size
+        return StoredBlob(digest, path, self._relative(path), size, created=False, mtime_ns=mtime_ns)
+
+    def _relative(self, path: Path) -> str:
+        return path.relative_to(self.root).as_posix()
+
+    def lease(self, path) -> Path:
+        """Hard-link a blob under .tmp and return the link; pass it to ``release`` when done"""
+        path = Path(path)
+        lease_path = self.tmp_dir / f"lease-{uuid.uuid4().hex}{path.suffix}"
+        os.link(path, lease_path)
+        with self._lock:
+            self.active_leases += 1
+        return lease_path
+
+    def release(self, lease_path, blob: StoredBlob) -> bool:
+        """Drop a lease and delete the blob if this caller owns it; returns whether it was deleted
+
+        The blob is kept when it existed before ``blob`` was stored, when
+        it has been stored again since, or while any worker holds another
+        lease. Kept content is removed by the janitor.
+        """
+        Path(lease_path).unlink(missing_ok=True)
+        with self._lock:
+            self.active_leases -= 1
+        if not blob.created:
+            return False
+        return self.delete(blob.path, mtime_ns=blob.mtime_ns)
+
+    def delete(self, path, mtime_ns: Optional[int] = None) -> bool:
+        """Delete a blob unless it is leased or, given ``mtime_ns``, was stored again; returns whether it was deleted"""
+        path = Path(path)
+        try:
+            stat = path.stat()
+            if stat.st_nlink > 1:
+                return False
+            if mtime_ns is not None and stat.st_mtime_ns != mtime_ns:
+                return False
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        self.usage.record_delete(stat.st_size)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "root": str(self.root),
+            "blobs_written": self.blobs_written,
+            "deduplicated": self.deduplicated,
+            "bytes_deduplicated": self.bytes_deduplicated,
+            "active_leases": self.active_leases
+        }
+
+_blob_store: Optional[BlobStore] = None
+
+def get_blob_store() -> BlobStore:
+    """Get the process-wide uploads blob store"""
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = BlobStore()
+    return _blob_store
@@ -1,10 +1,11 @@
 import os
-import shutil
 import time
 from pathlib import Path
 from typing import Optional, Tuple
 from fastapi import UploadFile
 from app.utils.logging import get_logger
+from app.utils.upload_usage import get_upload_usage
+from app.utils.blob_store import BlobStore, get_blob_store
 
 logger = get_logger(__name__)
 
@@ -12,25 +13,23 @@ class FileUtils:
     def __init__(self, uploads_dir: str = "uploads"):
         self.uploads_dir = Path(uploads_dir)
         self.uploads_dir.mkdir(exist_ok=True)
+        self.usage = get_upload_usage()
+        # Share the process-wide blob store for the default uploads directory
+        self.blobs = get_blob_store() if uploads_dir == "uploads" else BlobStore(uploads_dir)
     
     async def save_uploaded_file(self, file: UploadFile) -> Tuple[bool, str, str]:
         """Save uploaded file and return success status, filename, and filepath"""
         try:
-            # Generate unique filename
-            timestamp = int(time.time())
+            # Store by content hash; identical uploads share one file
             file_extension = Path(file.filename).suffix if file.filename else ""
-            filename = f"upload_{timestamp}{file_extension}"
-            filepath = self.uploads_dir / filename
+            blob = self.blobs.put_file(file.file, file_extension)
+            filename = blob.relative_path
             
-            # Save file
-            with open(filepath, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            
-            logger.info(f"File saved successfully: {filename}")
-            return True, filename, str(filepath)
+            logger.info("File saved successfully: %s", filename)
+            return True, filename, str(blob.path)
             
         except Exception as e:
-            logger.error(f"Error saving file: {str(e)}")
+            logger.error("Error saving file: %s", e)
             return False, "", ""
     
     def get_file_info(self, filepath: str) -> dict:
@@ -50,7 +49,7 @@ class FileUtils:
                 "is_directory": path.is_directory()
             }
         except Exception as e:
-            logger.error(f"Error getting file info: {str(e)}")
+            logger.error("Error getting file info: %s", e)
             return {}
     
     def cleanup_old_files(self, max_age_hours: int = 24) -> int:
@@ -60,29 +59,42 @@ class FileUtils:
             max_age_seconds = max_age_hours * 3600
             cleaned_count = 0
             
-            for file_path in self.uploads_dir.iterdir():
+            for file_path in self.uploads_dir.rglob('*'):
                 if file_path.is_file():
-                    file_age = current_time - file_path.stat().st_mtime
+                    stat = file_path.stat()
+                    file_age = current_time - stat.st_mtime
                     if file_age > max_age_seconds:
                         file_path.unlink()
+                        self.usage.record_delete(stat.st_size)
                         cleaned_count += 1
-                        logger.info(f"Cleaned up old file: {file_path.name}")
+                        logger.info("Cleaned up old file: %s", file_path.name)
             
-            logger.info(f"Cleanup completed: {cleaned_count} files removed")
+            logger.info("Cleanup completed: %s files removed", cleaned_count)
             return cleaned_count
             
         except Exception as e:
-            logger.error(f"Error during cleanup: {str(e)}")
+            logger.error("Error during cleanup: %s", e)
             return 0
     
+    def delete_file(self, filepath: str) -> bool:
+        """Delete a file from the uploads directory, keeping usage counters current"""
+        return self.blobs.delete(filepath)
+    
     def get_uploads_directory_size(self) -> int:
         """Get total size of uploads directory in bytes"""
+        if self.usage.reconciled:
+            return self.usage.total_bytes
+        
+        # Nothing has scanned the directory yet: count once, then keep the counters current
         try:
             total_size = 0
+            file_count = 0
             for file_path in self.uploads_dir.rglob('*'):
                 if file_path.is_file():
                     total_size += file_path.stat().st_size
+                    file_count += 1
+            self.usage.reconcile(total_size, file_count)
             return total_size
         except Exception as e:
-            logger.error(f"Error calculating directory size: {str(e)}")
+            logger.error("Error calculating directory size: %s", e)
             return 0
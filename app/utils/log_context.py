@@ -0,0 +1,33 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Optional
+from app.utils.logging import get_logger
+from app.utils.tracing import start_span
+
+logger = get_logger(__name__)
+
+# Correlation fields attached to every log record emitted while they are set
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+session_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("session_id", default=None)
+stage_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("stage", default=None)
+
+def get_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+def bind_session(session_id: Optional[str]):
+    """Tag the rest of the current request's log records with a chat session id"""
+    session_id_var.set(session_id)
+
+@contextmanager
+def log_stage(stage: str):
+    """Tag log records with a pipeline stage, trace it as a span and log its duration when it ends"""
+    token = stage_var.set(stage)
+    start_time = time.perf_counter()
+    try:
+        with start_span(f"stage.{stage}", stage=stage):
+            yield
+    finally:
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        logger.info("Stage %s finished", stage, extra={"duration_ms": round(duration_ms, 3)})
+        stage_var.reset(token)
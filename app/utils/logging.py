@@ -1,44 +1,187 @@
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
-from typing import Optional
+import time
+import zlib
+from typing import Dict, Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+CONTEXT_FIELDS = ("request_id", "session_id", "stage")
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"} | set(CONTEXT_FIELDS)
+
+def parse_sample_rates(spec: str) -> Dict[int, float]:
+    """Parse "INFO=0.1,DEBUG=0.01" into {level number: keep probability}"""
+    rates = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, rate = item.split("=", 1)
+        level = logging.getLevelName(name.strip().upper())
+        if isinstance(level, int):
+            rates[level] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+class ContextFilter(logging.Filter):
+    """Attach request correlation fields and apply per-level sampling.
+
+    Runs in the thread that emits the record, so context variables are
+    read before the record crosses to the listener thread. Sampling is
+    keyed on the request id, so a sampled request keeps all its lines.
+    Records with a ``duration_ms`` of at least ``keep_slow_ms`` are never
+    sampled out.
+    """
+
+    def __init__(self, context_vars: dict, sample_rates: Dict[int, float], keep_slow_ms: float):
+        super().__init__()
+        self.context_vars = context_vars
+        self.sample_rates = sample_rates
+        self.keep_slow_ms = keep_slow_ms
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for field, var in self.context_vars.items():
+            setattr(record, field, var.get())
+
+        rate = self.sample_rates.get(record.levelno)
+        if rate is None or rate >= 1.0:
+            return True
+        duration_ms = getattr(record, "duration_ms", None)
+        if duration_ms is not None and duration_ms >= self.keep_slow_ms:
+            return True
+        if record.request_id:
+            keep = zlib.crc32(record.request_id.encode("utf-8")) % 10000 < rate * 10000
+        else:
+            keep = random.random() < rate
+        if not keep:
+            self.sampled_out += 1
+        return keep
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks the caller.
+
+    When the queue is full the record is dropped and counted instead of
+    waiting for the sink. Records are queued unformatted; the listener
+    thread merges arguments and renders tracebacks.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting is deferred to the listener thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class _DrainingQueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room so a full queue is drained before the listener stops
+        self.queue.put(self._sentinel)
+
+_queue_handler: Optional[DroppingQueueHandler] = None
+_context_filter: Optional[ContextFilter] = None
+_listener: Optional[logging.handlers.QueueListener] = None
 
 def get_logger(name: str, level: Optional[str] = None) -> logging.Logger:
-    """Get a configured logger instance"""
-    
-    # Create logger
+    """Get a logger instance; records propagate to the single handler set up by setup_logging"""
     logger = logging.getLogger(name)
-    
-    # Set level
     if level:
         logger.setLevel(getattr(logging, level.upper()))
-    else:
-        logger.setLevel(logging.INFO)
-    
-    # Avoid adding handlers multiple times
-    if not logger.handlers:
-        # Create console handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        
-        # Create formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        console_handler.setFormatter(formatter)
-        
-        # Add handler to logger
-        logger.addHandler(console_handler)
-    
     return logger
 
-def setup_logging(level: str = "INFO"):
-    """Setup root logging configuration"""
-    logging.basicConfig(
-        level=getattr(logging, level.upper()),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S',
-        handlers=[
-            logging.StreamHandler(sys.stdout)
-        ]
+def setup_logging(level: Optional[str] = None):
+    """Route all logging through a bounded queue to one stdout sink on a background thread.
+
+    LOG_FORMAT selects JSON records (default) or plain text, and
+    LOG_SAMPLE_RATES (e.g. "INFO=0.1") keeps only a share of requests'
+    records at the given levels.
+    """
+    global _queue_handler, _context_filter, _listener
+    from app.utils.log_context import request_id_var, session_id_var, stage_var
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level))
+    if _listener is not None:
+        return
+
+    # Remove handlers attached directly to app loggers so each record is written once
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for name, logger in list(logging.Logger.manager.loggerDict.items()):
+        if isinstance(logger, logging.Logger) and (name == "app" or name.startswith("app.")):
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+
+    sink = logging.StreamHandler(sys.stdout)
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        sink.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+    else:
+        sink.setFormatter(JsonFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _context_filter = ContextFilter(
+        {"request_id": request_id_var, "session_id": session_id_var, "stage": stage_var},
+        parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", "")),
+        float(os.getenv("LOG_KEEP_SLOW_MS", "1000"))
     )
+    _queue_handler.addFilter(_context_filter)
+    root.addHandler(_queue_handler)
+    _listener = _DrainingQueueListener(log_queue, sink, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        if _queue_handler is not None:
+            logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        _listener = None
+
+def logging_stats() -> dict:
+    """Get logging queue depth, dropped and sampled-out record counts"""
+    if _queue_handler is None:
+        return {"queue_depth": 0, "queue_size": 0, "dropped": 0, "sampled_out": 0}
+    return {
+        "queue_depth": _queue_handler.queue.qsize(),
+        "queue_size": _queue_handler.queue.maxsize,
+        "dropped": _queue_handler.dropped,
+        "sampled_out": _context_filter.sampled_out if _context_filter else 0
+    }
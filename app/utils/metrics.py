@@ -0,0 +1,400 @@
+import asyncio
+import bisect
+import json
+import math
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from app.utils.logging import get_logger
+from app.utils.upload_usage import get_upload_usage
+
+logger = get_logger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+SNAPSHOT_PREFIX = "metrics-"
+
+class Metric:
+    """Base class for metrics keyed by a tuple of label values.
+
+    Updates are plain dict operations made from the event loop, so no
+    lock is taken on the request path. ``function`` makes an unlabelled
+    metric read its value from a callable when collected.
+    """
+
+    type_name = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None,
+        multiprocess_mode: str = "sum"
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        # How values from several worker processes are combined: "sum" or "max"
+        self.multiprocess_mode = multiprocess_mode
+        self._values: Dict[tuple, float] = {}
+
+    def samples(self) -> List[list]:
+        if self.function is not None:
+            try:
+                return [[[], float(self.function())]]
+            except Exception as e:
+                logger.warning("Metric %s callback failed: %s", self.name, e)
+                return []
+        return [[list(labels), value] for labels, value in list(self._values.items())]
+
+    def describe(self) -> dict:
+        return {
+            "type": self.type_name,
+            "help": self.documentation,
+            "labels": list(self.labelnames),
+            "mode": self.multiprocess_mode,
+            "samples": self.samples()
+        }
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def total(self) -> float:
+        """Sum over all label sets in this process"""
+        return sum(self._values.values())
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = float(value)
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    @contextmanager
+    def track_inprogress(self, *labels: str):
+        """Count the enclosed block as in progress"""
+        self.inc(*labels)
+        try:
+            yield
+        finally:
+            self.dec(*labels)
+
+class Histogram(Metric):
+    """Cumulative histogram; each label set holds [bucket counts..., sum, count]"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        state = self._values.get(labels)
+        if state is None:
+            state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        # Per-bucket counts; made cumulative when rendered
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    @contextmanager
+    def time(self, *labels: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, *labels)
+
+    def samples(self) -> List[list]:
+        return [[list(labels), list(state)] for labels, state in list(self._values.items())]
+
+    def describe(self) -> dict:
+        description = super().describe()
+        description["buckets"] = list(self.buckets)
+        return description
+
+class MetricsRegistry:
+    """Process metrics with optional multiprocess aggregation.
+
+    When ``directory`` is set (METRICS_MULTIPROC_DIR), each worker
+    periodically writes a snapshot of its metrics to
+    ``<directory>/metrics-<pid>.json`` and a scrape merges the snapshots
+    of every worker, so any uvicorn worker can serve ``/metrics``.
+    Snapshots of exited workers, or not rewritten for ``stale_after``
+    seconds, are deleted by the scrape that finds them; their counters
+    leave the totals, which Prometheus treats as a counter reset.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        flush_interval: Optional[float] = None,
+        stale_after: Optional[float] = None
+    ):
+        if directory is None:
+            directory = os.getenv("METRICS_MULTIPROC_DIR", "")
+        self.directory = directory or None
+        self.flush_interval = flush_interval or float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+        self.stale_after = stale_after or float(os.getenv("METRICS_SNAPSHOT_STALE_SECONDS", str(self.flush_interval * 6)))
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable] = []
+        self._task: Optional[asyncio.Task] = None
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, **kwargs))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, **kwargs))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def add_collector(self, collector: Callable):
+        """Register a coroutine function that refreshes gauges before each snapshot or scrape"""
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable):
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    async def collect(self):
+        for collector in self._collectors:
+            try:
+                await collector()
+            except Exception as e:
+                logger.warning("Metrics collector failed: %s", e)
+
+    def snapshot(self) -> dict:
+        """Copy this process's metrics; cheap enough to run on the event loop"""
+        return {"pid": os.getpid(), "metrics": {name: metric.describe() for name, metric in self._metrics.items()}}
+
+    async def render(self) -> str:
+        """Collect and render all metrics in the Prometheus text format"""
+        await self.collect()
+        snapshot = self.snapshot()
+        if not self.directory:
+            return format_snapshots([snapshot])
+        return await asyncio.to_thread(self._render_merged, snapshot)
+
+    def _render_merged(self, own: dict) -> str:
+        return format_snapshots([own] + self._read_snapshots(exclude_pid=own["pid"]))
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{SNAPSHOT_PREFIX}{pid}.json")
+
+    def _read_snapshots(self, exclude_pid: int) -> List[dict]:
+        snapshots = []
+        stale_before = time.time() - self.stale_after
+        for name in os.listdir(self.directory):
+            if not (name.startswith(SNAPSHOT_PREFIX) and name.endswith(".json")):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                modified_at = os.stat(path).st_mtime
+                with open(path, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            pid = snapshot.get("pid", 0)
+            if pid == exclude_pid:
+                continue
+            if modified_at < stale_before or not _pid_alive(pid):
+                self._remove_snapshot(path)
+                continue
+            snapshots.append(snapshot)
+        return snapshots
+
+    def _remove_snapshot(self, path: str):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.warning("Could not remove metrics snapshot %s: %s", path, e)
+            return
+        logger.info("Removed metrics snapshot of an exited worker: %s", path)
+
+    def write_snapshot(self, snapshot: dict):
+        """Atomically replace this process's snapshot file"""
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_name, self._snapshot_path(snapshot["pid"]))
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    async def flush(self):
+        if not self.directory:
+            return
+        await self.collect()
+        await asyncio.to_thread(self.write_snapshot, self.snapshot())
+
+    def start(self):
+        """Start writing snapshots periodically when multiprocess mode is on"""
+        if self.directory and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            # Leave final values for the remaining workers
+            await self.flush()
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning("Metrics snapshot failed: %s", e)
+            await asyncio.sleep(self.flush_interval)
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+def _merge_snapshots(snapshots: List[dict]) -> Dict[str, dict]:
+    merged: Dict[str, dict] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot["metrics"].items():
+            target = merged.get(name)
+            if target is None:
+                target = merged[name] = {**metric, "values": {}}
+            values = target["values"]
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                current = values.get(key)
+                if current is None:
+                    values[key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    if len(current) == len(value):
+                        values[key] = [a + b for a, b in zip(current, value)]
+                elif metric["mode"] == "max":
+                    values[key] = max(current, value)
+                else:
+                    values[key] = current + value
+    return merged
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[str, str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def format_snapshots(snapshots: List[dict]) -> str:
+    """Merge per-process snapshots and render them in the Prometheus text format"""
+    lines = []
+    for name, metric in sorted(_merge_snapshots(snapshots).items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric["labels"]
+        for labels, value in sorted(metric["values"].items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(names, labels)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric["buckets"]) + [math.inf], value[:-2]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(names, labels, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(names, labels)} {_format_value(value[-2])}")
+            lines.append(f"{name}_count{_format_labels(names, labels)} {_format_value(value[-1])}")
+    return "\n".join(lines) + "\n"
+
+_registry: Optional[MetricsRegistry] = None
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get the process-wide metrics registry"""
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
+
+registry = get_metrics_registry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by method, route and status",
+    ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by method, route and status",
+    ("method", "route", "status")
+)
+UPSTREAM_REQUEST_DURATION = registry.histogram(
+    "upstream_request_duration_seconds", "Upstream provider call latency per attempt",
+    ("provider", "outcome")
+)
+UPSTREAM_ERRORS = registry.counter(
+    "upstream_errors_total", "Failed upstream provider attempts by kind",
+    ("provider", "kind")
+)
+PIPELINES_IN_FLIGHT = registry.gauge(
+    "pipelines_in_flight", "Voice agent pipelines currently running",
+    ("pipeline",)
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled"
+)
+SESSION_STORE_SESSIONS = registry.gauge(
+    "session_store_sessions", "Chat sessions in the session store",
+    multiprocess_mode="max"
+)
+UPLOAD_BYTES = registry.gauge(
+    "uploads_bytes", "Bytes stored in the uploads directory",
+    function=lambda: get_upload_usage().total_bytes, multiprocess_mode="max"
+)
+UPLOAD_FILES = registry.gauge(
+    "uploads_files", "Files stored in the uploads directory",
+    function=lambda: get_upload_usage().file_count, multiprocess_mode="max"
+)
+UPLOAD_BYTES_WRITTEN = registry.counter(
+    "uploads_written_bytes_total", "Bytes written to the uploads directory",
+    function=lambda: get_upload_usage().bytes_written
+)
+UPLOAD_BYTES_DELETED = registry.counter(
+    "uploads_deleted_bytes_total", "Bytes deleted from the uploads directory",
+    function=lambda: get_upload_usage().bytes_deleted
+)
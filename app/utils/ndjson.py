@@ -0,0 +1,44 @@
+from typing import AsyncIterator, Optional
+
+class LineTooLongError(ValueError):
+    """An NDJSON line exceeded the allowed size"""
+
+async def iter_ndjson_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int,
+    skip_oversized: bool = False
+) -> AsyncIterator[Optional[bytes]]:
+    """Split a byte stream into NDJSON lines without holding more than one line in memory.
+
+    A line longer than ``max_line_bytes`` raises LineTooLongError, or with
+    ``skip_oversized`` is discarded and yielded as None, so callers can
+    report it and keep counting lines.
+    """
+    buffer = bytearray()
+    discarding = False
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            if discarding or end - start > max_line_bytes:
+                if not skip_oversized:
+                    raise LineTooLongError(f"NDJSON line exceeds {max_line_bytes} bytes")
+                discarding = False
+                yield None
+            else:
+                yield bytes(buffer[start:end])
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            if not skip_oversized:
+                raise LineTooLongError(f"NDJSON line exceeds {max_line_bytes} bytes")
+            # Drop the line's bytes as they arrive, up to its newline
+            discarding = True
+            buffer.clear()
+    if discarding:
+        yield None
+    elif buffer:
+        yield bytes(buffer)
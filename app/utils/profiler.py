@@ -0,0 +1,229 @@
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9A-Za-z_-]{1,128}$")
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    cwd = os.getcwd()
+    if filename.startswith(cwd + os.sep):
+        filename = filename[len(cwd) + 1:]
+    else:
+        filename = os.sep.join(filename.split(os.sep)[-2:])
+    # Semicolons separate frames in the folded format
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+def _coroutine_frame(coro):
+    return getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+
+class TaskSampler:
+    """Sample one asyncio task's stack from a background thread.
+
+    Every ``interval`` seconds the sampler looks at the event loop
+    thread. If the task is running, its Python stack is recorded (CPU
+    time); otherwise the chain of coroutines it is suspended in is
+    recorded with an ``[awaiting ...]`` leaf (wall time spent waiting on
+    I/O, worker threads or other tasks). Stacks are counted in the folded
+    format read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, task: asyncio.Task, interval: float):
+        self.task = task
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.cpu_samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception:
+                # Frames change under us; a torn sample is skipped
+                continue
+
+    def _sample(self):
+        root = _coroutine_frame(self.task.get_coro())
+        if root is None:
+            return
+        frame = sys._current_frames().get(self.thread_id)
+        running: List[str] = []
+        while frame is not None:
+            running.append(_frame_label(frame.f_code))
+            if frame is root:
+                break
+            frame = frame.f_back
+        if frame is root:
+            running.reverse()
+            stack = running
+            self.cpu_samples += 1
+        else:
+            stack = self._awaiting_stack()
+        key = ";".join(stack)
+        self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+
+    def _awaiting_stack(self) -> List[str]:
+        stack: List[str] = []
+        awaitable = self.task.get_coro()
+        while awaitable is not None:
+            if isinstance(awaitable, asyncio.Task):
+                # Follow into tasks the request is waiting on, e.g. hedged calls
+                awaitable = awaitable.get_coro()
+                continue
+            frame = _coroutine_frame(awaitable)
+            if frame is None:
+                # Futures are awaited through an iterator object
+                stack.append(f"[awaiting {type(awaitable).__name__.replace('FutureIter', 'Future')}]")
+                break
+            stack.append(_frame_label(frame.f_code))
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None) or getattr(awaitable, "ag_await", None)
+        else:
+            stack.append("[awaiting]")
+        return stack
+
+    def folded(self) -> str:
+        lines = [f"{stack} {count}" for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1])]
+        return "\n".join(lines) + "\n"
+
+class RequestProfiler:
+    """Opt-in per-request profiling.
+
+    A request is profiled when it sends the ``X-Profile: 1`` header (if
+    PROFILE_HEADER_ENABLED) or is picked at PROFILE_SAMPLE_RATE, up to
+    PROFILE_MAX_CONCURRENT at a time. Each profile is written to
+    PROFILE_DIR as ``<id>.folded`` with a ``<id>.json`` summary; only the
+    newest PROFILE_MAX_FILES profiles are kept.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        sample_rate: Optional[float] = None,
+        header_enabled: Optional[bool] = None,
+        interval: Optional[float] = None,
+        max_concurrent: Optional[int] = None,
+        max_files: Optional[int] = None
+    ):
+        self.directory = Path(directory or os.getenv("PROFILE_DIR", "profiles"))
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        if header_enabled is None:
+            header_enabled = os.getenv("PROFILE_HEADER_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.header_enabled = header_enabled
+        self.interval = interval or float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+        self.max_concurrent = max_concurrent or int(os.getenv("PROFILE_MAX_CONCURRENT", "2"))
+        self.max_files = max_files or int(os.getenv("PROFILE_MAX_FILES", "200"))
+        self.path_prefixes = tuple(
+            prefix.strip() for prefix in os.getenv("PROFILE_PATH_PREFIXES", "/api/").split(",") if prefix.strip()
+        )
+        self.active = 0
+        self.captured = 0
+        self.skipped_busy = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.header_enabled or self.sample_rate > 0
+
+    def new_profile_id(self, request_id: Optional[str]) -> str:
+        """Build a file-name-safe profile id from the time and request id"""
+        suffix = re.sub(r"[^0-9A-Za-z_-]", "_", request_id or "request")
+        return f"{time.strftime('%Y%m%dT%H%M%S')}-{suffix}"[:128]
+
+    def start(self, task: asyncio.Task) -> Optional[TaskSampler]:
+        """Start sampling a request task, or return None when at the concurrency limit"""
+        if self.active >= self.max_concurrent:
+            self.skipped_busy += 1
+            return None
+        self.active += 1
+        sampler = TaskSampler(task, self.interval)
+        sampler.start()
+        return sampler
+
+    async def finish(self, sampler: TaskSampler, profile_id: str, summary: dict):
+        """Stop sampling and write the profile without blocking the event loop"""
+        sampler.stop()
+        self.active -= 1
+        summary = {
+            **summary,
+            "profile_id": profile_id,
+            "samples": sampler.samples,
+            "cpu_samples": sampler.cpu_samples,
+            "interval_ms": self.interval * 1000
+        }
+        try:
+            await asyncio.to_thread(self._write, profile_id, sampler.folded(), summary)
+            self.captured += 1
+        except OSError as e:
+            logger.error("Could not write profile %s: %s", profile_id, e)
+
+    def _write(self, profile_id: str, folded: str, summary: dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{profile_id}.folded").write_text(folded, encoding="utf-8")
+        (self.directory / f"{profile_id}.json").write_text(json.dumps(summary), encoding="utf-8")
+        self._prune()
+
+    def _prune(self):
+        summaries = sorted(self.directory.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        for path in summaries[:max(0, len(summaries) - self.max_files)]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".folded").unlink(missing_ok=True)
+
+    def list_profiles(self, limit: int = 50) -> List[dict]:
+        """Get summaries of the newest captured profiles"""
+        if not self.directory.exists():
+            return []
+        paths = sorted(self.directory.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+        profiles = []
+        for path in paths[:limit]:
+            try:
+                profiles.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def profile_path(self, profile_id: str) -> Optional[Path]:
+        """Get the folded stacks file for a profile id, or None if unknown"""
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}.folded"
+        return path if path.is_file() else None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "header_enabled": self.header_enabled,
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval * 1000,
+            "active": self.active,
+            "captured": self.captured,
+            "skipped_busy": self.skipped_busy
+        }
+
+_profiler: Optional[RequestProfiler] = None
+
+def get_request_profiler() -> RequestProfiler:
+    """Get the process-wide request profiler"""
+    global _profiler
+    if _profiler is None:
+        _profiler = RequestProfiler()
+    return _profiler
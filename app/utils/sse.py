@@ -0,0 +1,10 @@
+import json
+from typing import Optional
+
+def format_sse(data: dict, event: Optional[str] = None) -> str:
+    """Format a payload as a Server-Sent Events message"""
+    message = ""
+    if event:
+        message += f"event: {event}\n"
+    message += f"data: {json.dumps(data)}\n\n"
+    return message
@@ -0,0 +1,291 @@
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP span kinds and status codes
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+class Span:
+    """A timed operation within a trace"""
+
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "name", "kind", "sampled",
+        "start_ns", "end_ns", "attributes", "status", "status_message"
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, kind: str = "internal"):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = {}
+        self.status = STATUS_OK
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any):
+        if self.sampled and value is not None:
+            self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {str(error)}"
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": self.status}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+current_span_var: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+def current_span() -> Optional[Span]:
+    return current_span_var.get()
+
+def get_trace_id() -> Optional[str]:
+    span = current_span_var.get()
+    return span.trace_id if span else None
+
+class SpanExporter:
+    """Batch finished spans to a JSON-lines file or an OTLP/HTTP collector.
+
+    Spans are queued without blocking and written by a background thread
+    as OTLP ``ExportTraceServiceRequest`` JSON, one batch per line for the
+    file exporter. When the queue is full spans are dropped and counted.
+    """
+
+    def __init__(
+        self,
+        exporter: str = "file",
+        file_path: str = "traces/spans.jsonl",
+        endpoint: str = "",
+        service_name: str = "voice-agents",
+        queue_size: int = 10000,
+        batch_size: int = 512,
+        interval: float = 2.0,
+        max_file_bytes: int = 50 * 1024 * 1024
+    ):
+        self.exporter = exporter
+        self.file_path = Path(file_path)
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_file_bytes = max_file_bytes
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.exported = 0
+        self.dropped = 0
+        self.errors = 0
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span):
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self):
+        """Export queued spans and stop the exporter thread"""
+        if not self._stopping.is_set():
+            self._stopping.set()
+            self._thread.join(timeout=10)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                try:
+                    self._export(batch)
+                    self.exported += len(batch)
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning("Span export failed, dropped %s spans: %s", len(batch), e)
+            elif self._stopping.is_set():
+                return
+
+    def _next_batch(self) -> List[Span]:
+        batch: List[Span] = []
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if self._stopping.is_set():
+                timeout = 0
+            try:
+                batch.append(self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _payload(self, batch: List[Span]) -> dict:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "app"}, "spans": [span.to_otlp() for span in batch]}]
+            }]
+        }
+
+    def _export(self, batch: List[Span]):
+        payload = json.dumps(self._payload(batch), separators=(",", ":"))
+        if self.exporter == "otlp":
+            request = urllib.request.Request(
+                self.endpoint, data=payload.encode("utf-8"),
+                headers={"Content-Type": "application/json"}, method="POST"
+            )
+            with urllib.request.urlopen(request, timeout=10) as response:
+                response.read()
+            return
+
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.file_path.exists() and self.file_path.stat().st_size >= self.max_file_bytes:
+            # Keep one rotated file
+            os.replace(self.file_path, self.file_path.with_name(self.file_path.name + ".1"))
+        with open(self.file_path, "a", encoding="utf-8") as f:
+            f.write(payload + "\n")
+
+    def stats(self) -> dict:
+        return {
+            "exporter": self.exporter,
+            "destination": self.endpoint if self.exporter == "otlp" else str(self.file_path),
+            "queued": self.queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "errors": self.errors
+        }
+
+class Tracer:
+    """Create spans that nest through context variables.
+
+    A request's root span is started by the tracing middleware; every
+    ``start_span`` below it, including in tasks and ``asyncio.to_thread``
+    calls started from it, becomes a child. TRACE_SAMPLE_RATE decides
+    which new traces are recorded; an incoming ``traceparent`` header
+    carries its own decision.
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, sample_rate: Optional[float] = None):
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+        self.exporter = exporter
+        self.spans_recorded = 0
+
+    @contextmanager
+    def start_span(
+        self,
+        name: str,
+        kind: str = "internal",
+        traceparent: Optional[str] = None,
+        **attributes: Any
+    ) -> Iterator[Span]:
+        """Time the enclosed block as a child of the current span, or as a new trace"""
+        parent = current_span_var.get()
+        if parent is not None:
+            span = Span(name, parent.trace_id, parent.span_id, parent.sampled, kind)
+        else:
+            match = TRACEPARENT_PATTERN.match(traceparent.strip().lower()) if traceparent else None
+            if match:
+                span = Span(name, match.group(1), match.group(2), bool(int(match.group(3), 16) & 1), kind)
+            else:
+                sampled = self.exporter is not None and random.random() < self.sample_rate
+                span = Span(name, os.urandom(16).hex(), None, sampled, kind)
+        for key, value in attributes.items():
+            span.set_attribute(key, value)
+
+        token = current_span_var.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            current_span_var.reset(token)
+            span.end_ns = time.time_ns()
+            if span.sampled and self.exporter is not None:
+                self.spans_recorded += 1
+                self.exporter.submit(span)
+
+    def shutdown(self):
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "spans_recorded": self.spans_recorded,
+            "exporter": self.exporter.stats() if self.exporter else None
+        }
+
+_tracer: Optional[Tracer] = None
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer configured from TRACE_* environment variables.
+
+    Tracing is off unless TRACE_EXPORTER selects an exporter and
+    TRACE_SAMPLE_RATE records a share of traces; without an exporter no
+    span is recorded and no exporter thread is started.
+    """
+    global _tracer
+    if _tracer is None:
+        exporter_kind = os.getenv("TRACE_EXPORTER", "none").lower()
+        exporter = None
+        if exporter_kind in ("file", "otlp"):
+            exporter = SpanExporter(
+                exporter=exporter_kind,
+                file_path=os.getenv("TRACE_FILE", "traces/spans.jsonl"),
+                endpoint=os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"),
+                service_name=os.getenv("TRACE_SERVICE_NAME", "voice-agents"),
+                queue_size=int(os.getenv("TRACE_QUEUE_SIZE", "10000")),
+                max_file_bytes=int(os.getenv("TRACE_FILE_MAX_BYTES", str(50 * 1024 * 1024)))
+            )
+        _tracer = Tracer(exporter)
+        atexit.register(_tracer.shutdown)
+    return _tracer
+
+def start_span(name: str, **attributes: Any):
+    """Start a span on the process-wide tracer"""
+    return get_tracer().start_span(name, **attributes)
@@ -0,0 +1,72 @@
+import time
+from typing import Optional
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+class UploadUsage:
+    """Running byte and file counters for the uploads directory.
+
+    Writers and deleters report each change, so reading the usage is O(1).
+    The upload janitor reconciles the counters with a full scan on every
+    pass to correct drift from files changed outside the app.
+    """
+
+    def __init__(self):
+        self.total_bytes = 0
+        self.file_count = 0
+        self.bytes_written = 0
+        self.bytes_deleted = 0
+        self.reconciled_at: Optional[float] = None
+        self.last_drift_bytes = 0
+        self.reconciliations = 0
+
+    @property
+    def reconciled(self) -> bool:
+        return self.reconciled_at is not None
+
+    def record_write(self, size: int, replaced_size: Optional[int] = None):
+        """Record a written file, and the size of the file it overwrote if any"""
+        self.total_bytes += size
+        self.bytes_written += size
+        if replaced_size is None:
+            self.file_count += 1
+        else:
+            self.total_bytes -= replaced_size
+            self.bytes_deleted += replaced_size
+
+    def record_delete(self, size: int):
+        self.total_bytes = max(0, self.total_bytes - size)
+        self.file_count = max(0, self.file_count - 1)
+        self.bytes_deleted += size
+
+    def reconcile(self, total_bytes: int, file_count: int):
+        """Replace the running counters with the result of a full scan"""
+        # Before the first scan the counters only cover writes since startup
+        self.last_drift_bytes = self.total_bytes - total_bytes if self.reconciled else 0
+        if self.last_drift_bytes:
+            logger.info("Uploads usage drifted by %s bytes; reconciled", self.last_drift_bytes)
+        self.total_bytes = total_bytes
+        self.file_count = file_count
+        self.reconciled_at = time.time()
+        self.reconciliations += 1
+
+    def stats(self) -> dict:
+        return {
+            "total_bytes": self.total_bytes,
+            "file_count": self.file_count,
+            "bytes_written": self.bytes_written,
+            "bytes_deleted": self.bytes_deleted,
+            "reconciled_at": self.reconciled_at,
+            "reconciliations": self.reconciliations,
+            "last_drift_bytes": self.last_drift_bytes
+        }
+
+_usage: Optional[UploadUsage] = None
+
+def get_upload_usage() -> UploadUsage:
+    """Get the process-wide uploads usage counters"""
+    global _usage
+    if _usage is None:
+        _usage = UploadUsage()
+    return _usage
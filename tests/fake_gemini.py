@@ -0,0 +1,58 @@
+import asyncio
+from typing import List, Optional, Tuple
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_router import ModelRouter
+from app.services.llm_service import LLMService
+from app.services.prompt_prefixes import PromptPrefixRegistry
+from app.services.resilience import ResilientClient
+from app.services.token_accounting import TokenAccountant
+
+class FakeResponse:
+    """Gemini response without usage metadata, like the pinned SDK returns"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeModel:
+    def __init__(self, clients: "FakeClients", model_name: str, settings: dict):
+        self.clients = clients
+        self.model_name = model_name
+        self.settings = settings
+
+    async def generate_content_async(self, contents):
+        self.clients.calls.append((contents, self.settings))
+        delay = self.clients.delays.get(self.model_name, 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        return FakeResponse(f"answer {len(self.clients.calls)}")
+
+class FakeClients:
+    """Stand-in for LLMClientRegistry that records every generation call.
+
+    ``delays`` maps a model name to how long its calls take, to exercise
+    routing and hedging.
+    """
+
+    api_key = "test"
+
+    def __init__(self):
+        self.calls: List[Tuple[str, dict]] = []
+        self.delays = {}
+
+    def get_model(self, model_name: str, max_output_tokens: Optional[int] = None, temperature: Optional[float] = None):
+        return FakeModel(self, model_name, {"max_output_tokens": max_output_tokens, "temperature": temperature})
+
+def make_llm_service(session_budget: int = 0, hedge: bool = False) -> Tuple[LLMService, FakeClients]:
+    """LLMService on fake Gemini models with its own cache, accountant and router"""
+    router = ModelRouter(default_model="default", fast_model="fast", fallback_model="fallback")
+    router.hedge_enabled = hedge
+    clients = FakeClients()
+    service = LLMService(
+        clients=clients,
+        cache=LLMResponseCache(enabled=True, max_temperature=0.3, shared=None),
+        accountant=TokenAccountant(session_budget=session_budget),
+        router=router,
+        resilience=ResilientClient("gemini-test"),
+        prefixes=PromptPrefixRegistry()
+    )
+    return service, clients
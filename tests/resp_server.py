@@ -0,0 +1,436 @@
+import asyncio
+import bisect
+import copy
+import fnmatch
+import math
+import time
+from typing import Dict, List, Optional
+from app.services.resp_client import RespError
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+class _Transaction:
+    """WATCH/MULTI state of one connection"""
+
+    def __init__(self):
+        self.watched: Dict[bytes, object] = {}
+        self.queued: Optional[List[List[bytes]]] = None
+
+    def reset(self):
+        self.watched = {}
+        self.queued = None
+
+class InProcessRespServer:
+    """Minimal in-process server for the subset of Redis commands used by this app.
+
+    Used by the tests of the Redis-backed session store and shared caches,
+    and handy for local development without a real Redis: start it, point
+    REDIS_URL at ``server.url`` and stop it afterwards. Data lives in this
+    process only.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self._data: Dict[bytes, object] = {}
+        self._expires: Dict[bytes, float] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.commands = 0
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"In-process RESP server listening on {self.host}:{self.port}")
+        return self.url
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        transaction = _Transaction()
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                self.commands += 1
+                reply = self._execute_in(transaction, args)
+                writer.write(self._encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _execute_safely(self, args: List[bytes]):
+        try:
+            return self.execute(args)
+        except RespError as e:
+            return e
+        except (ValueError, IndexError):
+            return RespError("ERR syntax error")
+
+    def _execute_in(self, transaction: "_Transaction", args: List[bytes]):
+        """Execute a command on a connection, handling WATCH/MULTI/EXEC state"""
+        name = args[0].decode("ascii").upper()
+        if name == "WATCH":
+            for key in args[1:]:
+                transaction.watched[key] = self._snapshot(key)
+            return "OK"
+        if name == "UNWATCH":
+            transaction.watched.clear()
+            return "OK"
+        if name == "MULTI":
+            transaction.queued = []
+            return "OK"
+        if name == "DISCARD":
+            transaction.reset()
+            return "OK"
+        if name == "EXEC":
+            queued, watched = transaction.queued, transaction.watched
+            transaction.reset()
+            if queued is None:
+                return RespError("ERR EXEC without MULTI")
+            # Aborted when a watched key changed or expired since WATCH
+            if any(self._snapshot(key) != snapshot for key, snapshot in watched.items()):
+                return None
+            # Runs without yielding to other connections, so it is atomic
+            return [self._execute_safely(command) for command in queued]
+        if transaction.queued is not None:
+            transaction.queued.append(args)
+            return "QUEUED"
+        return self._execute_safely(args)
+
+    def _snapshot(self, key: bytes):
+        # A copy of the value and its expiry; a write that restores identical
+        # content is not noticed, unlike in Redis
+        return copy.deepcopy(self._live(key)), self._expires.get(key)
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def _encode(self, reply) -> bytes:
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, RespError):
+            return f"-{reply}\r\n".encode("utf-8")
+        if isinstance(reply, bool):
+            return b":%d\r\n" % int(reply)
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, str):
+            return f"+{reply}\r\n".encode("utf-8")
+        if isinstance(reply, float):
+            reply = repr(reply).encode("ascii")
+        if isinstance(reply, bytes):
+            return b"$%d\r\n%s\r\n" % (len(reply), reply)
+        return b"*%d\r\n" % len(reply) + b"".join(self._encode(item) for item in reply)
+
+    # Keyspace helpers
+
+    def _live(self, key: bytes):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return self._data.get(key)
+
+    def _typed(self, key: bytes, kind, create: bool = False):
+        value = self._live(key)
+        if value is None:
+            if not create:
+                return None
+            value = self._data[key] = kind()
+        if not isinstance(value, kind):
+            raise RespError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _drop_if_empty(self, key: bytes):
+        if not self._data.get(key):
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+
+    def execute(self, args: List[bytes]):
+        """Execute one command and return its reply"""
+        name = args[0].decode("ascii").upper()
+        handler = getattr(self, f"_cmd_{name.lower()}", None)
+        if handler is None:
+            raise RespError(f"ERR unknown command '{name}'")
+        return handler(*args[1:])
+
+    # Connection and keyspace commands
+
+    def _cmd_ping(self, *args):
+        return args[0] if args else "PONG"
+
+    def _cmd_select(self, db):
+        return "OK"
+
+    def _cmd_auth(self, *args):
+        return "OK"
+
+    def _cmd_flushdb(self, *args):
+        self._data.clear()
+        self._expires.clear()
+        return "OK"
+
+    def _cmd_dbsize(self):
+        return sum(1 for key in list(self._data) if self._live(key) is not None)
+
+    def _cmd_exists(self, *keys):
+        return sum(1 for key in keys if self._live(key) is not None)
+
+    def _cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._live(key) is not None:
+                del self._data[key]
+                self._expires.pop(key, None)
+                removed += 1
+        return removed
+
+    def _cmd_keys(self, pattern):
+        pattern = pattern.decode("utf-8")
+        return [
+            key for key in list(self._data)
+            if self._live(key) is not None and fnmatch.fnmatchcase(key.decode("utf-8"), pattern)
+        ]
+
+    def _cmd_pexpire(self, key, milliseconds, *flags):
+        if self._live(key) is None:
+            return 0
+        if b"NX" in (flag.upper() for flag in flags) and key in self._expires:
+            return 0
+        self._expires[key] = time.time() + int(milliseconds) / 1000
+        return 1
+
+    def _cmd_expire(self, key, seconds, *flags):
+        return self._cmd_pexpire(key, int(seconds) * 1000, *flags)
+
+    def _cmd_pttl(self, key):
+        if self._live(key) is None:
+            return -2
+        expires_at = self._expires.get(key)
+        return -1 if expires_at is None else int((expires_at - time.time()) * 1000)
+
+    # Strings
+
+    def _cmd_get(self, key):
+        return self._typed(key, bytes)
+
+    def _cmd_set(self, key, value, *options):
+        ttl_ms = None
+        i = 0
+        while i < len(options):
+            option = options[i].upper()
+            if option == b"EX":
+                ttl_ms, i = int(options[i + 1]) * 1000, i + 2
+            elif option == b"PX":
+                ttl_ms, i = int(options[i + 1]), i + 2
+            elif option == b"NX":
+                if self._live(key) is not None:
+                    return None
+                i += 1
+            else:
+                raise RespError("ERR syntax error")
+        self._data[key] = bytes(value)
+        self._expires.pop(key, None)
+        if ttl_ms is not None:
+            self._expires[key] = time.time() + ttl_ms / 1000
+        return "OK"
+
+    def _cmd_incrby(self, key, amount):
+        current = self._typed(key, bytes)
+        try:
+            value = int(current or b"0") + int(amount)
+        except ValueError:
+            raise RespError("ERR value is not an integer or out of range")
+        self._data[key] = str(value).encode("ascii")
+        return value
+
+    def _cmd_incr(self, key):
+        return self._cmd_incrby(key, b"1")
+
+    # Hashes
+
+    def _cmd_hset(self, key, *pairs):
+        if not pairs or len(pairs) % 2:
+            raise RespError("ERR wrong number of arguments for 'hset' command")
+        fields = self._typed(key, dict, create=True)
+        added = 0
+        for i in range(0, len(pairs), 2):
+            added += pairs[i] not in fields
+            fields[pairs[i]] = pairs[i + 1]
+        return added
+
+    def _cmd_hget(self, key, field):
+        fields = self._typed(key, dict)
+        return fields.get(field) if fields else None
+
+    def _cmd_hmget(self, key, *names):
+        fields = self._typed(key, dict) or {}
+        return [fields.get(name) for name in names]
+
+    def _cmd_hgetall(self, key):
+        fields = self._typed(key, dict) or {}
+        return [item for pair in fields.items() for item in pair]
+
+    def _cmd_hincrby(self, key, field, amount):
+        fields = self._typed(key, dict, create=True)
+        value = int(fields.get(field, b"0")) + int(amount)
+        fields[field] = str(value).encode("ascii")
+        return value
+
+    # Lists
+
+    def _cmd_rpush(self, key, *values):
+        items = self._typed(key, list, create=True)
+        items.extend(values)
+        return len(items)
+
+    def _cmd_llen(self, key):
+        return len(self._typed(key, list) or ())
+
+    @staticmethod
+    def _range(length: int, start: int, stop: int) -> slice:
+        start = max(length + start, 0) if start < 0 else start
+        stop = length + stop if stop < 0 else stop
+        return slice(start, max(stop + 1, start))
+
+    def _cmd_lrange(self, key, start, stop):
+        items = self._typed(key, list) or []
+        return items[self._range(len(items), int(start), int(stop))]
+
+    def _cmd_ltrim(self, key, start, stop):
+        items = self._typed(key, list)
+        if items is not None:
+            items[:] = items[self._range(len(items), int(start), int(stop))]
+            self._drop_if_empty(key)
+        return "OK"
+
+    # Sorted sets: a member -> score dict plus a sorted (score, member) list
+
+    def _zset(self, key, create: bool = False):
+        return self._typed(key, _SortedSet, create=create)
+
+    def _cmd_zadd(self, key, *pairs):
+        zset = self._zset(key, create=True)
+        added = 0
+        for i in range(0, len(pairs), 2):
+            added += zset.add(pairs[i + 1], float(pairs[i]))
+        return added
+
+    def _cmd_zrem(self, key, *members):
+        zset = self._zset(key)
+        if zset is None:
+            return 0
+        removed = sum(zset.remove(member) for member in members)
+        self._drop_if_empty(key)
+        return removed
+
+    def _cmd_zcard(self, key):
+        return len(self._zset(key) or ())
+
+    def _cmd_zscore(self, key, member):
+        zset = self._zset(key)
+        return zset.scores.get(member) if zset else None
+
+    def _zrangebyscore(self, key, low, high, options, reverse: bool):
+        zset = self._zset(key)
+        if zset is None:
+            return []
+        options = [option.upper() for option in options]
+        with_scores = b"WITHSCORES" in options
+        offset, count = 0, -1
+        if b"LIMIT" in options:
+            i = options.index(b"LIMIT")
+            offset, count = int(options[i + 1]), int(options[i + 2])
+
+        entries = zset.between(_parse_bound(low), _parse_bound(high))
+        if reverse:
+            entries.reverse()
+        entries = entries[offset:] if count < 0 else entries[offset:offset + count]
+
+        reply = []
+        for score, member in entries:
+            reply.append(member)
+            if with_scores:
+                reply.append(score)
+        return reply
+
+    def _cmd_zrangebyscore(self, key, low, high, *options):
+        return self._zrangebyscore(key, low, high, options, reverse=False)
+
+    def _cmd_zrevrangebyscore(self, key, high, low, *options):
+        return self._zrangebyscore(key, low, high, options, reverse=True)
+
+    def _cmd_zremrangebyscore(self, key, low, high):
+        zset = self._zset(key)
+        if zset is None:
+            return 0
+        entries = zset.between(_parse_bound(low), _parse_bound(high))
+        for _, member in entries:
+            zset.remove(member)
+        self._drop_if_empty(key)
+        return len(entries)
+
+def _parse_bound(raw: bytes):
+    """Parse a ZRANGEBYSCORE bound into (score, exclusive)"""
+    text = raw.decode("ascii").lower()
+    exclusive = text.startswith("(")
+    return float(text.lstrip("(")), exclusive
+
+class _SortedSet:
+    __slots__ = ("scores", "entries")
+
+    def __init__(self):
+        self.scores: Dict[bytes, float] = {}
+        self.entries: List[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def add(self, member: bytes, score: float) -> int:
+        existing = self.scores.get(member)
+        if existing is not None:
+            if existing == score:
+                return 0
+            self.entries.pop(bisect.bisect_left(self.entries, (existing, member)))
+        bisect.insort(self.entries, (score, member))
+        self.scores[member] = score
+        return int(existing is None)
+
+    def remove(self, member: bytes) -> int:
+        score = self.scores.pop(member, None)
+        if score is None:
+            return 0
+        self.entries.pop(bisect.bisect_left(self.entries, (score, member)))
+        return 1
+
+    def between(self, low, high) -> List[tuple]:
+        # A one-element (score,) tuple sorts before every entry with that score
+        (low_score, low_exclusive), (high_score, high_exclusive) = low, high
+        if low_exclusive:
+            low_score = math.nextafter(low_score, math.inf)
+        if not high_exclusive:
+            high_score = math.nextafter(high_score, math.inf)
+        start = bisect.bisect_left(self.entries, (low_score,))
+        stop = bisect.bisect_left(self.entries, (high_score,))
+        return self.entries[start:stop]
@@ -0,0 +1,80 @@
+"""Content-addressed blob store: ownership on release and races with the janitor.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import io
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.utils import blob_store as blob_store_module
+from app.utils.blob_store import BlobStore
+
+
+def test_release_deletes_a_blob_the_request_created(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    blob = blobs.put_bytes(b"audio", ".webm")
+    lease = blobs.lease(blob.path)
+
+    assert blobs.release(lease, blob)
+    assert not blob.path.exists()
+    assert not lease.exists()
+
+
+def test_release_keeps_a_saved_upload_with_the_same_content(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    saved = blobs.put_file(io.BytesIO(b"audio"), ".webm")
+
+    blob = blobs.put_bytes(b"audio", ".webm")
+    lease = blobs.lease(blob.path)
+
+    assert not blob.created
+    assert not blobs.release(lease, blob)
+    assert saved.path.exists()
+
+
+def test_release_keeps_a_blob_stored_again_after_creation(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    blob = blobs.put_bytes(b"audio", ".webm")
+    lease = blobs.lease(blob.path)
+    # Backdate the blob so the second store changes its mtime even on a coarse clock
+    blob.mtime_ns -= 10 ** 9
+    os.utime(blob.path, ns=(blob.mtime_ns, blob.mtime_ns))
+
+    # e.g. saved through /api/stt/upload while the transcription ran
+    blobs.put_bytes(b"audio", ".webm")
+
+    assert not blobs.release(lease, blob)
+    assert blob.path.exists()
+
+
+def test_release_keeps_a_blob_leased_by_another_request(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    blob = blobs.put_bytes(b"audio", ".webm")
+    lease = blobs.lease(blob.path)
+    other_lease = blobs.lease(blob.path)
+
+    assert not blobs.release(lease, blob)
+    assert blob.path.exists()
+    assert other_lease.exists()
+
+
+def test_store_rewrites_a_blob_removed_during_reuse(tmp_path, monkeypatch):
+    blobs = BlobStore(str(tmp_path))
+    first = blobs.put_bytes(b"audio", ".webm")
+    real_utime = os.utime
+
+    def janitor_removes_first(path, *args, **kwargs):
+        # The janitor deletes the blob between the existence check and the touch
+        os.unlink(path)
+        return real_utime(path, *args, **kwargs)
+
+    monkeypatch.setattr(blob_store_module.os, "utime", janitor_removes_first)
+    second = blobs.put_bytes(b"audio", ".webm")
+
+    assert second.created
+    assert second.path == first.path
+    assert second.path.read_bytes() == b"audio"
+
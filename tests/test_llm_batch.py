@@ -0,0 +1,109 @@
+"""Batch LLM queries: deduplication, ordering, the concurrency bound and cancellation.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("google.generativeai")
+
+from fake_gemini import FakeResponse, make_llm_service
+
+from app.models.schemas import LLMQueryRequest
+
+
+class TrackingModel:
+    """Fake model whose calls take ``delays[prompt]`` seconds; tracks how many run at once"""
+
+    def __init__(self, clients):
+        self.clients = clients
+
+    async def generate_content_async(self, contents):
+        clients = self.clients
+        clients.started.append(contents)
+        clients.active += 1
+        clients.peak = max(clients.peak, clients.active)
+        try:
+            await asyncio.sleep(clients.delays.get(contents, 0.01))
+        except asyncio.CancelledError:
+            clients.cancelled.append(contents)
+            raise
+        finally:
+            clients.active -= 1
+        return FakeResponse(f"answer to {contents}")
+
+
+class TrackingClients:
+    api_key = "test"
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.started = []
+        self.cancelled = []
+        self.active = 0
+        self.peak = 0
+
+    def get_model(self, model_name, max_output_tokens=None, temperature=None):
+        return TrackingModel(self)
+
+
+def make_batch_service(clients):
+    service, _ = make_llm_service()
+    service.clients = clients
+    return service
+
+
+def query(text):
+    return LLMQueryRequest(text=text, temperature=0.7)
+
+
+def test_results_keep_request_order_and_duplicates_are_sent_once():
+    # The first prompt finishes last
+    clients = TrackingClients(delays={"slow": 0.05, "fast": 0.0})
+    service = make_batch_service(clients)
+    items = [query("slow"), query("fast"), query("slow"), query("other")]
+
+    batch = asyncio.run(service.run_batch(items, concurrency=4))
+
+    assert [item.index for item in batch.results] == [0, 1, 2, 3]
+    assert [item.result.response for item in batch.results] == [
+        "answer to slow", "answer to fast", "answer to slow", "answer to other"
+    ]
+    assert sorted(clients.started) == ["fast", "other", "slow"]
+    assert [item.deduplicated for item in batch.results] == [False, False, True, False]
+    assert (batch.total_items, batch.unique_items, batch.succeeded) == (4, 3, 4)
+
+
+def test_concurrency_is_bounded_and_capped():
+    clients = TrackingClients()
+    service = make_batch_service(clients)
+    service.batch_max_concurrency = 3
+    items = [query(f"prompt {i}") for i in range(10)]
+
+    asyncio.run(service.run_batch(items, concurrency=2))
+    assert clients.peak == 2
+
+    clients.peak = 0
+    asyncio.run(service.run_batch(items, concurrency=50))
+    assert clients.peak == 3
+
+
+def test_stopping_a_streamed_batch_cancels_outstanding_queries():
+    clients = TrackingClients(delays={"slow 1": 10, "slow 2": 10})
+    service = make_batch_service(clients)
+    items = [query("fast"), query("slow 1"), query("slow 2")]
+
+    async def scenario():
+        results = service.stream_batch(items, concurrency=3)
+        first = await results.__anext__()
+        # The client went away after the first result
+        await results.aclose()
+        await asyncio.sleep(0)
+        return first
+
+    first = asyncio.run(scenario())
+
+    assert first.index == 0
+    assert sorted(clients.cancelled) == ["slow 1", "slow 2"]
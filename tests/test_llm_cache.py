@@ -0,0 +1,133 @@
+"""LLM response cache eligibility and its use by LLMService, with a fake Gemini model.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("google.generativeai")
+
+from app.models.schemas import LLMQueryRequest, LLMRequest
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_router import ModelRouter
+from app.services.llm_service import LLMService
+from app.services.resilience import ResilientClient
+from app.services.token_accounting import TokenAccountant
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self, clients, settings):
+        self.clients = clients
+        self.settings = settings
+
+    async def generate_content_async(self, contents):
+        self.clients.calls.append((contents, self.settings))
+        return FakeResponse(f"answer {len(self.clients.calls)}")
+
+
+class FakeClients:
+    api_key = "test"
+
+    def __init__(self):
+        self.calls = []
+
+    def get_model(self, model_name, max_output_tokens=None, temperature=None):
+        return FakeModel(self, {"max_output_tokens": max_output_tokens, "temperature": temperature})
+
+
+def make_service(session_budget=0):
+    router = ModelRouter()
+    router.hedge_enabled = False
+    clients = FakeClients()
+    service = LLMService(
+        clients=clients,
+        cache=LLMResponseCache(enabled=True, max_temperature=0.3, shared=None),
+        accountant=TokenAccountant(session_budget=session_budget),
+        router=router,
+        resilience=ResilientClient("gemini-test")
+    )
+    return service, clients
+
+
+def test_missing_temperature_is_not_eligible():
+    cache = LLMResponseCache(enabled=True, max_temperature=0.3, shared=None)
+
+    assert not cache.is_eligible(None)
+    assert not cache.is_eligible(0.7)
+    assert cache.is_eligible(0.2)
+
+
+def chat_twice(service):
+    async def scenario():
+        first = await service.generate_response(LLMRequest(text="Hello"))
+        second = await service.generate_response(LLMRequest(text="hello!"))
+        return first, second
+
+    return asyncio.run(scenario())
+
+
+def test_chat_generation_keeps_the_model_temperature_and_is_not_cached(monkeypatch):
+    monkeypatch.delenv("LLM_CHAT_TEMPERATURE", raising=False)
+    service, clients = make_service()
+
+    first, second = chat_twice(service)
+
+    assert not first.cached
+    assert not second.cached
+    assert len(clients.calls) == 2
+    assert clients.calls[0][1]["temperature"] is None
+    assert service.cache.ineligible == 2
+
+
+def test_pinned_chat_temperature_is_served_from_cache(monkeypatch):
+    monkeypatch.setenv("LLM_CHAT_TEMPERATURE", "0.2")
+    service, clients = make_service()
+
+    first, second = chat_twice(service)
+
+    assert not first.cached
+    assert second.cached
+    assert second.response_text == first.response_text
+    assert len(clients.calls) == 1
+    # Generation runs at the temperature the cache key was built for
+    assert clients.calls[0][1]["temperature"] == 0.2
+    assert service.cache.ineligible == 0
+
+
+def test_cached_query_reports_estimated_usage():
+    service, clients = make_service()
+    request = LLMQueryRequest(text="what can you do", max_tokens=100, temperature=0.1)
+
+    async def scenario():
+        return await service.query_llm(request), await service.query_llm(request)
+
+    first, second = asyncio.run(scenario())
+
+    # The fake response carries no usage metadata, so counts are estimates
+    assert first.tokens_estimated
+    assert second.cached
+    assert second.tokens_estimated
+    assert second.tokens_used == first.tokens_used
+
+
+def test_budget_shortened_answer_is_not_cached():
+    service, clients = make_service(session_budget=60)
+    request = LLMQueryRequest(text="what can you do", max_tokens=1000, temperature=0.1, session_id="s1")
+
+    async def scenario():
+        shortened = await service.query_llm(request)
+        full = await service.query_llm(request.model_copy(update={"session_id": None}))
+        return shortened, full
+
+    shortened, full = asyncio.run(scenario())
+
+    assert clients.calls[0][1]["max_output_tokens"] < 1000
+    assert not full.cached
+    assert clients.calls[1][1]["max_output_tokens"] == 1000
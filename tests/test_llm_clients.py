@@ -0,0 +1,47 @@
+"""Gemini model handle reuse in the LLM client registry; no network calls are made.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+from app.services import llm_clients as llm_clients_module
+from app.services.llm_clients import LLMClientRegistry
+
+
+@pytest.fixture
+def configure_calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(llm_clients_module.genai, "configure", lambda **kwargs: calls.append(kwargs))
+    return calls
+
+
+def test_handles_are_reused_per_generation_settings(configure_calls):
+    registry = LLMClientRegistry(api_key="test-key", max_models=8)
+
+    first = registry.get_model("gemini-2.0-flash", max_output_tokens=100, temperature=0.2)
+    again = registry.get_model("gemini-2.0-flash", max_output_tokens=100, temperature=0.2)
+    other = registry.get_model("gemini-2.0-flash", max_output_tokens=200, temperature=0.2)
+
+    assert again is first
+    assert other is not first
+    assert (registry.hits, registry.misses) == (1, 2)
+    # The shared Gemini client is configured once for all handles
+    assert configure_calls == [{"api_key": "test-key"}]
+
+
+def test_least_recently_used_handle_is_evicted(configure_calls):
+    registry = LLMClientRegistry(api_key="test-key", max_models=2)
+    first = registry.get_model("model-a")
+    registry.get_model("model-b")
+    registry.get_model("model-a")
+    registry.get_model("model-c")
+
+    assert registry.get_model("model-a") is first
+    assert registry.stats()["models"] == 2
+    assert registry.evictions == 1
+    # model-b was least recently used and has to be built again
+    misses = registry.misses
+    registry.get_model("model-b")
+    assert registry.misses == misses + 1
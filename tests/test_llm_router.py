@@ -0,0 +1,48 @@
+"""Model routing by prompt length and latency, and hedged calls.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.services.llm_router import ModelRouter
+
+
+def test_routes_by_prompt_length_and_latency_slo():
+    router = ModelRouter(default_model="default", fast_model="fast", fallback_model="fallback")
+    router.long_prompt_chars = 10
+    router.latency_slo = 1.0
+
+    assert router.choose_model("short") == "fast"
+    assert router.choose_model("a much longer prompt") == "default"
+    assert router.choose_model("short", requested_model="pinned") == "pinned"
+
+    # The fast model misses the SLO while the default model meets it
+    for _ in range(5):
+        router.tracker("fast").record(2.0)
+        router.tracker("default").record(0.5)
+    assert router.choose_model("short") == "default"
+
+
+def test_slow_call_is_hedged_and_the_loser_cancelled():
+    router = ModelRouter(default_model="default", fast_model="fast", fallback_model="fallback")
+    router.hedge_enabled = True
+    router.latency_slo = 0.01
+    cancelled = []
+
+    async def call(model):
+        try:
+            await asyncio.sleep(1.0 if model == "fast" else 0.0)
+        except asyncio.CancelledError:
+            cancelled.append(model)
+            raise
+        return model
+
+    result, model = asyncio.run(router.run("fast", call))
+
+    assert (result, model) == ("fallback", "fallback")
+    assert router.hedges_won == 1
+    assert cancelled == ["fast"]
@@ -0,0 +1,132 @@
+"""SSE streaming of LLM tokens with a fake streamed Gemini response.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("google.generativeai")
+
+from app.models.schemas import LLMQueryRequest
+from app.routers.llm import stream_llm
+from app.services.llm_cache import LLMResponseCache
+from app.services.llm_router import ModelRouter
+from app.services.llm_service import LLMService
+from app.services.prompt_prefixes import PromptPrefixRegistry
+from app.services.resilience import ResilientClient
+from app.services.token_accounting import TokenAccountant
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStream:
+    """Streamed response; ``stall_after`` chunks it stops sending without ending"""
+
+    def __init__(self, texts, stall_after=None):
+        self.texts = texts
+        self.stall_after = stall_after
+        self.closed = False
+
+    async def __aiter__(self):
+        try:
+            for index, text in enumerate(self.texts):
+                if index == self.stall_after:
+                    await asyncio.sleep(3600)
+                yield FakeChunk(text)
+        finally:
+            self.closed = True
+
+
+class FakeModel:
+    def __init__(self, stream):
+        self.stream = stream
+
+    async def generate_content_async(self, contents, stream=False):
+        assert stream
+        return self.stream
+
+
+class FakeClients:
+    api_key = "test"
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def get_model(self, model_name, max_output_tokens=None, temperature=None):
+        return FakeModel(self.stream)
+
+
+def make_service(stream, idle_timeout=5.0):
+    return LLMService(
+        clients=FakeClients(stream),
+        cache=LLMResponseCache(enabled=False, shared=None),
+        accountant=TokenAccountant(session_budget=0),
+        router=ModelRouter(default_model="default", fast_model="fast", fallback_model="fallback"),
+        resilience=ResilientClient("gemini-test", stream_idle_timeout=idle_timeout),
+        prefixes=PromptPrefixRegistry()
+    )
+
+
+def parse_events(messages):
+    events = []
+    for message in messages:
+        lines = message.strip().split("\n")
+        events.append((lines[0][len("event: "):], json.loads(lines[1][len("data: "):])))
+    return events
+
+
+def test_stream_endpoint_sends_tokens_then_a_summary():
+    stream = FakeStream(["Hel", "", "lo"])
+    service = make_service(stream)
+
+    async def scenario():
+        response = await stream_llm(LLMQueryRequest(text="hi"), service)
+        return response, [message async for message in response.body_iterator]
+
+    response, messages = asyncio.run(scenario())
+    events = parse_events(messages)
+
+    assert response.media_type == "text/event-stream"
+    assert events[:2] == [("token", {"text": "Hel"}), ("token", {"text": "lo"})]
+    name, summary = events[2]
+    assert name == "done"
+    assert summary["success"]
+    assert summary["chunks"] == 2
+    assert summary["characters"] == 5
+
+
+def test_stalled_stream_ends_with_an_error_event():
+    service = make_service(FakeStream(["Hel", "lo"], stall_after=1), idle_timeout=0.05)
+
+    async def scenario():
+        return [event async for event in service.stream_query(LLMQueryRequest(text="hi"))]
+
+    events = asyncio.run(scenario())
+
+    assert [event["event"] for event in events] == ["token", "error"]
+    assert "sent nothing" in events[1]["data"]["message"]
+    assert service.resilience.timeouts == 1
+
+
+def test_client_disconnect_closes_the_upstream_stream():
+    stream = FakeStream(["Hel", "lo", "!"])
+    service = make_service(stream)
+
+    async def scenario():
+        events = service.stream_query(LLMQueryRequest(text="hi"))
+        first = await events.__anext__()
+        # The server closes the generator when the client goes away
+        await events.aclose()
+        await asyncio.sleep(0)
+        return first, stream.closed
+
+    first, closed = asyncio.run(scenario())
+
+    assert first == {"event": "token", "data": {"text": "Hel"}}
+    assert closed
@@ -0,0 +1,67 @@
+"""Queue-based logging: non-blocking drops and a single sink for app loggers.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import json
+import logging
+import queue
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.utils import logging as logging_module
+from app.utils.logging import DroppingQueueHandler, logging_stats, setup_logging, shutdown_logging
+
+
+@pytest.fixture
+def fresh_logging(monkeypatch):
+    """Run setup_logging from scratch and put the root logger back afterwards"""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    monkeypatch.setattr(logging_module, "_queue_handler", None)
+    monkeypatch.setattr(logging_module, "_context_filter", None)
+    monkeypatch.setattr(logging_module, "_listener", None)
+    monkeypatch.setenv("LOG_FORMAT", "json")
+    monkeypatch.setenv("LOG_QUEUE_SIZE", "50")
+    monkeypatch.delenv("LOG_SAMPLE_RATES", raising=False)
+    yield
+    shutdown_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def make_record(message):
+    return logging.LogRecord("app.test", logging.INFO, __file__, 1, message, (), None)
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+
+    for i in range(3):
+        handler.handle(make_record(f"line {i}"))
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 2
+
+
+def test_app_logger_records_reach_the_sink_once(fresh_logging, capsys):
+    app_logger = logging.getLogger("app.services.duplicated")
+    app_logger.addHandler(logging.StreamHandler())
+
+    setup_logging("INFO")
+    assert app_logger.handlers == []
+    assert logging_stats()["queue_size"] == 50
+
+    app_logger.info("Transcribed %s bytes", 42)
+    shutdown_logging()
+
+    lines = [line for line in capsys.readouterr().out.splitlines() if line]
+    assert len(lines) == 1
+    entry = json.loads(lines[0])
+    assert entry["logger"] == "app.services.duplicated"
+    assert entry["message"] == "Transcribed 42 bytes"
+    assert logging_stats()["dropped"] == 0
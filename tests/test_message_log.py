@@ -0,0 +1,60 @@
+"""Compact column-wise chat message log: trimming, compaction and reads.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import pytest
+
+pytest.importorskip("pydantic")
+
+from app.models.schemas import ChatMessage
+from app.services.message_log import MESSAGE_OVERHEAD_BYTES, MessageLog
+
+
+def filled_log(count):
+    log = MessageLog()
+    for i in range(count):
+        log.append("user" if i % 2 == 0 else "assistant", f"message {i} é", float(i))
+    return log
+
+
+def test_last_returns_the_newest_messages_in_order():
+    log = filled_log(4)
+
+    assert log.last(2) == [("user", "message 2 é", 2.0), ("assistant", "message 3 é", 3.0)]
+    assert len(log.last()) == 4
+    assert log.last(10) == log.last()
+    assert log.last(0) == []
+
+
+def test_trim_keeps_the_newest_messages():
+    log = filled_log(10)
+
+    assert log.trim(7) == 3
+    assert log.trim(7) == 0
+    assert len(log) == 7
+    assert [content for _, content, _ in log.last()] == [f"message {i} é" for i in range(3, 10)]
+    assert log.content_bytes == sum(len(f"message {i} é".encode("utf-8")) for i in range(3, 10))
+
+
+def test_compaction_releases_dropped_messages():
+    log = filled_log(10)
+    log.trim(6)
+    # Under half of the arrays is dead, so nothing is compacted yet
+    assert log.nbytes > log.content_bytes + len(log) * MESSAGE_OVERHEAD_BYTES
+
+    log.trim(4)
+
+    assert log.nbytes == log.content_bytes + len(log) * MESSAGE_OVERHEAD_BYTES
+    assert log.last(1) == [("assistant", "message 9 é", 9.0)]
+    log.append("system", "after compaction", 10.0)
+    assert log.last(2) == [("assistant", "message 9 é", 9.0), ("system", "after compaction", 10.0)]
+
+
+def test_round_trip_through_chat_messages():
+    log = MessageLog()
+    log.extend([ChatMessage(role="user", content="hi", timestamp=1.0), ChatMessage(role="tool", content="", timestamp=2.0)])
+
+    messages = log.to_chat_messages()
+
+    assert [(m.role, m.content, m.timestamp) for m in messages] == [("user", "hi", 1.0), ("tool", "", 2.0)]
+    assert log.to_chat_messages(1)[0].role == "tool"
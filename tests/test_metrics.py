@@ -0,0 +1,94 @@
+"""Metrics registry, Prometheus rendering and multiprocess snapshot merging.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.routers.metrics import session_store_collector
+from app.services.session_store import InMemorySessionStore
+from app.utils.metrics import SESSION_STORE_SESSIONS, MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry(directory="")
+    duration = registry.histogram("stage_seconds", "Stage latency", ("stage",), buckets=(0.1, 1.0))
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        duration.observe(value, "stt")
+    requests.inc('/api/"x"')
+
+    text = asyncio.run(registry.render())
+
+    assert 'stage_seconds_bucket{stage="stt",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="stt",le="1"} 3' in text
+    assert 'stage_seconds_bucket{stage="stt",le="+Inf"} 4' in text
+    assert 'stage_seconds_sum{stage="stt"} 4.05' in text
+    assert 'stage_seconds_count{stage="stt"} 4' in text
+    assert 'requests_total{route="/api/\\"x\\""} 1' in text
+    assert "# TYPE stage_seconds histogram" in text
+
+
+def test_duplicate_metric_names_are_rejected():
+    registry = MetricsRegistry(directory="")
+    registry.counter("requests_total", "Requests")
+
+    with pytest.raises(ValueError):
+        registry.gauge("requests_total", "Requests")
+
+
+def test_scrape_merges_live_workers_and_removes_dead_or_stale_snapshots(tmp_path):
+    def worker_registry():
+        registry = MetricsRegistry(directory=str(tmp_path), flush_interval=5)
+        registry.counter("requests_total", "Requests").inc(amount=2)
+        registry.gauge("in_flight", "In flight").set(3)
+        registry.gauge("sessions", "Sessions", multiprocess_mode="max").set(5)
+        return registry
+
+    other = worker_registry()
+    # Snapshots of a live worker, an exited worker and a live pid that stopped writing
+    for pid in (1, 2 ** 22 + 12345, os.getppid()):
+        snapshot = other.snapshot()
+        snapshot["pid"] = pid
+        other.write_snapshot(snapshot)
+    stale = tmp_path / f"metrics-{os.getppid()}.json"
+    os.utime(stale, (time.time() - 60, time.time() - 60))
+
+    text = asyncio.run(worker_registry().render())
+
+    assert "requests_total 4" in text
+    assert "in_flight 6" in text
+    assert "sessions 5" in text
+    assert sorted(path.name for path in tmp_path.glob("metrics-*.json")) == ["metrics-1.json"]
+
+
+def test_snapshot_files_are_valid_json(tmp_path):
+    registry = MetricsRegistry(directory=str(tmp_path))
+    registry.counter("requests_total", "Requests").inc()
+
+    asyncio.run(registry.flush())
+
+    [path] = tmp_path.glob("metrics-*.json")
+    assert json.loads(path.read_text())["metrics"]["requests_total"]["samples"] == [[[], 1.0]]
+
+
+def test_session_store_collector_reads_the_app_registry():
+    async def scenario():
+        store = InMemorySessionStore(max_sessions=10, idle_ttl=100)
+        await store.create()
+        await store.create()
+        app = SimpleNamespace(state=SimpleNamespace(services=SimpleNamespace(session_store=store)))
+        await session_store_collector(app)()
+
+    asyncio.run(scenario())
+
+    assert SESSION_STORE_SESSIONS.total() == 2
+    # In-memory stores are per worker, so the workers' counts add up
+    assert SESSION_STORE_SESSIONS.multiprocess_mode == "sum"
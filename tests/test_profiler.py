@@ -0,0 +1,85 @@
+"""Opt-in request profiling through the ASGI middleware.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.middleware.profiling import ProfilingMiddleware
+from app.utils.profiler import RequestProfiler
+
+
+async def slow_endpoint(scope, receive, send):
+    deadline = time.perf_counter() + 0.03
+    while time.perf_counter() < deadline:
+        pass
+    await asyncio.sleep(0.03)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def make_middleware(tmp_path, **kwargs) -> ProfilingMiddleware:
+    middleware = ProfilingMiddleware(slow_endpoint)
+    middleware.profiler = RequestProfiler(directory=str(tmp_path), interval=0.002, **kwargs)
+    return middleware
+
+
+def call(middleware, headers=()):
+    scope = {"type": "http", "method": "POST", "path": "/api/agent/chat", "headers": list(headers)}
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return dict(sent[0]["headers"])
+
+
+def test_requests_without_the_header_are_not_profiled(tmp_path):
+    middleware = make_middleware(tmp_path, header_enabled=True, sample_rate=0)
+
+    headers = call(middleware)
+
+    assert b"x-profile-id" not in headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_header_opt_in_writes_a_profile(tmp_path):
+    middleware = make_middleware(tmp_path, header_enabled=True, sample_rate=0)
+
+    headers = call(middleware, [(b"x-profile", b"1")])
+
+    profile_id = headers[b"x-profile-id"].decode()
+    profiler = middleware.profiler
+    [summary] = profiler.list_profiles()
+    assert summary["profile_id"] == profile_id
+    assert summary["status"] == 200
+    assert summary["samples"] > 0
+    assert summary["cpu_samples"] > 0
+    folded = profiler.profile_path(profile_id).read_text()
+    assert "slow_endpoint" in folded
+    assert "[awaiting" in folded
+    assert profiler.active == 0
+
+
+def test_header_is_ignored_unless_enabled(tmp_path):
+    middleware = make_middleware(tmp_path, header_enabled=False, sample_rate=0)
+
+    assert not middleware.profiler.enabled
+    assert b"x-profile-id" not in call(middleware, [(b"x-profile", b"1")])
+
+
+def test_concurrency_limit_and_unsafe_profile_ids(tmp_path):
+    profiler = RequestProfiler(directory=str(tmp_path), header_enabled=True, max_concurrent=1)
+    profiler.active = 1
+
+    assert profiler.start(None) is None
+    assert profiler.skipped_busy == 1
+    assert profiler.profile_path("../secrets") is None
@@ -0,0 +1,42 @@
+"""Prompt prefix usage counting, with fake Gemini models.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("google.generativeai")
+
+from fake_gemini import make_llm_service
+
+from app.models.schemas import LLMQueryRequest
+
+
+def test_prefix_is_sent_assembled_and_counted_once():
+    service, clients = make_llm_service()
+    prefix = service.prefixes.register("support", "You are a support agent.")
+
+    request = LLMQueryRequest(text="reset my password", temperature=0.9, prefix="support")
+    asyncio.run(service.query_llm(request))
+
+    assert clients.calls[0][0] == "You are a support agent.\n\nreset my password"
+    assert prefix.uses == 1
+    assert prefix.prefix_tokens_sent == prefix.token_count
+
+
+def test_hedged_request_counts_prefix_once():
+    service, clients = make_llm_service(hedge=True)
+    service.router.latency_slo = 0.01
+    clients.delays["fast"] = 0.5
+    prefix = service.prefixes.register("support", "You are a support agent.")
+
+    request = LLMQueryRequest(text="reset my password", temperature=0.9, prefix="support")
+    response = asyncio.run(service.query_llm(request))
+
+    assert response.success
+    assert response.model_used == "fallback"
+    assert len(clients.calls) == 2
+    assert prefix.uses == 1
+    assert service.prefixes.stats()["prefix_tokens_sent"] == prefix.token_count
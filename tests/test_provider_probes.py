@@ -0,0 +1,56 @@
+"""Background provider probes with fake SDK clients.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("assemblyai")
+pytest.importorskip("murf")
+pytest.importorskip("google.generativeai")
+
+from app.services.provider_probes import ProviderProber
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+
+class FakeHttpClient:
+    def __init__(self):
+        self.requests = []
+
+    def get(self, path, params=None):
+        self.requests.append((path, params))
+        return FakeResponse()
+
+
+class FakeAssemblyAIClient:
+    def __init__(self):
+        self.http_client = FakeHttpClient()
+
+
+class FailingTranscriber:
+    def transcribe(self, path):
+        raise AssertionError("the default probe must not start a transcription")
+
+
+def test_probes_are_off_by_default(monkeypatch):
+    monkeypatch.delenv("PROBES_ENABLED", raising=False)
+
+    assert not ProviderProber().enabled
+
+
+def test_assemblyai_probe_lists_transcripts_without_transcribing(monkeypatch):
+    monkeypatch.setenv("ASSEMBLY_AI_API_KEY", "test-key")
+    monkeypatch.delenv("PROBE_ASSEMBLYAI_TRANSCRIBE", raising=False)
+    prober = ProviderProber(providers="assemblyai", enabled=True)
+    client = FakeAssemblyAIClient()
+    prober.use_clients(None, FailingTranscriber(), client)
+
+    snapshot = asyncio.run(prober.run_once())
+
+    assert snapshot["assemblyai"]["status"] == "healthy"
+    assert client.http_client.requests == [("/v2/transcript", {"limit": 1})]
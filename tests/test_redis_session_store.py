@@ -0,0 +1,125 @@
+"""Redis-backed session store and shared cache against the in-process RESP server.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("assemblyai")
+pytest.importorskip("murf")
+pytest.importorskip("google.generativeai")
+
+from resp_server import InProcessRespServer
+
+from app.models.schemas import ChatMessage
+from app.services.redis_session_store import RedisSessionStore
+from app.services.resp_client import RespCache, RespConnection, RespPool
+from app.services.session_store import SessionQuery
+
+
+def run(scenario):
+    async def main():
+        server = InProcessRespServer()
+        url = await server.start()
+        pool = RespPool(url, max_connections=3)
+        try:
+            await scenario(server, pool)
+        finally:
+            await pool.close()
+            await server.stop()
+    asyncio.run(main())
+
+
+def message(content, timestamp):
+    return ChatMessage(role="user", content=content, timestamp=timestamp)
+
+
+def test_append_trims_history_and_is_visible_to_other_stores():
+    async def scenario(server, pool):
+        store = RedisSessionStore(pool=pool, max_messages=3, idle_ttl=100)
+        other = RedisSessionStore(pool=RespPool(server.url), max_messages=3, idle_ttl=100)
+        session = await store.create()
+        for i in range(5):
+            count = await store.append_messages(session.session_id, [message(f"m{i}", float(i))])
+
+        # Counts every message appended; the stored history is trimmed
+        assert count == 5
+        assert await other.message_count(session.session_id) == 5
+        history = await other.get(session.session_id)
+        assert [m.content for m in history.messages] == ["m2", "m3", "m4"]
+        assert [m.content for m in (await other.get(session.session_id, last_n=1)).messages] == ["m4"]
+        with pytest.raises(KeyError):
+            await store.append_messages("missing", [message("x", 1.0)])
+        await other.close()
+    run(scenario)
+
+
+def test_cursor_pagination_visits_every_session_once():
+    async def scenario(server, pool):
+        store = RedisSessionStore(pool=pool, idle_ttl=100)
+        ids = {(await store.create()).session_id for _ in range(7)}
+        for sort_by in ("created_at", "updated_at"):
+            for descending in (True, False):
+                seen, cursor = [], None
+                while True:
+                    page, cursor = await store.list_sessions(
+                        SessionQuery(sort_by=sort_by, descending=descending, cursor=cursor, limit=2)
+                    )
+                    seen += [item["session_id"] for item in page]
+                    if not cursor:
+                        break
+                assert sorted(seen) == sorted(ids)
+    run(scenario)
+
+
+def test_count_and_listing_drop_expired_sessions():
+    async def scenario(server, pool):
+        store = RedisSessionStore(pool=pool, idle_ttl=100)
+        ids = [(await store.create()).session_id for _ in range(3)]
+        assert await store.count() == 3
+        assert await store.delete(ids[0])
+        assert not await store.delete(ids[0])
+        assert await store.count() == 2
+
+        # Simulate key expiry; listing removes the stale index entry
+        await pool.execute("DEL", store._meta_key(ids[1]))
+        page, _ = await store.list_sessions(SessionQuery(limit=50))
+        assert [item["session_id"] for item in page] == [ids[2]]
+        assert await store.count() == 1
+    run(scenario)
+
+
+def test_resp_cache_round_trip_and_expiry():
+    async def scenario(server, pool):
+        cache = RespCache(pool, "test")
+        await cache.set("key", {"a": [1, 2]}, ttl=0.05)
+        assert await cache.get("key") == {"a": [1, 2]}
+        await asyncio.sleep(0.1)
+        assert await cache.get("key") is None
+    run(scenario)
+
+
+def test_append_to_session_expiring_mid_append_does_not_recreate_it(monkeypatch):
+    async def scenario(server, pool):
+        store = RedisSessionStore(pool=pool, idle_ttl=100)
+        session = await store.create()
+        other = RespPool(server.url)
+        execute_many = RespConnection.execute_many
+
+        async def expire_before_exec(connection, commands):
+            # The session expires after the existence check, before the writes
+            if commands[0] == ("MULTI",):
+                await other.execute("DEL", store._meta_key(session.session_id))
+            return await execute_many(connection, commands)
+
+        monkeypatch.setattr(RespConnection, "execute_many", expire_before_exec)
+        with pytest.raises(KeyError):
+            await store.append_messages(session.session_id, [message("late", 1.0)])
+        monkeypatch.undo()
+
+        assert not await store.exists(session.session_id)
+        assert await store.get(session.session_id) is None
+        await other.close()
+    run(scenario)
@@ -0,0 +1,105 @@
+"""Request id propagation, JSON log records and request-keyed log sampling.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import sys
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.middleware.request_id import RequestIDMiddleware
+from app.utils.log_context import get_request_id
+from app.utils.logging import ContextFilter, JsonFormatter, parse_sample_rates
+
+
+def call(headers=()):
+    seen = {}
+
+    async def endpoint(scope, receive, send):
+        seen["request_id"] = get_request_id()
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/api/health", "headers": list(headers)}
+    asyncio.run(RequestIDMiddleware(endpoint)(scope, None, send))
+    return seen["request_id"], dict(sent[0]["headers"])[b"x-request-id"].decode()
+
+
+def test_incoming_request_id_is_used_and_echoed():
+    request_id, echoed = call([(b"x-request-id", b"client-abc-123")])
+
+    assert request_id == echoed == "client-abc-123"
+
+
+def test_missing_or_invalid_request_id_is_replaced():
+    generated, echoed = call()
+    assert generated == echoed
+    assert len(generated) == 32
+
+    replaced, _ = call([(b"x-request-id", b"has space")])
+    assert replaced != "has space"
+
+
+def make_record(level=logging.INFO, message="Stage %s finished", args=("llm",), **extra):
+    record = logging.LogRecord("app.test", level, __file__, 1, message, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def context_filter(rates, keep_slow_ms=1000.0):
+    variables = {field: contextvars.ContextVar(field, default=None) for field in ("request_id", "session_id", "stage")}
+    return ContextFilter(variables, rates, keep_slow_ms), variables
+
+
+def test_json_records_carry_context_extras_and_exceptions():
+    record = make_record(request_id="r1", session_id=None, stage="llm", duration_ms=12.5)
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        record.exc_info = sys.exc_info()
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "Stage llm finished"
+    assert entry["level"] == "INFO"
+    assert entry["request_id"] == "r1"
+    assert entry["stage"] == "llm"
+    assert "session_id" not in entry
+    assert entry["duration_ms"] == 12.5
+    assert "RuntimeError: boom" in entry["exception"]
+    assert entry["timestamp"].endswith("Z")
+
+
+def test_sampling_keeps_or_drops_whole_requests():
+    log_filter, variables = context_filter(parse_sample_rates("INFO=0.5, bogus, DEBUG=2"))
+    assert log_filter.sample_rates == {logging.INFO: 0.5, logging.DEBUG: 1.0}
+
+    decisions = {}
+    for i in range(200):
+        variables["request_id"].set(f"request-{i}")
+        kept = [log_filter.filter(make_record()) for _ in range(3)]
+        assert len(set(kept)) == 1
+        decisions[i] = kept[0]
+
+    assert 0 < sum(decisions.values()) < 200
+    assert log_filter.sampled_out == 3 * (200 - sum(decisions.values()))
+
+
+def test_sampling_keeps_warnings_and_slow_records():
+    log_filter, variables = context_filter({logging.INFO: 0.0}, keep_slow_ms=500)
+    variables["request_id"].set("request-1")
+
+    assert not log_filter.filter(make_record())
+    assert log_filter.filter(make_record(duration_ms=800))
+    assert log_filter.filter(make_record(level=logging.WARNING))
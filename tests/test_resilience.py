@@ -0,0 +1,89 @@
+"""Provider call deadlines, retries and stream timeouts with fake provider calls.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.services.resilience import ResilientClient, UpstreamTimeoutError
+
+
+def make_client(**kwargs) -> ResilientClient:
+    client = ResilientClient("test-provider", attempt_timeout=0.05, deadline=5.0, max_attempts=3, **kwargs)
+    client.base_backoff = 0.0
+    return client
+
+
+def test_transient_errors_are_retried():
+    client = make_client()
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 2:
+            raise ConnectionError("reset")
+        return "ok"
+
+    assert asyncio.run(client.call(flaky)) == "ok"
+    assert len(calls) == 2
+    assert client.in_flight == 0
+
+
+def test_timeouts_of_billed_jobs_are_not_retried():
+    client = make_client()
+    release = threading.Event()
+    calls = []
+
+    def transcribe():
+        calls.append(1)
+        release.wait(1)
+
+    try:
+        with pytest.raises(UpstreamTimeoutError):
+            asyncio.run(client.call(transcribe, retry_timeouts=False))
+    finally:
+        release.set()
+    assert len(calls) == 1
+
+
+def test_no_retry_while_provider_threads_are_all_hanging():
+    client = make_client(max_threads=1)
+    release = threading.Event()
+    calls = []
+
+    def hang():
+        calls.append(1)
+        release.wait(1)
+
+    try:
+        with pytest.raises(UpstreamTimeoutError):
+            asyncio.run(client.call(hang))
+        # The abandoned call still holds the provider's only thread
+        assert client.in_flight == 1
+    finally:
+        release.set()
+    assert len(calls) == 1
+    assert client.retries == 0
+
+
+def test_stream_fails_when_a_chunk_takes_too_long():
+    client = make_client(stream_idle_timeout=0.05)
+
+    async def chunks():
+        yield "first"
+        await asyncio.sleep(1)
+        yield "never"
+
+    async def consume():
+        received = []
+        with pytest.raises(UpstreamTimeoutError):
+            async for chunk in client.stream(chunks()):
+                received.append(chunk)
+        return received
+
+    assert asyncio.run(consume()) == ["first"]
+    assert client.timeouts == 1
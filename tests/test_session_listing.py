@@ -0,0 +1,94 @@
+"""Cursor-paginated, sorted and filtered session listing on every session store backend.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("assemblyai")
+pytest.importorskip("murf")
+pytest.importorskip("google.generativeai")
+
+from resp_server import InProcessRespServer
+
+from app.services.message_log import MessageLog
+from app.services.redis_session_store import RedisSessionStore
+from app.services.resp_client import RespPool
+from app.services.session_store import InMemorySessionStore, SessionQuery, SessionRecord
+from app.services.sqlite_session_store import SQLiteSessionStore
+
+BACKENDS = ("memory", "sqlite", "redis")
+
+
+def run_with_store(backend, tmp_path, scenario):
+    async def main():
+        if backend == "memory":
+            await scenario(InMemorySessionStore(idle_ttl=3600))
+        elif backend == "sqlite":
+            store = SQLiteSessionStore(path=str(tmp_path / "sessions.db"))
+            try:
+                await scenario(store)
+            finally:
+                await store.close()
+        else:
+            server = InProcessRespServer()
+            pool = RespPool(await server.start())
+            try:
+                await scenario(RedisSessionStore(pool=pool, idle_ttl=3600))
+            finally:
+                await pool.close()
+                await server.stop()
+    asyncio.run(main())
+
+
+def make_records(now):
+    """s0..s5: s<i> was created (i + 1) * 100s ago with i messages; s4 and s5 were updated together"""
+    records = []
+    for i in range(6):
+        log = MessageLog()
+        for j in range(i):
+            log.append("user", f"m{j}", now - 50)
+        updated_at = now - 10 * min(i, 4)
+        records.append(SessionRecord(f"s{i}", now - 100 * (i + 1), updated_at, log))
+    return records
+
+
+async def collect(store, **options):
+    seen, cursor = [], None
+    while True:
+        page, cursor = await store.list_sessions(SessionQuery(cursor=cursor, **options))
+        seen += [item["session_id"] for item in page]
+        if not cursor:
+            return seen
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_pages_follow_the_sort_order_with_ties_broken_by_id(backend, tmp_path):
+    async def scenario(store):
+        await store.import_sessions(make_records(time.time()))
+
+        assert await collect(store, limit=2) == ["s0", "s1", "s2", "s3", "s5", "s4"]
+        assert await collect(store, limit=4, descending=False) == ["s4", "s5", "s3", "s2", "s1", "s0"]
+        assert await collect(store, limit=1, sort_by="created_at", descending=False) == [
+            "s5", "s4", "s3", "s2", "s1", "s0"
+        ]
+    run_with_store(backend, tmp_path, scenario)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_filters_apply_across_pages(backend, tmp_path):
+    async def scenario(store):
+        await store.import_sessions(make_records(time.time()))
+
+        assert await collect(store, limit=1, min_messages=2, max_messages=4) == ["s2", "s3", "s4"]
+        assert await collect(store, limit=2, sort_by="created_at", max_age=350) == ["s0", "s1", "s2"]
+        assert await collect(store, limit=2, min_age=450) == ["s5", "s4"]
+    run_with_store(backend, tmp_path, scenario)
+
+
+def test_malformed_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        SessionQuery(cursor="not a cursor")
@@ -0,0 +1,105 @@
+"""Bounded in-memory session store and the agent chat turn that writes to it.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("assemblyai")
+pytest.importorskip("murf")
+pytest.importorskip("google.generativeai")
+
+from app.models.schemas import ChatMessage, LLMResponse, TranscriptionResponse, TTSResponse
+from app.routers.agent import chat_with_agent
+from app.services.session_store import InMemorySessionStore
+
+
+def message(content, timestamp=1.0):
+    return ChatMessage(role="user", content=content, timestamp=timestamp)
+
+
+def test_least_recently_used_session_is_evicted():
+    async def scenario():
+        store = InMemorySessionStore(max_sessions=2, idle_ttl=100, max_messages=10)
+        first = await store.create()
+        second = await store.create()
+        # Touch the first session so the second becomes least recently used
+        await store.append_messages(first.session_id, [message("hi")])
+        await store.create()
+
+        assert await store.exists(first.session_id)
+        assert not await store.exists(second.session_id)
+        with pytest.raises(KeyError):
+            await store.append_messages(second.session_id, [message("late")])
+
+    asyncio.run(scenario())
+
+
+def test_history_is_trimmed_and_idle_sessions_expire():
+    async def scenario():
+        store = InMemorySessionStore(max_sessions=10, idle_ttl=100, max_messages=2)
+        session = await store.create()
+        for i in range(4):
+            count = await store.append_messages(session.session_id, [message(f"m{i}", float(i))])
+        history = await store.get(session.session_id)
+        assert [m.content for m in history.messages] == ["m2", "m3"]
+
+        store.idle_ttl = 0.01
+        await asyncio.sleep(0.02)
+        return count, await store.get(session.session_id)
+
+    count, expired = asyncio.run(scenario())
+    assert count == 2
+    assert expired is None
+
+
+class FakeAudio:
+    content_type = "audio/webm"
+    filename = "turn.webm"
+
+    async def read(self):
+        return b"audio"
+
+
+class FakeSTT:
+    async def transcribe_uploaded_file(self, content, filename):
+        return TranscriptionResponse(success=True, message="ok", transcript="hello")
+
+
+class EvictingLLM:
+    """Fills the single-session store while the pipeline runs, evicting the chat session"""
+
+    def __init__(self, store):
+        self.store = store
+
+    async def generate_response(self, request, route=None):
+        await self.store.create()
+        return LLMResponse(success=True, message="ok", response_text="hi there", model_used="fake")
+
+
+class FakeTTS:
+    async def text_to_speech(self, request):
+        return TTSResponse(success=True, message="ok", audio_url="/uploads/a.mp3", audio_id="voice")
+
+
+def test_chat_turn_recreates_a_session_evicted_mid_pipeline():
+    async def scenario():
+        store = InMemorySessionStore(max_sessions=1, idle_ttl=100, max_messages=10)
+        session = await store.create()
+        response = await chat_with_agent(
+            audio_file=FakeAudio(),
+            session_id=session.session_id,
+            tts_service=FakeTTS(),
+            stt_service=FakeSTT(),
+            llm_service=EvictingLLM(store),
+            session_store=store
+        )
+        return session.session_id, response, await store.get(session.session_id)
+
+    session_id, response, stored = asyncio.run(scenario())
+    assert response.success
+    assert response.session_id == session_id
+    assert response.message_count == 2
+    assert [m.content for m in stored.messages] == ["hello", "hi there"]
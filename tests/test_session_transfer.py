@@ -0,0 +1,103 @@
+"""NDJSON session export and import against the in-memory session store.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("fastapi")
+
+from app.services.session_store import InMemorySessionStore, SessionQuery
+from app.services.session_transfer import SessionImportError, SessionImporter, export_sessions
+
+
+class FailingStore(InMemorySessionStore):
+    """Fails the import batch after ``fail_after`` successful ones"""
+
+    def __init__(self, fail_after: int):
+        super().__init__()
+        self.fail_after = fail_after
+
+    async def import_sessions(self, records):
+        if self.fail_after == 0:
+            raise ConnectionError("store unavailable")
+        self.fail_after -= 1
+        return await super().import_sessions(records)
+
+
+def session_line(session_id: str) -> bytes:
+    return json.dumps({
+        "session_id": session_id,
+        "created_at": 1.0,
+        "updated_at": 2.0,
+        "messages": [{"role": "user", "content": "hi", "timestamp": 1.5}]
+    }).encode("utf-8") + b"\n"
+
+
+async def body(lines):
+    for line in lines:
+        yield line
+
+
+def test_export_then_import_round_trip():
+    async def scenario():
+        source = InMemorySessionStore()
+        for _ in range(3):
+            session = await source.create()
+            await source.append_messages(session.session_id, [])
+        lines = [line.encode("utf-8") async for line in export_sessions(source, SessionQuery(limit=2))]
+
+        target = InMemorySessionStore()
+        result = await SessionImporter(target, batch_size=2).run(body(lines))
+        return lines, result, await target.count()
+
+    lines, result, count = asyncio.run(scenario())
+    assert len(lines) == 3
+    assert result["success"]
+    assert result["committed_lines"] == 3
+    assert count == 3
+
+
+def test_store_failure_reports_committed_lines_for_resuming():
+    lines = [session_line(f"s{i}") for i in range(5)]
+
+    async def scenario():
+        store = FailingStore(fail_after=2)
+        with pytest.raises(SessionImportError) as failure:
+            await SessionImporter(store, batch_size=1).run(body(lines))
+        # The store recovers; resume where the failed import stopped
+        store.fail_after = -1
+        resumed = await SessionImporter(store, batch_size=1).run(
+            body(lines), skip_lines=failure.value.result["committed_lines"]
+        )
+        return failure.value.result, resumed, await store.count()
+
+    failure_result, resumed, count = asyncio.run(scenario())
+    assert failure_result["committed_lines"] == 2
+    assert not failure_result["success"]
+    assert "store unavailable" in failure_result["error"]
+    assert resumed["committed_lines"] == 5
+    assert count == 5
+
+
+def test_oversized_line_is_reported_and_consumed():
+    oversized = b'{"session_id": "big", "padding": "' + b"x" * 300 + b'"}\n'
+    # The oversized line arrives split across chunks
+    chunks = [session_line("s0"), oversized[:150], oversized[150:], session_line("s2")]
+
+    async def scenario():
+        store = InMemorySessionStore()
+        result = await SessionImporter(store, batch_size=1, max_line_bytes=200).run(body(chunks))
+        resumed = await SessionImporter(store, batch_size=1, max_line_bytes=200).run(body(chunks), skip_lines=1)
+        return result, resumed, await store.exists("s2")
+
+    result, resumed, imported_after = asyncio.run(scenario())
+    assert result["success"]
+    assert result["failed_lines"] == 1
+    assert result["errors"][0]["line"] == 2
+    assert result["committed_lines"] == 3
+    assert imported_after
+    assert resumed["committed_lines"] == 3
@@ -0,0 +1,65 @@
+"""SQLite session store shared by two stores standing in for two workers.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+import sqlite3
+
+import pytest
+
+pytest.importorskip("pydantic")
+pytest.importorskip("fastapi")
+
+from app.models.schemas import ChatMessage
+from app.services.sqlite_session_store import SQLiteSessionStore
+
+
+def message(content, timestamp):
+    return ChatMessage(role="user", content=content, timestamp=timestamp)
+
+
+def message_rows(path, session_id):
+    with sqlite3.connect(str(path)) as db:
+        return [row[0] for row in db.execute(
+            "SELECT content FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+        )]
+
+
+def test_flush_drops_messages_of_a_session_deleted_by_another_worker(tmp_path):
+    path = tmp_path / "sessions.db"
+
+    async def scenario():
+        worker = SQLiteSessionStore(path=str(path))
+        other = SQLiteSessionStore(path=str(path))
+        try:
+            session = await worker.create()
+            await worker.append_messages(session.session_id, [message("buffered", 1.0)])
+            assert await other.delete(session.session_id)
+            await worker.flush()
+        finally:
+            await worker.close()
+            await other.close()
+        return session.session_id
+
+    session_id = asyncio.run(scenario())
+    assert message_rows(path, session_id) == []
+
+
+def test_flush_trims_stored_messages_to_the_history_cap(tmp_path):
+    path = tmp_path / "sessions.db"
+
+    async def scenario():
+        store = SQLiteSessionStore(path=str(path), max_messages=3)
+        try:
+            session = await store.create()
+            for i in range(5):
+                await store.append_messages(session.session_id, [message(f"m{i}", float(i))])
+                await store.flush()
+            count = await store.message_count(session.session_id)
+        finally:
+            await store.close()
+        return session.session_id, count
+
+    session_id, count = asyncio.run(scenario())
+    assert count == 5
+    assert message_rows(path, session_id) == ["m2", "m3", "m4"]
@@ -0,0 +1,40 @@
+"""Start the application through its lifespan without calling any provider.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("assemblyai")
+pytest.importorskip("murf")
+pytest.importorskip("google.generativeai")
+
+# Keep background work that reaches outside the process switched off
+os.environ.setdefault("PROBES_ENABLED", "false")
+os.environ.setdefault("TRACE_EXPORTER", "none")
+os.environ.setdefault("SESSION_STORE_BACKEND", "memory")
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.registry import ServiceRegistry
+
+
+def test_lifespan_creates_service_registry(tmp_path, monkeypatch):
+    # The janitor would otherwise age out files in the repository's uploads/
+    monkeypatch.setenv("UPLOAD_JANITOR_ENABLED", "false")
+    monkeypatch.chdir(tmp_path)
+    with TestClient(app) as client:
+        services = app.state.services
+        assert isinstance(services, ServiceRegistry)
+        assert services.assemblyai_client is not None
+
+        response = client.get("/api/health/live")
+        assert response.status_code == 200
+        assert response.json()["status"] == "alive"
+
+        response = client.get("/api/health/ready")
+        assert response.status_code == 200
+    assert services.closed
@@ -0,0 +1,54 @@
+"""Token estimates and per-session budgets.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.services.token_accounting import (
+    TokenAccountant, TokenBudgetExceeded, TokenUsage, estimate_tokens, usage_from_response
+)
+
+
+class ResponseWithoutMetadata:
+    text = "four words right here"
+
+
+def test_counts_are_estimated_without_usage_metadata():
+    usage = usage_from_response(ResponseWithoutMetadata(), "hello there", ResponseWithoutMetadata.text)
+
+    assert usage.estimated
+    assert usage.prompt_tokens == estimate_tokens("hello there")
+    assert usage.completion_tokens == estimate_tokens("four words right here")
+
+
+def test_budget_shortens_then_rejects_generation():
+    accountant = TokenAccountant(session_budget=100)
+
+    assert accountant.plan_max_tokens("s1", "hi", 50) == 50
+    accountant.record(TokenUsage(10, 60), "model", "route", "s1")
+    assert accountant.plan_max_tokens("s1", "hi", 50) == 30 - estimate_tokens("hi")
+
+    accountant.record(TokenUsage(0, 30), "model", "route", "s1")
+    with pytest.raises(TokenBudgetExceeded):
+        accountant.plan_max_tokens("s1", "hi", 50)
+
+
+def test_only_lowered_requests_count_as_truncations():
+    accountant = TokenAccountant(session_budget=100)
+
+    assert accountant.plan_max_tokens("s1", "hi", None) == 100 - estimate_tokens("hi")
+    assert accountant.plan_max_tokens("s1", "hi", 10) == 10
+    assert accountant.budget_truncations == 0
+
+    accountant.plan_max_tokens("s1", "hi", 500)
+    assert accountant.budget_truncations == 1
+
+
+def test_forgotten_session_starts_with_full_budget():
+    accountant = TokenAccountant(session_budget=100, max_sessions=1)
+    accountant.record(TokenUsage(10, 80), "model", "route", "s1")
+    accountant.record(TokenUsage(1, 1), "model", "route", "s2")
+
+    assert accountant.remaining_budget("s1") == 100
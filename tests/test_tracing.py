@@ -0,0 +1,117 @@
+"""Span nesting, trace propagation and the file exporter.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.utils import tracing as tracing_module
+from app.utils.tracing import STATUS_ERROR, SpanExporter, Tracer, get_trace_id, get_tracer
+
+
+class RecordingExporter:
+    def __init__(self):
+        self.spans = []
+
+    def submit(self, span):
+        self.spans.append(span)
+
+
+def test_tracing_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("TRACE_EXPORTER", raising=False)
+    monkeypatch.delenv("TRACE_SAMPLE_RATE", raising=False)
+    monkeypatch.setattr(tracing_module, "_tracer", None)
+
+    tracer = get_tracer()
+    with tracer.start_span("request") as span:
+        pass
+
+    assert tracer.exporter is None
+    assert tracer.sample_rate == 0
+    assert not span.sampled
+    assert tracer.spans_recorded == 0
+
+
+def test_spans_nest_across_tasks_and_threads():
+    exporter = RecordingExporter()
+    tracer = Tracer(exporter, sample_rate=1.0)
+
+    async def scenario():
+        with tracer.start_span("request", kind="server") as root:
+            with tracer.start_span("stage.llm", stage="llm"):
+                await asyncio.gather(
+                    asyncio.create_task(asyncio.sleep(0)),
+                    asyncio.to_thread(get_trace_id)
+                )
+                with tracer.start_span("gemini.generate"):
+                    pass
+            thread_trace_id = await asyncio.to_thread(get_trace_id)
+        return root, thread_trace_id
+
+    root, thread_trace_id = asyncio.run(scenario())
+
+    names = {span.name: span for span in exporter.spans}
+    assert list(names) == ["gemini.generate", "stage.llm", "request"]
+    assert names["gemini.generate"].parent_id == names["stage.llm"].span_id
+    assert names["stage.llm"].parent_id == root.span_id
+    assert names["stage.llm"].attributes == {"stage": "llm"}
+    assert {span.trace_id for span in exporter.spans} == {root.trace_id}
+    assert thread_trace_id == root.trace_id
+    assert get_trace_id() is None
+
+
+def test_incoming_traceparent_and_errors():
+    exporter = RecordingExporter()
+    tracer = Tracer(exporter, sample_rate=0.0)
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+
+    with pytest.raises(RuntimeError):
+        with tracer.start_span("request", traceparent=f"00-{trace_id}-{parent_id}-01"):
+            raise RuntimeError("upstream down")
+    with tracer.start_span("unsampled", traceparent=f"00-{trace_id}-{parent_id}-00"):
+        pass
+    with tracer.start_span("new trace at rate zero"):
+        pass
+
+    [span] = exporter.spans
+    assert (span.trace_id, span.parent_id) == (trace_id, parent_id)
+    assert span.status == STATUS_ERROR
+    assert span.status_message == "RuntimeError: upstream down"
+
+
+def test_file_exporter_writes_otlp_batches(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    exporter = SpanExporter(file_path=str(path), service_name="voice-test", interval=0.05)
+    tracer = Tracer(exporter, sample_rate=1.0)
+
+    with tracer.start_span("request", kind="server", status_code=200):
+        with tracer.start_span("stage.tts"):
+            pass
+    exporter.shutdown()
+
+    spans = []
+    for line in path.read_text().splitlines():
+        [resource] = json.loads(line)["resourceSpans"]
+        assert resource["resource"]["attributes"][0]["value"] == {"stringValue": "voice-test"}
+        spans.extend(resource["scopeSpans"][0]["spans"])
+    assert [span["name"] for span in spans] == ["stage.tts", "request"]
+    assert spans[1]["kind"] == 2
+    assert spans[1]["attributes"] == [{"key": "status_code", "value": {"intValue": "200"}}]
+    assert spans[0]["parentSpanId"] == spans[1]["spanId"]
+    assert exporter.stats()["exported"] == 2
+
+
+def test_full_exporter_queue_drops_spans(tmp_path):
+    exporter = SpanExporter(file_path=str(tmp_path / "spans.jsonl"), queue_size=1, interval=0.05)
+    exporter.shutdown()
+    tracer = Tracer(exporter, sample_rate=1.0)
+
+    for _ in range(3):
+        with tracer.start_span("request"):
+            pass
+
+    assert exporter.dropped == 2
@@ -0,0 +1,106 @@
+"""Upload janitor age and quota eviction, leases and reclaimed-byte accounting.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+import os
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.services.upload_janitor import UploadJanitor
+from app.utils.upload_usage import UploadUsage
+
+HOUR = 3600
+
+
+def write(path, size, age):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def make_janitor(tmp_path, **kwargs) -> UploadJanitor:
+    settings = {"max_age": 24 * HOUR, "max_bytes": 10 ** 9, "min_age": 60, "evict": True}
+    settings.update(kwargs)
+    janitor = UploadJanitor(str(tmp_path), **settings)
+    janitor.usage = UploadUsage()
+    return janitor
+
+
+def test_expired_files_are_removed(tmp_path):
+    old = write(tmp_path / "ab" / "old.mp3", 100, 25 * HOUR)
+    new = write(tmp_path / "cd" / "new.mp3", 50, HOUR)
+    janitor = make_janitor(tmp_path)
+
+    result = asyncio.run(janitor.run_once())
+
+    assert result == {"files_removed": 1, "bytes_reclaimed": 100}
+    assert not old.exists()
+    assert new.exists()
+    assert (janitor.usage.total_bytes, janitor.usage.file_count) == (50, 1)
+
+
+def test_quota_evicts_oldest_first_and_spares_recent_files(tmp_path):
+    oldest = write(tmp_path / "a.mp3", 100, 3 * HOUR)
+    older = write(tmp_path / "b.mp3", 100, 2 * HOUR)
+    recent = write(tmp_path / "c.mp3", 100, 10)
+    janitor = make_janitor(tmp_path, max_bytes=150)
+
+    asyncio.run(janitor.run_once())
+
+    assert not oldest.exists()
+    assert not older.exists()
+    # Over quota still, but too young to evict
+    assert recent.exists()
+    assert janitor.removed_for_quota == 2
+
+
+def test_leased_files_are_kept_for_quota_and_counted_once(tmp_path):
+    blob = write(tmp_path / "ab" / "blob.webm", 100, 2 * HOUR)
+    (tmp_path / ".tmp").mkdir()
+    os.link(blob, tmp_path / ".tmp" / "lease.webm")
+    janitor = make_janitor(tmp_path, max_bytes=10)
+
+    result = asyncio.run(janitor.run_once())
+
+    assert result["files_removed"] == 0
+    assert blob.exists()
+    assert janitor.usage.total_bytes == 100
+
+
+def test_expired_blob_and_lease_are_reclaimed_once(tmp_path):
+    blob = write(tmp_path / "ab" / "blob.webm", 100, 25 * HOUR)
+    (tmp_path / ".tmp").mkdir()
+    os.link(blob, tmp_path / ".tmp" / "lease.webm")
+    janitor = make_janitor(tmp_path)
+
+    result = asyncio.run(janitor.run_once())
+
+    assert result == {"files_removed": 2, "bytes_reclaimed": 100}
+    assert (janitor.usage.total_bytes, janitor.usage.file_count) == (0, 0)
+
+
+def test_files_already_gone_are_not_counted_as_reclaimed(tmp_path, monkeypatch):
+    gone = write(tmp_path / "gone.mp3", 100, 25 * HOUR)
+    janitor = make_janitor(tmp_path)
+    real_scan = janitor._scan
+
+    async def scan_then_owner_deletes():
+        found = await real_scan()
+        gone.unlink()
+        return found
+
+    monkeypatch.setattr(janitor, "_scan", scan_then_owner_deletes)
+    result = asyncio.run(janitor.run_once())
+
+    assert result == {"files_removed": 0, "bytes_reclaimed": 0}
+    assert janitor.usage.total_bytes >= 0
+
+
+def test_zero_max_age_is_not_treated_as_unset(tmp_path):
+    assert make_janitor(tmp_path, max_age=0).max_age == 0
@@ -0,0 +1,68 @@
+"""Running uploads usage counters, as updated by the blob store and reconciled by the janitor.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.services.upload_janitor import UploadJanitor
+from app.utils.blob_store import BlobStore
+from app.utils.upload_usage import UploadUsage
+
+
+def test_writes_replacements_and_deletes_update_the_counters():
+    usage = UploadUsage()
+    usage.record_write(100)
+    usage.record_write(40)
+    usage.record_write(60, replaced_size=40)
+    usage.record_delete(100)
+
+    assert (usage.total_bytes, usage.file_count) == (60, 1)
+    assert (usage.bytes_written, usage.bytes_deleted) == (200, 140)
+    usage.record_delete(500)
+    assert (usage.total_bytes, usage.file_count) == (0, 0)
+
+
+def test_reconcile_reports_drift_only_after_the_first_scan():
+    usage = UploadUsage()
+    usage.record_write(100)
+    usage.reconcile(1000, 5)
+    # Before the first scan the counters only covered writes since startup
+    assert usage.last_drift_bytes == 0
+
+    usage.record_write(50)
+    usage.reconcile(1000, 6)
+    assert usage.last_drift_bytes == 50
+    assert (usage.total_bytes, usage.file_count, usage.reconciliations) == (1000, 6, 2)
+
+
+def test_blob_store_counts_new_content_once(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    blobs.usage = UploadUsage()
+
+    blob = blobs.put_bytes(b"audio", ".webm")
+    blobs.put_bytes(b"audio", ".webm")
+    assert (blobs.usage.total_bytes, blobs.usage.file_count) == (5, 1)
+
+    assert blobs.delete(blob.path)
+    assert (blobs.usage.total_bytes, blobs.usage.file_count) == (0, 0)
+    assert blobs.usage.bytes_deleted == 5
+
+
+def test_janitor_scan_corrects_counters_after_outside_changes(tmp_path):
+    blobs = BlobStore(str(tmp_path))
+    usage = blobs.usage = UploadUsage()
+    blobs.put_bytes(b"first", ".webm")
+    blobs.put_bytes(b"second", ".webm")
+    janitor = UploadJanitor(str(tmp_path), evict=False)
+    janitor.usage = usage
+    asyncio.run(janitor.run_once())
+
+    (tmp_path / "copied-in.bin").write_bytes(b"x" * 20)
+    asyncio.run(janitor.run_once())
+
+    assert (usage.total_bytes, usage.file_count) == (31, 3)
+    assert usage.last_drift_bytes == -20
@@ -0,0 +1,93 @@
+"""Readiness against background provider probes, with fake probe calls.
+
+Requires the packages in requirements.txt; run with ``python -m pytest tests``.
+"""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("assemblyai")
+pytest.importorskip("murf")
+pytest.importorskip("google.generativeai")
+
+from app.services import worker_health as worker_health_module
+from app.services.provider_probes import ProviderProber
+from app.services.worker_health import WorkerHealth
+
+
+@pytest.fixture
+def prober(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.delenv("MURF_API_KEY", raising=False)
+    monkeypatch.setenv("READINESS_REQUIRED_PROVIDERS", "murf,gemini")
+    monkeypatch.setenv("READINESS_PROBE_FAILURES", "3")
+    prober = ProviderProber(providers="murf,gemini", enabled=False)
+    prober.outcome = True
+
+    async def probe_gemini():
+        if not prober.outcome:
+            raise RuntimeError("unavailable")
+
+    prober._probes["gemini"] = probe_gemini
+    monkeypatch.setattr(worker_health_module, "get_provider_prober", lambda: prober)
+    return prober
+
+
+def ready_worker() -> WorkerHealth:
+    health = WorkerHealth()
+    health.ready_at = time.time()
+    return health
+
+
+def test_unconfigured_provider_does_not_fail_readiness(prober):
+    asyncio.run(prober.run_once())
+    ready, body = ready_worker().readiness()
+
+    assert prober.snapshot()["murf"]["status"] == "not_configured"
+    assert ready, body
+
+
+def test_single_probe_failure_keeps_worker_ready(prober):
+    health = ready_worker()
+    prober.outcome = False
+
+    asyncio.run(prober.run_once())
+    asyncio.run(prober.run_once())
+    ready, body = health.readiness()
+    assert ready, body
+
+    asyncio.run(prober.run_once())
+    ready, body = health.readiness()
+    assert not ready
+    assert body["failing_probes"] == ["gemini"]
+
+
+def test_successful_probe_resets_failure_count(prober):
+    health = ready_worker()
+    prober.outcome = False
+    asyncio.run(prober.run_once())
+    asyncio.run(prober.run_once())
+    prober.outcome = True
+    asyncio.run(prober.run_once())
+    prober.outcome = False
+    asyncio.run(prober.run_once())
+
+    ready, body = health.readiness()
+    assert ready, body
+    assert prober.snapshot()["gemini"]["consecutive_failures"] == 1
+
+
+def test_failing_provider_is_degraded_when_not_required(prober, monkeypatch):
+    monkeypatch.delenv("READINESS_REQUIRED_PROVIDERS")
+    health = ready_worker()
+    prober.outcome = False
+    for _ in range(3):
+        asyncio.run(prober.run_once())
+
+    ready, body = health.readiness()
+
+    assert health.required_providers == []
+    assert ready, body
+    assert body["status"] == "degraded"
+    assert body["degraded_providers"] == ["gemini"]